@@ -8,6 +8,7 @@ from alembic import context
 
 # Import your Base and models
 from src.database.core import Base
+from src.database.partitions import is_partition
 from src.core.config import DATABASE_URL
 
 # this is the Alembic Config object
@@ -21,6 +22,21 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+# Tables declared with postgresql_partition_by; their partitions are created
+# by migrations and the maintenance job, not by autogenerate.
+PARTITIONED_TABLES = tuple(
+    table.name
+    for table in target_metadata.tables.values()
+    if table.dialect_options["postgresql"].get("partition_by")
+)
+
+
+def include_name(name, type_, parent_names) -> bool:
+    if type_ == "table":
+        return not is_partition(name, PARTITIONED_TABLES)
+    return True
+
+
 # Get DATABASE_URL from environment
 def get_url():
     return DATABASE_URL
@@ -34,6 +50,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -41,7 +58,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+    )
     with context.begin_transaction():
         context.run_migrations()
 
@@ -0,0 +1,67 @@
+"""add_song_reminder_state
+
+Revision ID: 0e5cf42f9e34
+Revises: d936ec679e91
+Create Date: 2026-10-17 07:47:00.958855
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e5cf42f9e34'
+down_revision: Union[str, Sequence[str], None] = 'd936ec679e91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Constant default: metadata-only, no table rewrite.
+    op.add_column(
+        'songs',
+        sa.Column('last_reminded_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        'songs',
+        sa.Column('reminder_count', sa.Integer(), server_default='0', nullable=False),
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_songs_reminder_due',
+            'songs',
+            ['reminder_count', 'last_reminded_at'],
+            postgresql_where=sa.text('listened_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+        # Reminders no longer walk every unlistened song by receiver.
+        op.drop_index(
+            'ix_songs_unlistened_receiver',
+            table_name='songs',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_songs_unlistened_receiver',
+            'songs',
+            ['receiver_id', 'id'],
+            postgresql_include=['connection_id', 'track_token'],
+            postgresql_where=sa.text('listened_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_songs_reminder_due',
+            table_name='songs',
+            postgresql_concurrently=True,
+        )
+
+    op.drop_column('songs', 'reminder_count')
+    op.drop_column('songs', 'last_reminded_at')
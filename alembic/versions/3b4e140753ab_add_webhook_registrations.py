@@ -0,0 +1,39 @@
+"""add_webhook_registrations
+
+Revision ID: 3b4e140753ab
+Revises: 4d96894af22d
+Create Date: 2026-10-17 08:44:16.095739
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b4e140753ab'
+down_revision: Union[str, Sequence[str], None] = '4d96894af22d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'webhook_registrations',
+        sa.Column('bot_id', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('secret_hash', sa.String(length=64), nullable=False),
+        sa.Column(
+            'registered_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint('bot_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('webhook_registrations')
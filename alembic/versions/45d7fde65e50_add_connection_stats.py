@@ -0,0 +1,81 @@
+"""add_connection_stats
+
+Revision ID: 45d7fde65e50
+Revises: 7978f6396afa
+Create Date: 2026-10-17 07:59:55.774902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '45d7fde65e50'
+down_revision: Union[str, Sequence[str], None] = '7978f6396afa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Upper bounds of the time-to-listen buckets at the time of this revision
+# (src.core.utils.stats.LISTEN_TIME_BUCKETS), plus one open-ended bucket.
+LISTEN_TIME_BUCKETS = (
+    60, 300, 900, 1800, 3600, 7200, 14400, 28800, 43200,
+    86400, 172800, 345600, 604800, 1209600, 2592000,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'connection_stats',
+        sa.Column('connection_id', sa.Integer(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('songs_sent', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('songs_listened', sa.Integer(), server_default='0', nullable=False),
+        sa.Column(
+            'listen_seconds_total', sa.Double(), server_default='0', nullable=False
+        ),
+        sa.Column(
+            'listen_histogram',
+            postgresql.ARRAY(sa.BigInteger()),
+            server_default=sa.text("'{0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0}'"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['connection_id'], ['connections.id']),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('connection_id', 'sender_id'),
+    )
+
+    # Fold in the existing history once; from here on the totals are kept up
+    # to date by the transactions that send songs and record listens.
+    thresholds = "ARRAY[" + ",".join(map(str, LISTEN_TIME_BUCKETS)) + "]::float8[]"
+    bucket = f"width_bucket(seconds, {thresholds})"
+    histogram = ", ".join(
+        f"count(*) FILTER (WHERE {bucket} = {i})"
+        for i in range(len(LISTEN_TIME_BUCKETS) + 1)
+    )
+    op.execute(
+        f"""
+        INSERT INTO connection_stats (connection_id, sender_id, songs_sent,
+                                      songs_listened, listen_seconds_total,
+                                      listen_histogram)
+        SELECT connection_id, sender_id, count(*), count(seconds),
+               coalesce(sum(seconds), 0), ARRAY[{histogram}]
+        FROM (
+            -- greatest() skips NULLs, so unlistened songs need the CASE.
+            SELECT connection_id, sender_id,
+                   CASE WHEN listened_at IS NOT NULL THEN
+                       greatest(extract(epoch FROM listened_at - created_at), 0)
+                   END::float8 AS seconds
+            FROM songs
+        ) AS listens
+        GROUP BY connection_id, sender_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('connection_stats')
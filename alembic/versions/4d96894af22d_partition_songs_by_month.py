@@ -0,0 +1,270 @@
+"""partition_songs_by_month
+
+Revision ID: 4d96894af22d
+Revises: 54c5d314a237
+Create Date: 2026-10-17 09:12:41.503118
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d96894af22d'
+down_revision: Union[str, Sequence[str], None] = '54c5d314a237'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Monthly partitions created past the cutover month; the maintenance job
+# keeps extending them from here (src.database.partitions).
+MONTHS_AHEAD = 2
+
+SONG_INDEXES = (
+    ('connection_canonical', 'ix_songs_connection_canonical'),
+    ('connection_created', 'ix_songs_connection_created'),
+    ('reminder_due', 'ix_songs_reminder_due'),
+    ('unlistened_connection', 'ix_songs_unlistened_connection'),
+)
+
+SONG_FOREIGN_KEYS = (
+    ('sender_id', 'users'),
+    ('receiver_id', 'users'),
+    ('connection_id', 'connections'),
+)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_song_indexes() -> None:
+    op.create_index(
+        'ix_songs_reminder_due',
+        'songs',
+        ['reminder_count', 'last_reminded_at'],
+        postgresql_where=sa.text('listened_at IS NULL'),
+    )
+    op.create_index(
+        'ix_songs_connection_canonical', 'songs', ['connection_id', 'canonical_id']
+    )
+    op.create_index(
+        'ix_songs_connection_created',
+        'songs',
+        ['connection_id', 'created_at', 'id'],
+    )
+    op.create_index(
+        'ix_songs_unlistened_connection',
+        'songs',
+        ['connection_id'],
+        postgresql_where=sa.text('listened_at IS NULL'),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Everything up to the start of next month (UTC) stays where it is and
+    # becomes the songs_legacy partition; new months get partitions of their own.
+    cutover = op.get_bind().scalar(
+        sa.text(
+            "SELECT (date_trunc('month', now() AT TIME ZONE 'UTC')"
+            " + interval '1 month')::date"
+        )
+    )
+    bound = f"{cutover.isoformat()} 00:00+00"
+
+    # Build what the legacy partition needs without blocking writes: unique
+    # indexes that include the partition key, and a validated CHECK that
+    # proves its range, so ATTACH PARTITION below neither builds nor scans.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'songs_legacy_id_created_at',
+            'songs',
+            ['id', 'created_at'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'songs_legacy_track_token_created_at',
+            'songs',
+            ['track_token', 'created_at'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.execute(
+            "ALTER TABLE songs ADD CONSTRAINT songs_legacy_created_at_check "
+            f"CHECK (created_at < '{bound}') NOT VALID"
+        )
+        op.execute(
+            "ALTER TABLE songs VALIDATE CONSTRAINT songs_legacy_created_at_check"
+        )
+
+    # The swap itself only touches catalogs, but it needs an exclusive lock on
+    # songs: fail fast instead of queueing every insert behind a long query.
+    op.execute("SET LOCAL lock_timeout = '5s'")
+
+    op.rename_table('songs', 'songs_legacy')
+    op.drop_constraint('songs_pkey', 'songs_legacy', type_='primary')
+    op.execute(
+        "ALTER TABLE songs_legacy ADD CONSTRAINT songs_legacy_pkey "
+        "PRIMARY KEY USING INDEX songs_legacy_id_created_at"
+    )
+    op.drop_constraint('songs_track_token_key', 'songs_legacy', type_='unique')
+    op.execute(
+        "ALTER TABLE songs_legacy ADD CONSTRAINT songs_legacy_track_token_key "
+        "UNIQUE USING INDEX songs_legacy_track_token_created_at"
+    )
+    for column, _ in SONG_FOREIGN_KEYS:
+        op.execute(
+            f"ALTER TABLE songs_legacy RENAME CONSTRAINT songs_{column}_fkey "
+            f"TO songs_legacy_{column}_fkey"
+        )
+    for suffix, name in SONG_INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO songs_legacy_{suffix}")
+
+    op.create_table(
+        'songs',
+        sa.Column(
+            'id',
+            sa.Integer(),
+            server_default=sa.text("nextval('songs_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('receiver_id', sa.Integer(), nullable=False),
+        sa.Column('connection_id', sa.Integer(), nullable=False),
+        sa.Column('link', sa.String(), nullable=False),
+        sa.Column('track_token', sa.String(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('listened_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('clicked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_reminded_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('reminder_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('canonical_id', sa.String(), nullable=True),
+        *(
+            sa.ForeignKeyConstraint(
+                [column], [f'{table}.id'], name=f'songs_{column}_fkey'
+            )
+            for column, table in SONG_FOREIGN_KEYS
+        ),
+        sa.PrimaryKeyConstraint('id', 'created_at', name='songs_pkey'),
+        sa.UniqueConstraint('track_token', 'created_at', name='uq_songs_track_token'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    _create_song_indexes()
+
+    op.execute("ALTER SEQUENCE songs_id_seq OWNED BY songs.id")
+    op.alter_column('songs_legacy', 'id', server_default=None)
+
+    # Matching indexes and foreign keys of songs_legacy are adopted as the
+    # partition's own, and the CHECK spares the range scan.
+    op.execute(
+        "ALTER TABLE songs ATTACH PARTITION songs_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{bound}')"
+    )
+    op.drop_constraint(
+        'songs_legacy_created_at_check', 'songs_legacy', type_='check'
+    )
+
+    for i in range(MONTHS_AHEAD + 1):
+        month = _add_months(cutover, i)
+        op.execute(
+            f"CREATE TABLE songs_y{month.year:04d}m{month.month:02d} "
+            f"PARTITION OF songs FOR VALUES FROM ('{month.isoformat()} 00:00+00') "
+            f"TO ('{_add_months(month, 1).isoformat()} 00:00+00')"
+        )
+    # Catches rows past the last month if maintenance falls behind.
+    op.execute("CREATE TABLE songs_default PARTITION OF songs DEFAULT")
+
+    op.create_table(
+        'songs_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('receiver_id', sa.Integer(), nullable=False),
+        sa.Column('connection_id', sa.Integer(), nullable=False),
+        sa.Column('link', sa.String(), nullable=False),
+        sa.Column('canonical_id', sa.String(), nullable=True),
+        sa.Column('track_token', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('listened_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('clicked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_reminded_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('reminder_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column(
+            'archived_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['connection_id'], ['connections.id']),
+        sa.ForeignKeyConstraint(['receiver_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_songs_archive_track_token', 'songs_archive', ['track_token'], unique=True
+    )
+
+    op.add_column(
+        'connections',
+        sa.Column('songs_archived_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_connections_archive_due',
+            'connections',
+            ['disconnected_at'],
+            postgresql_where=sa.text(
+                "status = 'DISCONNECTED' AND songs_archived_at IS NULL"
+            ),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_connections_archive_due',
+        table_name='connections',
+        postgresql_where=sa.text(
+            "status = 'DISCONNECTED' AND songs_archived_at IS NULL"
+        ),
+    )
+    op.drop_column('connections', 'songs_archived_at')
+
+    # Back to one plain table, archived songs included. This copies every row
+    # under an exclusive lock, so it is meant for rolling back, not for live
+    # traffic.
+    columns = (
+        'id, sender_id, receiver_id, connection_id, link, track_token, created_at, '
+        'listened_at, clicked_at, last_reminded_at, reminder_count, canonical_id'
+    )
+    op.execute("CREATE TABLE songs_unpartitioned (LIKE songs INCLUDING DEFAULTS)")
+    op.execute(
+        f"INSERT INTO songs_unpartitioned ({columns}) "
+        f"SELECT {columns} FROM songs "
+        f"UNION ALL SELECT {columns} FROM songs_archive"
+    )
+    op.execute("ALTER SEQUENCE songs_id_seq OWNED BY NONE")
+    op.drop_index('ix_songs_archive_track_token', table_name='songs_archive')
+    op.drop_table('songs_archive')
+    op.drop_table('songs')
+    op.rename_table('songs_unpartitioned', 'songs')
+    op.execute("ALTER SEQUENCE songs_id_seq OWNED BY songs.id")
+
+    op.create_primary_key('songs_pkey', 'songs', ['id'])
+    op.create_unique_constraint('songs_track_token_key', 'songs', ['track_token'])
+    for column, table in SONG_FOREIGN_KEYS:
+        op.create_foreign_key(
+            f'songs_{column}_fkey', 'songs', table, [column], ['id']
+        )
+    _create_song_indexes()
@@ -0,0 +1,39 @@
+"""add_song_history_index
+
+Revision ID: 54c5d314a237
+Revises: 45d7fde65e50
+Create Date: 2026-10-17 08:02:49.055993
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '54c5d314a237'
+down_revision: Union[str, Sequence[str], None] = '45d7fde65e50'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_songs_connection_created',
+            'songs',
+            ['connection_id', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_songs_connection_created',
+            table_name='songs',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,45 @@
+"""add_song_canonical_id
+
+Revision ID: 7978f6396afa
+Revises: 0e5cf42f9e34
+Create Date: 2026-10-17 07:53:17.815021
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7978f6396afa'
+down_revision: Union[str, Sequence[str], None] = '0e5cf42f9e34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable, no default: metadata-only. Existing rows keep NULL and are
+    # simply never matched as duplicates.
+    op.add_column('songs', sa.Column('canonical_id', sa.String(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_songs_connection_canonical',
+            'songs',
+            ['connection_id', 'canonical_id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_songs_connection_canonical',
+            table_name='songs',
+            postgresql_concurrently=True,
+        )
+
+    op.drop_column('songs', 'canonical_id')
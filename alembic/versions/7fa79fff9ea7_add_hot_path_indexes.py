@@ -0,0 +1,108 @@
+"""add_hot_path_indexes
+
+Revision ID: 7fa79fff9ea7
+Revises: 47a4b13aaa60
+Create Date: 2026-10-17 07:25:11.383432
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7fa79fff9ea7'
+down_revision: Union[str, Sequence[str], None] = '47a4b13aaa60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so a deploy doesn't lock connections/songs for writes.
+    with op.get_context().autocommit_block():
+        # get_connection / get_or_create_pair_code / leave_connection:
+        # (user1_id = :id OR user2_id = :id) AND status ... -> BitmapOr of both
+        op.create_index(
+            'ix_connections_user1_id_status',
+            'connections',
+            ['user1_id', 'status'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_connections_user2_id_status',
+            'connections',
+            ['user2_id', 'status'],
+            postgresql_concurrently=True,
+        )
+        # Reminder join: only live pairs, small enough to hash from the index.
+        op.create_index(
+            'ix_connections_connected',
+            'connections',
+            ['id'],
+            postgresql_where=sa.text("status = 'CONNECTED'"),
+            postgresql_concurrently=True,
+        )
+        # id -> telegram_id lookups (reminder digests, partner notifications)
+        # without touching the heap.
+        op.create_index(
+            'ix_users_id_telegram_id',
+            'users',
+            ['id'],
+            postgresql_include=['telegram_id'],
+            postgresql_concurrently=True,
+        )
+        # Reminder fan-out: unlistened songs streamed in receiver order,
+        # track_token carried in the index for index-only scans.
+        op.create_index(
+            'ix_songs_unlistened_receiver',
+            'songs',
+            ['receiver_id', 'id'],
+            postgresql_include=['connection_id', 'track_token'],
+            postgresql_where=sa.text('listened_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+        # Reminder join from connected pairs into their unlistened songs.
+        op.create_index(
+            'ix_songs_unlistened_connection',
+            'songs',
+            ['connection_id'],
+            postgresql_where=sa.text('listened_at IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_songs_unlistened_connection',
+            table_name='songs',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_songs_unlistened_receiver',
+            table_name='songs',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_users_id_telegram_id',
+            table_name='users',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_connections_connected',
+            table_name='connections',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_connections_user2_id_status',
+            table_name='connections',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_connections_user1_id_status',
+            table_name='connections',
+            postgresql_concurrently=True,
+        )
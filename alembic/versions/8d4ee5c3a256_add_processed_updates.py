@@ -0,0 +1,38 @@
+"""add_processed_updates
+
+Revision ID: 8d4ee5c3a256
+Revises: 7fa79fff9ea7
+Create Date: 2026-10-17 07:34:00.294934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4ee5c3a256'
+down_revision: Union[str, Sequence[str], None] = '7fa79fff9ea7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'processed_updates',
+        sa.Column('update_id', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column(
+            'received_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint('update_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('processed_updates')
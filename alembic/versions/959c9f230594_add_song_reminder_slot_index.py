@@ -0,0 +1,58 @@
+"""add_song_reminder_slot_index
+
+Revision ID: 959c9f230594
+Revises: 3b4e140753ab
+Create Date: 2026-10-17 08:54:04.327733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '959c9f230594'
+down_revision: Union[str, Sequence[str], None] = '3b4e140753ab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Must match REMINDER_SLOTS in src.database.entities.song.
+REMINDER_SLOTS = 4096
+
+COLUMNS = f"(receiver_id % {REMINDER_SLOTS}), receiver_id, id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY doesn't work on a partitioned table, so the
+    # parent index starts out invalid and each partition's is built
+    # concurrently and attached; the last attach makes the parent valid.
+    partitions = op.get_bind().scalars(
+        sa.text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'songs'::regclass ORDER BY c.relname"
+        )
+    ).all()
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX ix_songs_reminder_slot ON ONLY songs ({COLUMNS}) "
+            "WHERE listened_at IS NULL"
+        )
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY {partition}_reminder_slot "
+                f"ON {partition} ({COLUMNS}) WHERE listened_at IS NULL"
+            )
+            op.execute(
+                "ALTER INDEX ix_songs_reminder_slot "
+                f"ATTACH PARTITION {partition}_reminder_slot"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_songs_reminder_slot', table_name='songs')
@@ -0,0 +1,58 @@
+"""add_reminder_runs
+
+Revision ID: d936ec679e91
+Revises: ed19b783b86b
+Create Date: 2026-10-17 07:44:04.702122
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd936ec679e91'
+down_revision: Union[str, Sequence[str], None] = 'ed19b783b86b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'reminder_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('RUNNING', 'COMPLETED', name='reminder_run_status'),
+            nullable=False,
+        ),
+        sa.Column('trigger', sa.String(), nullable=False),
+        sa.Column('buckets', sa.Integer(), nullable=False),
+        sa.Column('window_seconds', sa.Integer(), nullable=False),
+        sa.Column('buckets_done', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('digests_sent', sa.Integer(), server_default='0', nullable=False),
+        sa.Column(
+            'started_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_reminder_runs_running',
+        'reminder_runs',
+        ['status'],
+        unique=True,
+        postgresql_where=sa.text("status = 'RUNNING'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reminder_runs_running', table_name='reminder_runs')
+    op.drop_table('reminder_runs')
+    sa.Enum(name='reminder_run_status').drop(op.get_bind())
@@ -0,0 +1,54 @@
+"""unique_pending_pair_codes
+
+Revision ID: ed19b783b86b
+Revises: 8d4ee5c3a256
+Create Date: 2026-10-17 07:42:04.098175
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ed19b783b86b'
+down_revision: Union[str, Sequence[str], None] = '8d4ee5c3a256'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Codes are matched exactly from now on, so store them normalized.
+    op.execute(
+        "UPDATE connections SET pair_code = lower(pair_code) "
+        "WHERE pair_code <> lower(pair_code)"
+    )
+
+    # Only joinable (PENDING) codes need to be unique; the global constraint
+    # goes once the partial index that replaces it is in place.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_connections_pending_pair_code',
+            'connections',
+            ['pair_code'],
+            unique=True,
+            postgresql_where=sa.text("status = 'PENDING'"),
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint('connections_pair_code_key', 'connections', type_='unique')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fails if a code has been reused since the upgrade.
+    op.create_unique_constraint(
+        'connections_pair_code_key', 'connections', ['pair_code']
+    )
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_connections_pending_pair_code',
+            table_name='connections',
+            postgresql_concurrently=True,
+        )
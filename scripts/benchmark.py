@@ -0,0 +1,406 @@
+"""
+End-to-end load benchmark.
+
+Seeds the database at DATABASE_URL, starts the fake Bot API from
+scripts.fake_telegram plus the app under uvicorn, then drives two open-loop
+phases at a fixed arrival rate:
+
+  webhook  song links posted to /telegram/webhook by connected users
+  track    /track/{token} clicks on unlistened songs
+
+Each phase waits for the app to drain (updates processed, send queue empty)
+and reports throughput, client latency p50/p95/p99, SQL statements and
+Bot API calls per request. For webhook updates the delivery latency (POST to
+the partner's sendMessage reaching the fake API) is reported as well.
+
+Latency is measured from each request's scheduled start, so a stalled app
+shows up as latency instead of a lower arrival rate.
+
+The target database is TRUNCATEd, so point it at a scratch database:
+
+    DATABASE_URL=postgresql+asyncpg://.../songpal_bench \\
+        python -m scripts.benchmark --rate 50 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+from sqlalchemy import text
+
+from scripts.check_query_plans import seed
+from scripts.fake_telegram import FakeTelegram, start_fake_telegram
+from src.database.core import engine
+
+BOT_TOKEN = "123456:benchmark-token"
+WEBHOOK_SECRET = "benchmark-secret"
+SONG_NOTIFICATION = re.compile(r"^🎵 (.+?) sent you a song!")
+METRIC_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{[^}]*\})? (\S+)$")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(values: list[float]) -> dict[str, float]:
+    return {
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values, default=0.0) * 1000,
+    }
+
+
+def parse_metrics(body: str) -> dict[str, float]:
+    """Sum every series of each metric, ignoring labels."""
+    totals: dict[str, float] = defaultdict(float)
+    for line in body.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            totals[match.group(1)] += float(match.group(2))
+    return totals
+
+
+class Snapshot:
+    def __init__(self, metrics: dict[str, float], fake: FakeTelegram):
+        self.statements = metrics["songpal_db_statement_duration_seconds_count"]
+        self.processed = metrics["songpal_updates_processed"]
+        self.failed = metrics["songpal_updates_failed"]
+        self.send_retried = metrics["songpal_send_retried"]
+        self.send_failed = metrics["songpal_send_failed"]
+        self.bot_calls = sum(fake.calls.values())
+        self.send_calls = fake.calls["sendMessage"]
+
+
+class Benchmark:
+    def __init__(self, client: httpx.AsyncClient, fake: FakeTelegram, args):
+        self.client = client
+        self.fake = fake
+        self.args = args
+        self.update_id = int(time.time() * 1000)
+        # sender first name -> scheduled start of updates awaiting delivery
+        self.pending: dict[str, deque[float]] = defaultdict(deque)
+        self.delivery: list[float] = []
+
+        fake.on_send_message = self._on_send_message
+
+    def _on_send_message(self, params: dict[str, Any]):
+        match = SONG_NOTIFICATION.match(params.get("text", ""))
+        if match and self.pending[match.group(1)]:
+            started = self.pending[match.group(1)].popleft()
+            self.delivery.append(time.perf_counter() - started)
+
+    async def snapshot(self) -> Snapshot:
+        response = await self.client.get("/metrics")
+        return Snapshot(parse_metrics(response.text), self.fake)
+
+    async def drain(self, before: Snapshot, accepted: int) -> float:
+        deadline = time.perf_counter() + self.args.drain_timeout
+        while time.perf_counter() < deadline:
+            metrics = parse_metrics((await self.client.get("/metrics")).text)
+            handled = (
+                metrics["songpal_updates_processed"]
+                + metrics["songpal_updates_failed"]
+                - before.processed
+                - before.failed
+            )
+            sending = (
+                metrics["songpal_send_queue_depth"] + metrics["songpal_send_in_flight"]
+            )
+            if handled >= accepted and not sending:
+                return time.perf_counter()
+            await asyncio.sleep(0.1)
+        print("  drain timed out, results are partial")
+        return time.perf_counter()
+
+    async def drive(
+        self, count: int, request: Callable[[int, float], Awaitable[int]]
+    ) -> tuple[list[float], dict[Any, int], float]:
+        latencies: list[float] = []
+        statuses: dict[Any, int] = defaultdict(int)
+
+        async def run(index: int, scheduled: float):
+            try:
+                status = await request(index, scheduled)
+            except httpx.HTTPError as error:
+                statuses[type(error).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - scheduled)
+            statuses[status] += 1
+
+        started = time.perf_counter()
+        tasks = []
+        for index in range(count):
+            scheduled = started + index / self.args.rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(run(index, scheduled)))
+        await asyncio.gather(*tasks)
+        return latencies, dict(statuses), started
+
+    def report(
+        self,
+        count: int,
+        latencies: list[float],
+        statuses: dict[Any, int],
+        started: float,
+        finished: float,
+        before: Snapshot,
+        after: Snapshot,
+    ) -> dict[str, Any]:
+        completed = len(latencies) or 1
+        return {
+            "requests": count,
+            "statuses": {str(key): value for key, value in statuses.items()},
+            "throughput_rps": len(latencies) / (finished - started),
+            "latency": latency_summary(latencies),
+            "db_statements_per_request": (after.statements - before.statements)
+            / completed,
+            "bot_api_calls_per_request": (after.bot_calls - before.bot_calls)
+            / completed,
+            "send_message_calls": after.send_calls - before.send_calls,
+            "send_retried": after.send_retried - before.send_retried,
+            "send_failed": after.send_failed - before.send_failed,
+            "updates_failed": after.failed - before.failed,
+        }
+
+    async def webhook_phase(self, senders: list[tuple[int, str]]) -> dict[str, Any]:
+        count = int(self.args.rate * self.args.duration)
+
+        async def request(index: int, scheduled: float) -> int:
+            telegram_id, first_name = senders[index % len(senders)]
+            self.update_id += 1
+            update = {
+                "update_id": self.update_id,
+                "message": {
+                    "message_id": index + 1,
+                    "from": {
+                        "id": telegram_id,
+                        "is_bot": False,
+                        "first_name": first_name,
+                        "language_code": "en",
+                    },
+                    "chat": {
+                        "id": telegram_id,
+                        "first_name": first_name,
+                        "type": "private",
+                    },
+                    "date": int(time.time()),
+                    "text": f"https://open.spotify.com/track/{index:022d}",
+                },
+            }
+            self.pending[first_name].append(scheduled)
+            response = await self.client.post(
+                "/telegram/webhook",
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET},
+            )
+            if response.status_code != 200:
+                self.pending[first_name].pop()
+            return response.status_code
+
+        before = await self.snapshot()
+        latencies, statuses, started = await self.drive(count, request)
+        finished = await self.drain(before, statuses.get(200, 0))
+        after = await self.snapshot()
+
+        result = self.report(
+            count, latencies, statuses, started, finished, before, after
+        )
+        result["delivery_latency"] = latency_summary(self.delivery)
+        result["delivered"] = len(self.delivery)
+        return result
+
+    async def track_phase(self, tokens: list[str]) -> dict[str, Any]:
+        count = min(int(self.args.rate * self.args.duration), len(tokens))
+
+        async def request(index: int, scheduled: float) -> int:
+            response = await self.client.get(f"/track/{tokens[index]}")
+            return response.status_code
+
+        before = await self.snapshot()
+        latencies, statuses, started = await self.drive(count, request)
+        finished = await self.drain(before, 0)
+        after = await self.snapshot()
+        return self.report(count, latencies, statuses, started, finished, before, after)
+
+
+async def load_workload(senders: int, clicks: int) -> tuple[list, list[str]]:
+    async with engine.connect() as conn:
+        sender_rows = (
+            await conn.execute(
+                text(
+                    """
+                    SELECT DISTINCT ON (u.id) u.telegram_id, u.first_name
+                    FROM connections AS c
+                    JOIN users AS u ON u.id = c.user1_id
+                    WHERE c.status = 'CONNECTED'
+                    ORDER BY u.id
+                    LIMIT :limit
+                    """
+                ),
+                {"limit": senders},
+            )
+        ).all()
+        tokens = (
+            await conn.execute(
+                text(
+                    "SELECT track_token FROM songs WHERE listened_at IS NULL "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"limit": clicks},
+            )
+        ).scalars().all()
+    await engine.dispose()
+    return [tuple(row) for row in sender_rows], list(tokens)
+
+
+def start_app(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "TELEGRAM_TOKEN": BOT_TOKEN,
+        "TELEGRAM_API_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "TELEGRAM_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "TELEGRAM_GLOBAL_RATE": str(args.telegram_rate),
+        "API_BASE_URL": f"http://127.0.0.1:{args.port}",
+    }
+    log = open(args.app_log, "w") if args.app_log else subprocess.DEVNULL
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, app: subprocess.Popen, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if app.poll() is not None:
+            raise RuntimeError(f"App exited with code {app.returncode}")
+        try:
+            response = await client.get("/")
+            if response.status_code == 200 and response.json().get("ready"):
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("App did not become ready in time")
+
+
+def git_commit() -> dict[str, Any]:
+    def git(*command: str) -> str:
+        return subprocess.run(
+            ["git", *command], capture_output=True, text=True
+        ).stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+async def main(args) -> int:
+    if not args.skip_seed:
+        print(f"Seeding {args.users} users, {args.connections} connections, {args.songs} songs...")
+        await seed(args.users, args.connections, args.songs)
+    senders, tokens = await load_workload(
+        args.senders, int(args.rate * args.duration)
+    )
+
+    fake, runner = await start_fake_telegram(
+        "127.0.0.1",
+        args.fake_port,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+    )
+    app = start_app(args)
+
+    results: dict[str, Any] = {}
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}",
+            limits=httpx.Limits(max_connections=args.max_connections),
+            timeout=args.request_timeout,
+        ) as client:
+            await wait_ready(client, app, timeout=30)
+            benchmark = Benchmark(client, fake, args)
+
+            for phase in args.phases:
+                print(f"Running {phase} phase at {args.rate}/s for {args.duration}s...")
+                if phase == "webhook":
+                    results[phase] = await benchmark.webhook_phase(senders)
+                else:
+                    results[phase] = await benchmark.track_phase(tokens)
+                print(json.dumps(results[phase], indent=2))
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        await runner.cleanup()
+
+    report = {
+        **git_commit(),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "results": results,
+    }
+    output = Path(args.output or f"benchmarks/{report['commit'][:12]}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--phases", nargs="+", choices=("webhook", "track"), default=["webhook", "track"]
+    )
+    parser.add_argument("--rate", type=float, default=20.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per phase")
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--connections", type=int, default=40_000)
+    parser.add_argument("--songs", type=int, default=400_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--senders", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=30.0, help="fake Bot API latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake 429 rate")
+    parser.add_argument("--telegram-rate", type=float, default=30.0, help="TELEGRAM_GLOBAL_RATE")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=8766)
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--app-log", help="write the app's output here")
+    parser.add_argument("--output", help="defaults to benchmarks/<commit>.json")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,390 @@
+"""
+Query plan regression check.
+
+Seeds a large synthetic dataset into the database at DATABASE_URL, drives every
+service method against it, captures the SQL they emit and runs each statement
+through EXPLAIN (FORMAT JSON). Exits non-zero if any plan falls back to a
+sequential scan.
+
+Plans are taken with enable_seqscan off, so a Seq Scan that survives means no
+index can serve the query at all, rather than the planner preferring a cheap
+hash over a small synthetic table.
+
+The target database is TRUNCATEd, so point it at a scratch database:
+
+    DATABASE_URL=postgresql+asyncpg://.../songpal_plans \\
+        python -m scripts.check_query_plans --users 50000 --songs 500000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.enums import ConnectionStatus
+from src.database.core import AsyncSessionLocal, engine
+from src.modules.connections.service import ConnectionService
+from src.modules.maintenance.service import MaintenanceService
+from src.modules.notifications.service import NotificationService
+from src.modules.songs.model import SendSongData
+from src.modules.songs.service import SongService
+from src.modules.stats.service import StatsService
+from src.modules.users.model import UserData
+from src.modules.users.cache import IdentityCache
+from src.modules.users.service import UserService
+
+# Scans that are expected until the query itself is reworked.
+KNOWN_SEQ_SCANS: dict[str, str] = {}
+
+SEED_STATEMENTS = (
+    "TRUNCATE songs, songs_archive, connections, users RESTART IDENTITY CASCADE",
+    """
+INSERT INTO users (telegram_id, first_name)
+SELECT 100000000 + g, 'user' || g FROM generate_series(1, :users) AS g
+""",
+    """
+-- Every user pair has a long history of disconnected connections, only the
+-- newest ~10% are live and a few are still waiting for a partner.
+INSERT INTO connections (user1_id, user2_id, pair_code, status, created_at,
+                         connected_at, disconnected_at)
+SELECT u1, CASE WHEN status = 'PENDING' THEN NULL ELSE u2 END,
+       'p' || g, status::connection_status,
+       now() - (:connections - g) * interval '1 minute',
+       CASE WHEN status = 'PENDING' THEN NULL ELSE now() END,
+       CASE WHEN status = 'DISCONNECTED' THEN now() END
+FROM (
+    SELECT g,
+           ((g * 2 - 2) % :users) + 1 AS u1,
+           ((g * 2 - 1) % :users) + 1 AS u2,
+           CASE
+               WHEN g > :connections - :connections / 10 THEN 'CONNECTED'
+               WHEN g > :connections - :connections / 10 - :connections / 100
+                   THEN 'PENDING'
+               ELSE 'DISCONNECTED'
+           END AS status
+    FROM generate_series(1, :connections) AS g
+) AS seed
+""",
+    """
+-- Most songs have been listened to, the unlistened tail is what reminders hit.
+-- Half the tokens carry their issue day (generate_track_token), half are in
+-- the older undated form.
+INSERT INTO songs (sender_id, receiver_id, connection_id, link, canonical_id,
+                   track_token, created_at, clicked_at, listened_at)
+SELECT c.user1_id, coalesce(c.user2_id, c.user1_id), c.id,
+       'https://open.spotify.com/track/' || lpad(s.g::text, 22, '0'),
+       'spotify:track:' || lpad(s.g::text, 22, '0'),
+       CASE WHEN s.g % 2 = 0
+           THEN to_hex(current_date - date '0001-01-01' + 1) || '.tok' || s.g
+           ELSE 'tok' || s.g
+       END,
+       now() - s.g * interval '1 second',
+       CASE WHEN s.g % 20 <> 0 THEN now() END,
+       CASE WHEN s.g % 20 <> 0 THEN now() END
+FROM generate_series(1, :songs) AS s(g)
+JOIN connections AS c ON c.id = (s.g % :connections) + 1
+""",
+    """
+INSERT INTO connection_stats (connection_id, sender_id, songs_sent, songs_listened)
+SELECT connection_id, sender_id, count(*), count(listened_at)
+FROM songs
+GROUP BY connection_id, sender_id
+""",
+)
+
+
+class _NullSendScheduler:
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any):
+        return None
+
+
+class PlanCapture:
+    """Records every statement executed while a scenario is running."""
+
+    def __init__(self):
+        self.label: str | None = None
+        self.statements: list[tuple[str, str, Any]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label is None or executemany:
+            return
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            self.statements.append((self.label, statement, parameters))
+
+
+def find_seq_scans(
+    plan: dict[str, Any], partial_indexes: set[str], empty_relations: set[str]
+) -> list[str]:
+    """
+    Collect relations read in full: plain Seq Scans, plus index scans with no
+    Index Cond over a non-partial index (the planner's way of walking a whole
+    table in index order once seq scans are disabled). Empty relations, such
+    as partitions for months to come, cost nothing to read and are skipped.
+    """
+    found = []
+    node_type = plan.get("Node Type")
+    relation = plan.get("Relation Name", "?")
+    if relation in empty_relations:
+        pass
+    elif node_type == "Seq Scan":
+        found.append(relation)
+    elif (
+        node_type in ("Index Scan", "Index Only Scan")
+        and "Index Cond" not in plan
+        and plan.get("Index Name") not in partial_indexes
+    ):
+        found.append(f"{relation} via {plan.get('Index Name')}")
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child, partial_indexes, empty_relations))
+    return found
+
+
+async def seed(users: int, connections: int, songs: int):
+    async with engine.begin() as conn:
+        for statement in SEED_STATEMENTS:
+            await conn.execute(
+                text(statement),
+                {"users": users, "connections": connections, "songs": songs},
+            )
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(
+            text(
+                "VACUUM ANALYZE users, connections, songs, songs_archive, "
+                "connection_stats"
+            )
+        )
+
+
+async def build_scenarios(
+    db: AsyncSession,
+) -> list[tuple[str, Callable[[], Awaitable[Any]]]]:
+    row = (
+        await db.execute(
+            text(
+                "SELECT c.id, c.user1_id, c.user2_id, u.telegram_id "
+                "FROM connections c JOIN users u ON u.id = c.user1_id "
+                "WHERE c.status = 'CONNECTED' ORDER BY c.id DESC LIMIT 1"
+            )
+        )
+    ).one()
+    connection_id, user_id, partner_id, telegram_id = row
+
+    pending = (
+        await db.execute(
+            text(
+                "SELECT user1_id, pair_code FROM connections "
+                "WHERE status = 'PENDING' ORDER BY id DESC LIMIT 1"
+            )
+        )
+    ).one()
+    pending_owner_id, pending_code = pending
+
+    track_token = (
+        await db.execute(
+            text("SELECT track_token FROM songs WHERE listened_at IS NULL LIMIT 1")
+        )
+    ).scalar_one()
+    undated_track_token = (
+        await db.execute(
+            text("SELECT track_token FROM songs WHERE track_token NOT LIKE '%.%' LIMIT 1")
+        )
+    ).scalar_one()
+
+    history_cursor = (
+        await db.execute(
+            text(
+                "SELECT created_at, id FROM songs WHERE connection_id = :id "
+                "ORDER BY created_at, id LIMIT 1"
+            ),
+            {"id": connection_id},
+        )
+    ).one()
+    history_cursor = tuple(history_cursor)
+
+    # No caching, so every lookup reaches the database.
+    users = UserService(db, IdentityCache(maxsize=0))
+    connections = ConnectionService(db)
+    songs = SongService(db)
+    notifications = NotificationService(db, _NullSendScheduler())  # type: ignore[arg-type]
+    stats = StatsService(db)
+    maintenance = MaintenanceService(db)
+
+    return [
+        (
+            "UserService.get_or_create_user",
+            lambda: users.get_or_create_user(
+                UserData(telegram_id=telegram_id, first_name="user")
+            ),
+        ),
+        (
+            "UserService.get_user_by_telegram_id",
+            lambda: users.get_user_by_telegram_id(telegram_id),
+        ),
+        ("UserService.get_user_by_id", lambda: users.get_user_by_id(partner_id)),
+        (
+            "ConnectionService.get_connection",
+            lambda: connections.get_connection(user_id, ConnectionStatus.CONNECTED),
+        ),
+        (
+            "ConnectionService.get_or_create_pair_code",
+            lambda: connections.get_or_create_pair_code(pending_owner_id),
+        ),
+        (
+            "SongService.send_song",
+            lambda: songs.send_song(
+                SendSongData(
+                    sender_id=user_id,
+                    receiver_id=partner_id,
+                    connection_id=connection_id,
+                    link="https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC",
+                )
+            ),
+        ),
+        ("SongService.click_song", lambda: songs.click_song(track_token)),
+        ("SongService.click_song", lambda: songs.click_song(undated_track_token)),
+        (
+            "SongService.get_archived_link",
+            lambda: songs.get_archived_link(track_token),
+        ),
+        ("SongService.get_history", lambda: songs.get_history(connection_id)),
+        (
+            "SongService.get_history",
+            lambda: songs.get_history(connection_id, history_cursor, newer=True),
+        ),
+        (
+            "StatsService.get_pair_stats",
+            lambda: stats.get_pair_stats(connection_id, user_id, partner_id),
+        ),
+        (
+            "NotificationService.send_unlistened_songs_notification",
+            notifications.send_unlistened_songs_notification,
+        ),
+        (
+            "NotificationService.send_unlistened_songs_notification",
+            lambda: notifications.send_unlistened_songs_notification(3, 96),
+        ),
+        ("MaintenanceService.ensure_partitions", maintenance.ensure_partitions),
+        (
+            "MaintenanceService.archive_songs",
+            lambda: maintenance.archive_songs(retention_days=0),
+        ),
+        ("ConnectionService.leave_connection", lambda: connections.leave_connection(user_id)),
+        (
+            "ConnectionService.join_connection",
+            lambda: connections.join_connection(user_id, pending_code),
+        ),
+    ]
+
+
+@dataclass(slots=True, frozen=True)
+class PlanCheck:
+    label: str
+    statement: str
+    seq_scans: list[str]
+
+    @property
+    def regression(self) -> bool:
+        return bool(self.seq_scans) and self.label not in KNOWN_SEQ_SCANS
+
+
+async def check_plans() -> list[PlanCheck]:
+    """
+    Run every scenario against the seeded database and EXPLAIN each statement
+    it issued. The writes are committed, so seed() again before another run.
+    """
+    capture = PlanCapture()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSessionLocal() as db:
+            for label, scenario in await build_scenarios(db):
+                capture.label = label
+                await scenario()
+                capture.label = None
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    checks = []
+    async with engine.connect() as conn:
+        await conn.execute(text("SET enable_seqscan = off"))
+        partial_indexes = set(
+            (
+                await conn.execute(
+                    text(
+                        "SELECT indexname FROM pg_indexes "
+                        "WHERE schemaname = 'public' AND indexdef LIKE '% WHERE %'"
+                    )
+                )
+            ).scalars()
+        )
+
+        # Up to date, since seed() vacuumed everything it filled.
+        empty_relations = set(
+            (
+                await conn.execute(
+                    text(
+                        "SELECT relname FROM pg_class "
+                        "WHERE relnamespace = 'public'::regnamespace "
+                        "AND relkind = 'r' AND relpages = 0"
+                    )
+                )
+            ).scalars()
+        )
+
+        for label, statement, parameters in capture.statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            checks.append(
+                PlanCheck(
+                    label,
+                    statement,
+                    find_seq_scans(plan[0]["Plan"], partial_indexes, empty_relations),
+                )
+            )
+        await conn.rollback()
+
+    return checks
+
+
+async def main(users: int, connections: int, songs: int) -> int:
+    print(f"Seeding {users} users, {connections} connections, {songs} songs...")
+    await seed(users, connections, songs)
+
+    checks = await check_plans()
+    await engine.dispose()
+
+    for check in checks:
+        if not check.seq_scans:
+            status = "ok"
+        elif not check.regression:
+            status = (
+                f"known seq scan on {', '.join(check.seq_scans)} "
+                f"({KNOWN_SEQ_SCANS[check.label]})"
+            )
+        else:
+            status = f"SEQ SCAN on {', '.join(check.seq_scans)}"
+
+        print(f"[{status}] {check.label}: {' '.join(check.statement.split())[:120]}")
+
+    failures = sum(check.regression for check in checks)
+    print(f"{len(checks)} statements checked, {failures} regressions")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--connections", type=int, default=40_000)
+    parser.add_argument("--songs", type=int, default=400_000)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.users, args.connections, args.songs)))
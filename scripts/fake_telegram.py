@@ -0,0 +1,121 @@
+"""
+Local stand-in for the Telegram Bot API, for benchmarks.
+
+Answers getMe, getWebhookInfo, setWebhook and sendMessage at
+`/bot<token>/<method>` with a configurable latency, and injects 429
+"retry after" responses at a configurable rate. Counts calls per method.
+
+    python -m scripts.fake_telegram --port 8081 --latency-ms 30 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from aiohttp import web
+
+
+class FakeTelegram:
+    def __init__(
+        self, latency_ms: float = 0.0, error_rate: float = 0.0, retry_after: int = 1
+    ):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+        self.calls: Counter[str] = Counter()
+        self.rate_limited: Counter[str] = Counter()
+        self.webhook_url = ""
+        self._message_id = 0
+        # Called with the params of every successful sendMessage.
+        self.on_send_message: Optional[Callable[[dict[str, Any]], None]] = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+        self.app.router.add_get("/bot{token}/{method}", self.handle)
+        self.app.router.add_get("/stats", self.handle_stats)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params: dict[str, Any] = dict(await request.post())
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "sendMessage" and random.random() < self.error_rate:
+            self.rate_limited[method] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+            )
+
+        handler = getattr(self, f"_{method}", None)
+        if handler is None:
+            return web.json_response({"ok": True, "result": True})
+        return web.json_response({"ok": True, "result": handler(params)})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict[str, Any]:
+        return {"calls": dict(self.calls), "rate_limited": dict(self.rate_limited)}
+
+    def _getMe(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+    def _getWebhookInfo(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "url": self.webhook_url,
+            "has_custom_certificate": False,
+            "pending_update_count": 0,
+        }
+
+    def _setWebhook(self, params: dict[str, Any]) -> bool:
+        self.webhook_url = params.get("url", "")
+        return True
+
+    def _sendMessage(self, params: dict[str, Any]) -> dict[str, Any]:
+        self._message_id += 1
+        if self.on_send_message:
+            self.on_send_message(params)
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+
+async def start_fake_telegram(
+    host: str, port: int, **kwargs: Any
+) -> tuple[FakeTelegram, web.AppRunner]:
+    fake = FakeTelegram(**kwargs)
+    runner = web.AppRunner(fake.app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return fake, runner
+
+
+async def main(host: str, port: int, latency_ms: float, error_rate: float):
+    await start_fake_telegram(host, port, latency_ms=latency_ms, error_rate=error_rate)
+    print(f"Fake Telegram Bot API listening on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.host, args.port, args.latency_ms, args.error_rate))
@@ -8,16 +8,152 @@ load_dotenv()
 TELEGRAM_TOKEN: Final[str | None] = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_BOT_USERNAME: Final[str | None] = f"@{os.getenv('TELEGRAM_BOT_USERNAME')}"
 DATABASE_URL: Final[str | None] = os.getenv("DATABASE_URL")
+# Optional streaming replica; read-only service methods are routed to it.
+DATABASE_REPLICA_URL: Final[str | None] = os.getenv("DATABASE_REPLICA_URL") or None
 
 
 API_BASE_URL: Final[str | None] = os.getenv("API_BASE_URL")
 
 WEBHOOK_URL: Final[str] = f"{API_BASE_URL}/telegram/webhook"
 
-SONG_LINK_PATTERN: Final[str] = (
-    r"https?://(?:open\.spotify\.com|youtu\.be|youtube\.com)[^\s]*"
+# Links shared from one message (one notification has to fit them all)
+SONG_MAX_LINKS_PER_MESSAGE: Final[int] = int(
+    os.getenv("SONG_MAX_LINKS_PER_MESSAGE", "20")
 )
+# Songs per /history page
+HISTORY_PAGE_SIZE: Final[int] = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
 
 TELEGRAM_WEBHOOK_SECRET: Final[str | None] = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+# Concurrent webhook connections Telegram may open (1-100; Telegram's default is 40)
+TELEGRAM_WEBHOOK_MAX_CONNECTIONS: Final[int] = int(
+    os.getenv("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "40")
+)
+
+# Alternative Bot API server (self-hosted telegram-bot-api, or the benchmark fake)
+TELEGRAM_API_BASE_URL: Final[str | None] = os.getenv("TELEGRAM_API_BASE_URL")
 
 CRON_JOB_SECRET: Final[str | None] = os.getenv("CRON_JOB_SECRET")
+
+# Outbound Bot API pacing (Telegram allows ~30 msg/s overall, ~1 msg/s per chat)
+TELEGRAM_GLOBAL_RATE: Final[float] = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_PER_CHAT_RATE: Final[float] = float(os.getenv("TELEGRAM_PER_CHAT_RATE", "1"))
+TELEGRAM_PER_CHAT_BURST: Final[float] = float(
+    os.getenv("TELEGRAM_PER_CHAT_BURST", "3")
+)
+TELEGRAM_SEND_CONCURRENCY: Final[int] = int(
+    os.getenv("TELEGRAM_SEND_CONCURRENCY", "16")
+)
+TELEGRAM_SEND_MAX_RETRIES: Final[int] = int(
+    os.getenv("TELEGRAM_SEND_MAX_RETRIES", "3")
+)
+
+# Partner notifications ("sent you a song", "is listening") for the same chat
+# are merged into one message: sent NOTIFY_DEBOUNCE seconds after the last of
+# a burst, but no later than NOTIFY_MAX_WAIT after its first (0: no merging).
+NOTIFY_DEBOUNCE: Final[float] = float(os.getenv("NOTIFY_DEBOUNCE", "2"))
+NOTIFY_MAX_WAIT: Final[float] = float(os.getenv("NOTIFY_MAX_WAIT", "10"))
+
+# Reminder fan-out
+REMINDER_FETCH_SIZE: Final[int] = int(os.getenv("REMINDER_FETCH_SIZE", "1000"))
+REMINDER_SEND_CONCURRENCY: Final[int] = int(
+    os.getenv("REMINDER_SEND_CONCURRENCY", "32")
+)
+
+# Reminder runs: receivers are split into REMINDER_BUCKETS hash buckets sent
+# one slot apart across REMINDER_INTERVAL seconds, each slot jittered by up to
+# REMINDER_JITTER of its length. REMINDER_SCHEDULER starts a run every
+# interval in-process; otherwise runs only start from the cron endpoint.
+REMINDER_SCHEDULER: Final[bool] = os.getenv("REMINDER_SCHEDULER", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+REMINDER_INTERVAL: Final[int] = int(os.getenv("REMINDER_INTERVAL", "86400"))
+REMINDER_BUCKETS: Final[int] = int(os.getenv("REMINDER_BUCKETS", "96"))
+REMINDER_JITTER: Final[float] = float(os.getenv("REMINDER_JITTER", "0.5"))
+REMINDER_POLL_INTERVAL: Final[float] = float(
+    os.getenv("REMINDER_POLL_INTERVAL", "30")
+)
+
+# Per-song reminder limits: a song is re-reminded at most REMINDER_MAX_PER_SONG
+# times, no more often than every REMINDER_COOLDOWN seconds (below the interval
+# so jittered slots don't skip a run), and a digest lists REMINDER_MAX_LINKS.
+REMINDER_MAX_PER_SONG: Final[int] = int(os.getenv("REMINDER_MAX_PER_SONG", "5"))
+REMINDER_COOLDOWN: Final[int] = int(
+    os.getenv("REMINDER_COOLDOWN", str(REMINDER_INTERVAL // 2))
+)
+REMINDER_MAX_LINKS: Final[int] = int(os.getenv("REMINDER_MAX_LINKS", "10"))
+
+# Table maintenance, run on startup and every MAINTENANCE_INTERVAL seconds by
+# whichever worker holds the maintenance lock: monthly `songs` partitions are
+# created SONG_PARTITIONS_AHEAD months ahead. Songs of connections disconnected
+# more than SONG_ARCHIVE_RETENTION days ago move to `songs_archive`,
+# SONG_ARCHIVE_BATCH_SIZE connections per transaction (0 days: never), on those
+# passes only with SONG_ARCHIVE_SCHEDULER (opt-in), otherwise from the cron
+# endpoint.
+SONG_ARCHIVE_SCHEDULER: Final[bool] = os.getenv(
+    "SONG_ARCHIVE_SCHEDULER", ""
+).lower() in ("1", "true", "yes")
+MAINTENANCE_INTERVAL: Final[int] = int(os.getenv("MAINTENANCE_INTERVAL", "3600"))
+SONG_PARTITIONS_AHEAD: Final[int] = int(os.getenv("SONG_PARTITIONS_AHEAD", "2"))
+SONG_ARCHIVE_RETENTION: Final[int] = int(os.getenv("SONG_ARCHIVE_RETENTION", "30"))
+SONG_ARCHIVE_BATCH_SIZE: Final[int] = int(
+    os.getenv("SONG_ARCHIVE_BATCH_SIZE", "100")
+)
+
+# Pair code allocation: attempts before giving up on collisions
+PAIR_CODE_MAX_ATTEMPTS: Final[int] = int(os.getenv("PAIR_CODE_MAX_ATTEMPTS", "5"))
+
+# In-process user identity cache
+USER_CACHE_SIZE: Final[int] = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL: Final[float] = float(os.getenv("USER_CACHE_TTL", "300"))
+
+# In-process cache of active (CONNECTED) pairs, kept coherent across workers
+# by the LISTEN/NOTIFY invalidation bus; the TTL bounds staleness without it.
+CONNECTION_CACHE_SIZE: Final[int] = int(os.getenv("CONNECTION_CACHE_SIZE", "10000"))
+CONNECTION_CACHE_TTL: Final[float] = float(os.getenv("CONNECTION_CACHE_TTL", "60"))
+CACHE_INVALIDATION: Final[bool] = os.getenv(
+    "CACHE_INVALIDATION", "true"
+).lower() in ("1", "true", "yes")
+
+# Write-behind click tracking (opt-in)
+CLICK_WRITE_BEHIND: Final[bool] = os.getenv("CLICK_WRITE_BEHIND", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+CLICK_FLUSH_INTERVAL_MS: Final[int] = int(os.getenv("CLICK_FLUSH_INTERVAL_MS", "500"))
+CLICK_FLUSH_MAX_EVENTS: Final[int] = int(os.getenv("CLICK_FLUSH_MAX_EVENTS", "1000"))
+# Failed flushes a click survives before it is dropped (and counted)
+CLICK_FLUSH_MAX_ATTEMPTS: Final[int] = int(os.getenv("CLICK_FLUSH_MAX_ATTEMPTS", "10"))
+# Listened songs per worker whose clicks skip the lookup query
+CLICK_LISTENED_CACHE_SIZE: Final[int] = int(
+    os.getenv("CLICK_LISTENED_CACHE_SIZE", "10000")
+)
+
+# Webhook ingestion: updates are sharded by chat across WEBHOOK_SHARDS workers
+WEBHOOK_SHARDS: Final[int] = int(os.getenv("WEBHOOK_SHARDS", "32"))
+WEBHOOK_SHARD_QUEUE_SIZE: Final[int] = int(
+    os.getenv("WEBHOOK_SHARD_QUEUE_SIZE", "100")
+)
+WEBHOOK_ENQUEUE_TIMEOUT: Final[float] = float(
+    os.getenv("WEBHOOK_ENQUEUE_TIMEOUT", "2")
+)
+
+# Webhook update_id deduplication
+UPDATE_DEDUP_SIZE: Final[int] = int(os.getenv("UPDATE_DEDUP_SIZE", "10000"))
+UPDATE_DEDUP_DB: Final[bool] = os.getenv("UPDATE_DEDUP_DB", "").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Database connection pool
+DB_POOL_SIZE: Final[int] = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW: Final[int] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE: Final[int] = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT: Final[float] = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# "always" pings on every checkout, "never" relies on DB_POOL_RECYCLE instead.
+DB_POOL_PRE_PING: Final[str] = os.getenv("DB_POOL_PRE_PING", "always")
+# asyncpg prepared statement cache (set to 0 behind pgbouncer transaction mode)
+DB_STATEMENT_CACHE_SIZE: Final[int] = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
@@ -5,3 +5,13 @@ class ConnectionStatus(str, Enum):
     PENDING = "pending"
     CONNECTED = "connected"
     DISCONNECTED = "disconnected"
+
+
+class ReminderRunStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+
+class SongProvider(str, Enum):
+    SPOTIFY = "spotify"
+    YOUTUBE = "youtube"
@@ -8,6 +8,11 @@ class InvalidPairCodeError(Exception):
         super().__init__("Invalid or expired pair code.")
 
 
+class PairCodeUnavailableError(Exception):
+    def __init__(self):
+        super().__init__("Couldn't generate a pair code, please try again.")
+
+
 class ConnectionNotFoundError(Exception):
     def __init__(self):
         super().__init__("You're not paired")
@@ -0,0 +1,203 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Sequence
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# (metric name, labels, value) tuples yielded by collectors for live gauges.
+Sample = tuple[str, dict[str, Any], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[Any]) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels: Any):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self._values.items():
+            names = self.labelnames + ("le",)
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {series[-1]}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+
+class Registry:
+    """
+    Holds counters/histograms plus collector callbacks that report live gauges
+    (queue depths, pool usage, ...) at scrape time. Renders Prometheus text.
+    """
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        typed: set[str] = set()
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} gauge")
+                lines.append(
+                    f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HANDLER_DURATION = registry.histogram(
+    "songpal_handler_duration_seconds",
+    "aiogram handler latency",
+    ("handler", "status"),
+)
+SERVICE_DURATION = registry.histogram(
+    "songpal_service_duration_seconds",
+    "Service method latency",
+    ("method", "status"),
+)
+DB_STATEMENT_DURATION = registry.histogram(
+    "songpal_db_statement_duration_seconds",
+    "SQL statement execution time",
+    ("statement",),
+)
+DB_ROUTED_STATEMENTS = registry.counter(
+    "songpal_db_routed_statements_total",
+    "SQL statements by the database they were routed to",
+    ("target",),
+)
+BOT_API_DURATION = registry.histogram(
+    "songpal_bot_api_duration_seconds",
+    "Outbound Telegram Bot API call latency",
+    ("method",),
+)
+BOT_API_ERRORS = registry.counter(
+    "songpal_bot_api_errors_total",
+    "Outbound Telegram Bot API call errors",
+    ("method", "error"),
+)
+HTTP_DURATION = registry.histogram(
+    "songpal_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("route", "status"),
+)
+
+
+def instrumented(cls):
+    """
+    Class decorator: time every public coroutine method into
+    SERVICE_DURATION under `ClassName.method`.
+    """
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, name, _timed(f"{cls.__name__}.{name}", method))
+    return cls
+
+
+def _timed(label: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await method(*args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            SERVICE_DURATION.observe(time.perf_counter() - started, label, status)
+
+    return wrapper
@@ -5,7 +5,12 @@ import string
 def generate_pair_code(length: int = 5) -> str:
     """
     Generate a random pair code (5 chars, lowercase + digits).
-    Case-insensitive matching in validation.
+    Input is run through normalize_pair_code before matching.
     """
     alphabet = string.ascii_lowercase + string.digits  # a-z, 0-9
     return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def normalize_pair_code(pair_code: str) -> str:
+    """Canonical stored/looked-up form: codes are matched exactly."""
+    return pair_code.strip().lower()
@@ -1,11 +1,111 @@
+import re
 import secrets
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional
 
 from fastapi import Request
-from src.core.config import API_BASE_URL
+from src.core.config import API_BASE_URL, SONG_MAX_LINKS_PER_MESSAGE
+from src.core.enums import SongProvider
+
+# One pass finds the link and pulls out what identifies the song; whatever
+# follows the id (?si=..., &list=..., t=...) is matched but dropped. Links
+# that name no song or playlist (channels, search, the home page) aren't
+# recognised.
+SONG_LINK_RE = re.compile(
+    r"https?://(?:"
+    r"open\.spotify\.com/(?:intl-[\w-]+/)?"
+    r"(?P<spotify_kind>track|album|playlist|episode|artist)/(?P<spotify_id>[A-Za-z0-9]{22})"
+    r"|(?:www\.|m\.|music\.)?youtube\.com/"
+    r"(?:(?:watch\?(?:[^\s#]*&)?v=|shorts/|embed/|live/)(?P<youtube_id>[\w-]{11})"
+    r"|playlist\?(?:[^\s#]*&)?list=(?P<youtube_list>[\w-]+))"
+    r"|youtu\.be/(?P<youtu_be_id>[\w-]{11})"
+    r")[^\s]*"
+)
+
+
+@dataclass(slots=True, frozen=True)
+class SongLink:
+    """A recognised song link, reduced to what identifies the song."""
+
+    provider: SongProvider
+    canonical_id: str
+    url: str
+
+
+def _to_song_link(match: re.Match) -> SongLink:
+    if match["spotify_id"]:
+        kind, spotify_id = match["spotify_kind"], match["spotify_id"]
+        return SongLink(
+            provider=SongProvider.SPOTIFY,
+            canonical_id=f"spotify:{kind}:{spotify_id}",
+            url=f"https://open.spotify.com/{kind}/{spotify_id}",
+        )
+
+    if match["youtube_list"]:
+        list_id = match["youtube_list"]
+        return SongLink(
+            provider=SongProvider.YOUTUBE,
+            canonical_id=f"youtube:playlist:{list_id}",
+            url=f"https://www.youtube.com/playlist?list={list_id}",
+        )
+
+    video_id = match["youtube_id"] or match["youtu_be_id"]
+    return SongLink(
+        provider=SongProvider.YOUTUBE,
+        canonical_id=f"youtube:{video_id}",
+        url=f"https://www.youtube.com/watch?v={video_id}",
+    )
+
+
+def parse_song_link(url: str) -> Optional[SongLink]:
+    match = SONG_LINK_RE.fullmatch(url.strip())
+    return _to_song_link(match) if match else None
+
+
+def extract_song_links(
+    text: str, limit: int = SONG_MAX_LINKS_PER_MESSAGE
+) -> list[SongLink]:
+    """All song links in `text`, in order and without repeats, at most `limit`."""
+    links: dict[str, SongLink] = {}
+    for match in SONG_LINK_RE.finditer(text):
+        link = _to_song_link(match)
+        links.setdefault(link.canonical_id, link)
+        if len(links) >= limit:
+            break
+    return list(links.values())
+
+
+# How far a song's created_at (database clock) may be from the day in its
+# track token (app clock).
+TRACK_TOKEN_SLACK = timedelta(days=1)
 
 
 def generate_track_token() -> str:
-    return secrets.token_urlsafe(32)
+    """
+    A random token prefixed with its issue day ("<day ordinal, hex>.<random>"),
+    so lookups can be narrowed to the `songs` partitions around that day.
+    """
+    day = datetime.now(timezone.utc).date().toordinal()
+    return f"{day:x}.{secrets.token_urlsafe(32)}"
+
+
+def track_token_window(track_token: str) -> Optional[tuple[datetime, datetime]]:
+    """
+    The created_at range a song with `track_token` falls in, or None for
+    tokens issued before they carried a day.
+    """
+    day, dot, _ = track_token.partition(".")
+    if not dot:
+        return None
+    # Malformed or out-of-range days (anything a client puts in the URL) are
+    # treated like undated tokens rather than raising.
+    try:
+        issued = date.fromordinal(int(day, 16))
+        start = datetime.combine(issued, time.min, tzinfo=timezone.utc)
+        return start - TRACK_TOKEN_SLACK, start + timedelta(days=1) + TRACK_TOKEN_SLACK
+    except (ValueError, OverflowError):
+        return None
 
 
 def generate_track_url(track_token: str) -> str:
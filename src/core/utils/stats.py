@@ -0,0 +1,67 @@
+from bisect import bisect_right
+from typing import Optional, Sequence
+
+# Upper bounds, in seconds, of the time-to-listen histogram buckets; the last
+# bucket is open-ended. Stored histograms depend on these: don't change them
+# without migrating connection_stats.listen_histogram.
+LISTEN_TIME_BUCKETS: tuple[int, ...] = (
+    60,
+    5 * 60,
+    15 * 60,
+    30 * 60,
+    60 * 60,
+    2 * 60 * 60,
+    4 * 60 * 60,
+    8 * 60 * 60,
+    12 * 60 * 60,
+    24 * 60 * 60,
+    2 * 24 * 60 * 60,
+    4 * 24 * 60 * 60,
+    7 * 24 * 60 * 60,
+    14 * 24 * 60 * 60,
+    30 * 24 * 60 * 60,
+)
+
+
+def listen_time_bucket(seconds: float) -> int:
+    """Index of the histogram bucket `seconds` falls into."""
+    return bisect_right(LISTEN_TIME_BUCKETS, seconds)
+
+
+def histogram_quantile(histogram: Sequence[int], q: float) -> Optional[float]:
+    """
+    Estimate the `q` quantile from bucket counts, interpolating linearly
+    inside the bucket it falls in. The open-ended last bucket reports its
+    lower bound.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LISTEN_TIME_BUCKETS[index - 1] if index else 0
+            if index == len(LISTEN_TIME_BUCKETS):
+                return float(lower)
+            upper = LISTEN_TIME_BUCKETS[index]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+
+    return float(LISTEN_TIME_BUCKETS[-1])
+
+
+def format_duration(seconds: float) -> str:
+    """Short human form, e.g. "45s", "12m", "3h 20m", "2d 4h"."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, _ = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m" if minutes else f"{hours}h"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h" if hours else f"{days}d"
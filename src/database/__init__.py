@@ -2,5 +2,20 @@ from .core import Base
 from .entities.user import User
 from .entities.connection import Connection
 from .entities.song import Song
+from .entities.song_archive import SongArchive
+from .entities.processed_update import ProcessedUpdate
+from .entities.reminder_run import ReminderRun
+from .entities.connection_stats import ConnectionStats
+from .entities.webhook_registration import WebhookRegistration
 
-__all__ = ["Base", "User", "Connection", "Song"]
+__all__ = [
+    "Base",
+    "User",
+    "Connection",
+    "Song",
+    "SongArchive",
+    "ProcessedUpdate",
+    "ReminderRun",
+    "ConnectionStats",
+    "WebhookRegistration",
+]
@@ -1,15 +1,126 @@
-from typing import Annotated, AsyncGenerator
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Annotated, Any, AsyncGenerator, Iterator, Optional
 from fastapi import Depends
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from src.core.config import (
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+)
+from src.core.metrics import DB_ROUTED_STATEMENTS
+from src.database.pool import InstrumentedPool, instrument_pool, instrument_statements
+
+# DB_POOL_PRE_PING values and whether they ping on checkout
+POOL_PRE_PING_MODES: dict[str, bool] = {"always": True, "never": False}
+
+
+def parse_pool_pre_ping(mode: str) -> bool:
+    try:
+        return POOL_PRE_PING_MODES[mode.strip().lower()]
+    except KeyError:
+        raise ValueError(
+            f"DB_POOL_PRE_PING must be one of {', '.join(POOL_PRE_PING_MODES)}, "
+            f"got {mode!r}"
+        ) from None
+
+
+pool_pre_ping = parse_pool_pre_ping(DB_POOL_PRE_PING)
+
+engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=pool_pre_ping,
+    connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    echo=False,
+)
+instrument_pool(engine)
+instrument_statements(engine)
+
+replica_engine: Optional[AsyncEngine] = None
+if DATABASE_REPLICA_URL:
+    replica_engine = create_async_engine(
+        DATABASE_REPLICA_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=pool_pre_ping,
+        connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        echo=False,
+    )
+    instrument_statements(replica_engine)
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def use_replica() -> Iterator[None]:
+    """Let plain SELECTs issued inside this block go to the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
 
-from src.core.config import DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, pool_pre_ping=True, echo=False)
+def read_only(method):
+    """Service method decorator: run the method under use_replica()."""
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        with use_replica():
+            return await method(*args, **kwargs)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs issued under use_replica() to the replica, everything else
+    to the primary.
+
+    The first write (or SELECT ... FOR UPDATE) pins the session to the primary
+    for the rest of its life. A session serves one update, so the update always
+    reads what it wrote, whatever the replica lag.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            self.info["pinned"] = True
+        elif (
+            replica_engine is not None
+            and _replica_reads.get()
+            and not self.info.get("pinned")
+        ):
+            DB_ROUTED_STATEMENTS.inc("replica")
+            return replica_engine.sync_engine
+
+        DB_ROUTED_STATEMENTS.inc("primary")
+        return super().get_bind(mapper, clause=clause, **kw)
+
 
 AsyncSessionLocal = async_sessionmaker[AsyncSession](
-    engine, expire_on_commit=False, autoflush=False
+    engine, sync_session_class=RoutingSession, expire_on_commit=False, autoflush=False
 )
 
 
@@ -17,6 +128,32 @@ class Base(DeclarativeBase):
     pass
 
 
+class LazySession:
+    """
+    Stand-in for an AsyncSession that only creates the real session, and so
+    only checks a connection out of the pool, the first time it is used.
+    """
+
+    def __init__(
+        self, factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal
+    ):
+        self._factory = factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def is_used(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
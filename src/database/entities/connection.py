@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, String, Enum as SQLEnum
+from sqlalchemy import DateTime, ForeignKey, Index, String, Enum as SQLEnum, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql.functions import now
 
@@ -11,13 +11,38 @@ from src.database.core import Base
 
 class Connection(Base):
     __tablename__ = "connections"
+    __table_args__ = (
+        Index("ix_connections_user1_id_status", "user1_id", "status"),
+        Index("ix_connections_user2_id_status", "user2_id", "status"),
+        Index(
+            "ix_connections_connected",
+            "id",
+            postgresql_where=text("status = 'CONNECTED'"),
+        ),
+        # Codes only have to be unique while they can still be joined, so the
+        # code space is never exhausted by old connections.
+        Index(
+            "ix_connections_pending_pair_code",
+            "pair_code",
+            unique=True,
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        # Disconnected pairs whose songs are still waiting to be archived.
+        Index(
+            "ix_connections_archive_due",
+            "disconnected_at",
+            postgresql_where=text(
+                "status = 'DISCONNECTED' AND songs_archived_at IS NULL"
+            ),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user1_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     user2_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("users.id"), nullable=True
     )
-    pair_code: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    pair_code: Mapped[str] = mapped_column(String, nullable=False)
     status: Mapped[ConnectionStatus] = mapped_column(
         SQLEnum(ConnectionStatus, name="connection_status"),
         nullable=False,
@@ -32,3 +57,7 @@ class Connection(Base):
     disconnected_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True), nullable=True
     )
+    # Set once the connection's songs have been moved to songs_archive.
+    songs_archived_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
@@ -0,0 +1,39 @@
+from sqlalchemy import BigInteger, Double, ForeignKey, Integer, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.utils.stats import LISTEN_TIME_BUCKETS
+from src.database.core import Base
+
+EMPTY_LISTEN_HISTOGRAM = "'{" + ",".join("0" * (len(LISTEN_TIME_BUCKETS) + 1)) + "}'"
+
+
+class ConnectionStats(Base):
+    """
+    Running totals for the songs one side of a pair has sent, kept up to date
+    in the same transactions that insert songs and record listens.
+    """
+
+    __tablename__ = "connection_stats"
+
+    connection_id: Mapped[int] = mapped_column(
+        ForeignKey("connections.id"), primary_key=True
+    )
+    sender_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    songs_sent: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    songs_listened: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    # Sum of listened_at - created_at over listened songs, for the mean.
+    listen_seconds_total: Mapped[float] = mapped_column(
+        Double, nullable=False, server_default="0"
+    )
+    # Listen counts per LISTEN_TIME_BUCKETS bucket (plus one open-ended), for
+    # the median.
+    listen_histogram: Mapped[list[int]] = mapped_column(
+        ARRAY(BigInteger),
+        nullable=False,
+        server_default=text(EMPTY_LISTEN_HISTOGRAM),
+    )
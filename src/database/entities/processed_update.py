@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import now
+
+from src.database.core import Base
+
+
+class ProcessedUpdate(Base):
+    """Telegram update_ids already accepted by some worker (webhook dedup)."""
+
+    __tablename__ = "processed_updates"
+
+    update_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False
+    )
+    received_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=now(), nullable=False
+    )
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Index, Integer, String, Enum as SQLEnum, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import now
+
+from src.core.enums import ReminderRunStatus
+from src.database.core import Base
+
+
+class ReminderRun(Base):
+    """One pass of reminder digests, sent bucket by bucket across `window_seconds`."""
+
+    __tablename__ = "reminder_runs"
+    __table_args__ = (
+        # At most one run in progress, so triggering twice is a no-op.
+        Index(
+            "ix_reminder_runs_running",
+            "status",
+            unique=True,
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[ReminderRunStatus] = mapped_column(
+        SQLEnum(ReminderRunStatus, name="reminder_run_status"),
+        nullable=False,
+        default=ReminderRunStatus.RUNNING,
+    )
+    trigger: Mapped[str] = mapped_column(String, nullable=False)
+    buckets: Mapped[int] = mapped_column(Integer, nullable=False)
+    window_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Buckets are sent in order, so this is also the next bucket to send.
+    buckets_done: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    digests_sent: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=now(), nullable=False
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
@@ -1,26 +1,78 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import DateTime, ForeignKey, String
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql.functions import now
 
 
 from src.database.core import Base
 
+# Receivers hash into this many fixed reminder slots. A run's buckets are
+# contiguous slot ranges, so any bucket count is served by
+# ix_songs_reminder_slot. Changing it needs a new index.
+REMINDER_SLOTS = 4096
+
 
 class Song(Base):
+    """
+    A song sent over a connection. Range-partitioned by month on created_at
+    (see src.database.partitions), so the key and track_token are only
+    unique together with created_at.
+    """
+
     __tablename__ = "songs"
+    __table_args__ = (
+        UniqueConstraint("track_token", "created_at", name="uq_songs_track_token"),
+        # Reminder selection: songs below the re-remind cap whose last
+        # reminder is old enough; capped songs fall outside the range scan.
+        Index(
+            "ix_songs_reminder_due",
+            "reminder_count",
+            "last_reminded_at",
+            postgresql_where=text("listened_at IS NULL"),
+        ),
+        # Reminder buckets: a range of receiver slots, walked in digest order.
+        Index(
+            "ix_songs_reminder_slot",
+            text(f"(receiver_id % {REMINDER_SLOTS})"),
+            "receiver_id",
+            "id",
+            postgresql_where=text("listened_at IS NULL"),
+        ),
+        # Duplicate check on send: has this song gone to this partner before?
+        Index("ix_songs_connection_canonical", "connection_id", "canonical_id"),
+        # /history keyset pagination, walked in either direction.
+        Index("ix_songs_connection_created", "connection_id", "created_at", "id"),
+        Index(
+            "ix_songs_unlistened_connection",
+            "connection_id",
+            postgresql_where=text("listened_at IS NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     sender_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     receiver_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     connection_id: Mapped[int] = mapped_column(
         ForeignKey("connections.id"), nullable=False
     )
     link: Mapped[str] = mapped_column(String, nullable=False)
-    track_token: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    # Provider-qualified id shared by every URL form of the same song, e.g.
+    # "spotify:track:<id>", "youtube:<video id>" or "youtube:playlist:<id>".
+    # NULL for older rows.
+    canonical_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    track_token: Mapped[str] = mapped_column(String, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=now(), nullable=False
+        DateTime(timezone=True), server_default=now(), primary_key=True
     )
     listened_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True), nullable=True
@@ -28,3 +80,9 @@ class Song(Base):
     clicked_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True), nullable=True
     )
+    last_reminded_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    reminder_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
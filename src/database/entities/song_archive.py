@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import now
+
+from src.database.core import Base
+
+
+class SongArchive(Base):
+    """
+    Songs of long-disconnected pairs, moved out of `songs` by the maintenance
+    job. Only read to keep old tracking links redirecting.
+    """
+
+    __tablename__ = "songs_archive"
+    __table_args__ = (
+        Index("ix_songs_archive_track_token", "track_token", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    sender_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    receiver_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    connection_id: Mapped[int] = mapped_column(
+        ForeignKey("connections.id"), nullable=False
+    )
+    link: Mapped[str] = mapped_column(String, nullable=False)
+    canonical_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    track_token: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    listened_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    clicked_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_reminded_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    reminder_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=now(), nullable=False
+    )
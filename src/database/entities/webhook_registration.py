@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import now
+
+from src.database.core import Base
+
+
+class WebhookRegistration(Base):
+    """The secret last registered with Telegram, which getWebhookInfo doesn't report."""
+
+    __tablename__ = "webhook_registrations"
+
+    bot_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False
+    )
+    # SHA-256 hex digest of TELEGRAM_WEBHOOK_SECRET, never the secret itself.
+    secret_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    registered_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=now(), nullable=False
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from typing import Any, Callable, Iterable, Optional
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.logging import logger
+from src.database.core import engine
+
+INVALIDATION_CHANNEL = "songpal_invalidate"
+
+
+async def publish_invalidation(db: AsyncSession, topic: str, keys: Iterable[int]):
+    """
+    Queue an invalidation of `keys` under `topic` in `db`'s transaction.
+
+    NOTIFY is transactional: Postgres delivers it to every listening worker
+    once the transaction commits, and drops it if it rolls back.
+    """
+    payload = json.dumps({"topic": topic, "keys": list(keys)})
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": INVALIDATION_CHANNEL, "payload": payload},
+    )
+
+
+class InvalidationBus:
+    """
+    Listens on INVALIDATION_CHANNEL over one dedicated asyncpg connection and
+    hands each invalidation to the callbacks subscribed to its topic.
+
+    Notifications sent while the connection is down are lost, so every
+    subscriber is reset (its cache cleared) each time the listener connects.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        reconnect_delay: float = 1.0,
+        keepalive: float = 30.0,
+    ):
+        self.dsn = dsn or engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.reconnect_delay = reconnect_delay
+        self.keepalive = keepalive
+
+        self._subscribers: dict[
+            str, list[tuple[Callable[[list[int]], None], Callable[[], None]]]
+        ] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    def subscribe(
+        self,
+        topic: str,
+        on_invalidate: Callable[[list[int]], None],
+        on_reset: Callable[[], None],
+    ):
+        self._subscribers.setdefault(topic, []).append((on_invalidate, on_reset))
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": int(self.connected),
+            "received": self.received,
+            "reconnects": self.reconnects,
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Invalidation listener failed: {e!r}")
+
+            self.connected = False
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self):
+        conn = await asyncpg.connect(self.dsn)
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _: closed.set())
+
+        try:
+            await conn.add_listener(INVALIDATION_CHANNEL, self._on_notification)
+            self.connected = True
+
+            for subscribers in self._subscribers.values():
+                for _, on_reset in subscribers:
+                    on_reset()
+
+            # A silently dropped connection never fires the termination
+            # listener, so ping it now and then.
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    await asyncio.wait_for(conn.execute("SELECT 1"), self.keepalive)
+        finally:
+            if not conn.is_closed():
+                await conn.close()
+
+    def _on_notification(self, conn: Any, pid: int, channel: str, payload: str):
+        self.received += 1
+        try:
+            message = json.loads(payload)
+            subscribers = self._subscribers.get(message["topic"], ())
+            for on_invalidate, _ in subscribers:
+                on_invalidate(message["keys"])
+        except Exception as e:
+            logger.error(f"Bad invalidation {payload!r}: {e!r}")
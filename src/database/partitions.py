@@ -0,0 +1,102 @@
+import re
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Partitions are named after their parent: "<parent>_y2026m11" for a month,
+# "<parent>_default" for rows no month covers, and "<parent>_legacy" for the
+# table that was converted in place.
+PARTITION_NAME_RE = re.compile(
+    r"^(?P<parent>\w+?)_(?:legacy|default|y(?P<year>\d{4})m(?P<month>\d{2}))$"
+)
+
+
+def month_start(day: date, months: int = 0) -> date:
+    """First day of the month `months` after the one `day` is in."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partition(name: str, tables: tuple[str, ...]) -> bool:
+    match = PARTITION_NAME_RE.match(name)
+    return bool(match) and match["parent"] in tables
+
+
+async def ensure_month_partitions(
+    db: AsyncSession,
+    table: str,
+    months_ahead: int,
+    today: Optional[date] = None,
+    key: str = "created_at",
+) -> list[str]:
+    """
+    Create the monthly partitions of `table` (range-partitioned on `key`)
+    after its newest one, up to and including the month `months_ahead` from
+    now, and return their names.
+
+    Only ever extends the range forward: older months are covered by the
+    partitions already there (the legacy one included). Months are UTC.
+    Rows that already landed in the default partition for a new month are
+    moved into it. Runs in the caller's transaction.
+    """
+    existing = await db.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    names = list(existing)
+    months = [
+        date(int(match["year"]), int(match["month"]), 1)
+        for match in map(PARTITION_NAME_RE.match, names)
+        if match and match["year"]
+    ]
+    default = f"{table}_default" if f"{table}_default" in names else None
+
+    today = today or datetime.now(timezone.utc).date()
+    month = month_start(max(months), 1) if months else month_start(today)
+    last = month_start(today, months_ahead)
+
+    created = []
+    while month <= last:
+        name = month_partition_name(table, month)
+        start = f"'{month.isoformat()} 00:00+00'"
+        end = f"'{month_start(month, 1).isoformat()} 00:00+00'"
+        bounds = f"FOR VALUES FROM ({start}) TO ({end})"
+        in_month = f"{key} >= {start} AND {key} < {end}"
+
+        # Postgres refuses a new partition while the default one holds rows
+        # for its range, so those are moved into it before it is attached.
+        if default and await db.scalar(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month})")
+        ):
+            await db.execute(
+                text(
+                    f"CREATE TABLE {name} "
+                    f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+            )
+            await db.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {default} WHERE {in_month} "
+                    f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                )
+            )
+            await db.execute(
+                text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}")
+            )
+        else:
+            await db.execute(
+                text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}")
+            )
+        created.append(name)
+        month = month_start(month, 1)
+    return created
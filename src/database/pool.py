@@ -0,0 +1,110 @@
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.core.metrics import DB_STATEMENT_DURATION
+
+
+class PoolStats:
+    """Process-wide connection pool counters, fed by InstrumentedPool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use = 0
+        self.in_use_peak = 0
+        self.overflow_peak = 0
+        self.connects = 0
+        self.invalidations = 0
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times how long each checkout waits."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_stats.timeouts += 1
+            raise
+
+        waited = time.perf_counter() - started
+        pool_stats.checkouts += 1
+        pool_stats.wait_total += waited
+        pool_stats.wait_max = max(pool_stats.wait_max, waited)
+        return connection
+
+
+def instrument_pool(engine: AsyncEngine):
+    pool = engine.sync_engine.pool
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        pool_stats.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_stats.in_use += 1
+        pool_stats.in_use_peak = max(pool_stats.in_use_peak, pool_stats.in_use)
+        overflow = engine.sync_engine.pool.overflow()  # type: ignore[attr-defined]
+        pool_stats.overflow_peak = max(pool_stats.overflow_peak, overflow)
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        pool_stats.in_use -= 1
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.invalidations += 1
+
+
+def instrument_statements(engine: AsyncEngine):
+    """Time every SQL statement into DB_STATEMENT_DURATION, by leading keyword."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started"].pop()
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement else "?"
+        DB_STATEMENT_DURATION.observe(time.perf_counter() - started, keyword)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("statement_started"):
+            conn.info["statement_started"].pop()
+
+
+def get_pool_stats(engine: AsyncEngine) -> dict[str, Any]:
+    pool = engine.sync_engine.pool
+    return {
+        "size": pool.size(),  # type: ignore[attr-defined]
+        "checked_out": pool.checkedout(),  # type: ignore[attr-defined]
+        "overflow": pool.overflow(),  # type: ignore[attr-defined]
+        "in_use_peak": pool_stats.in_use_peak,
+        "overflow_peak": pool_stats.overflow_peak,
+        "checkouts": pool_stats.checkouts,
+        "timeouts": pool_stats.timeouts,
+        "connects": pool_stats.connects,
+        "invalidations": pool_stats.invalidations,
+        "checkout_wait_avg_seconds": (
+            pool_stats.wait_total / pool_stats.checkouts
+            if pool_stats.checkouts
+            else 0.0
+        ),
+        "checkout_wait_max_seconds": pool_stats.wait_max,
+    }
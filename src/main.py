@@ -1,27 +1,55 @@
+import asyncio
 import secrets
+import time
 from contextlib import asynccontextmanager
+from typing import Iterable, Optional
 
 from aiogram.types import Update
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from fastapi import FastAPI, HTTPException, Header, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from pydantic import ValidationError
 from src.core.config import (
+    CACHE_INVALIDATION,
+    CLICK_WRITE_BEHIND,
     CRON_JOB_SECRET,
+    REMINDER_SCHEDULER,
+    TELEGRAM_API_BASE_URL,
     TELEGRAM_TOKEN,
     TELEGRAM_WEBHOOK_SECRET,
-    WEBHOOK_URL,
 )
+from src.core.metrics import HTTP_DURATION, Sample, registry
 from src.core.utils.songs import is_telegram_preview_bot
+from src.database.core import engine, replica_engine
+from src.database.invalidation import InvalidationBus
+from src.database.pool import get_pool_stats
+from src.modules.connections.cache import connection_cache
+from src.modules.connections.service import CONNECTION_TOPIC
+from src.modules.maintenance.scheduler import MaintenanceScheduler
+from src.modules.notifications.model import ReminderRunData
+from src.modules.notifications.scheduler import ReminderScheduler
 from src.modules.notifications.service import NotificationServiceDep
+from src.modules.songs.click_buffer import click_buffer
 from src.modules.songs.service import SongServiceDep
-from src.modules.users.service import UserServiceDep
+from src.modules.users.cache import identity_cache
+from src.modules.users.service import USER_TOPIC
+from src.telegram_bot.dedup import UpdateDeduplicator, extract_update_id
+from src.telegram_bot.coalescer import NotificationCoalescer, SongListened
+from src.telegram_bot.deps import NotificationCoalescerDep
 from src.telegram_bot.handlers import router
+from src.telegram_bot.ingest import UpdateIngestor
 from src.telegram_bot.middlewares import (
+    BotApiMetricsMiddleware,
     DatabaseMiddleware,
+    HandlerMetricsMiddleware,
     ServiceMiddleware,
     AuthGuardMiddleware,
     ConnectionGuardMiddleware,
 )
+from src.telegram_bot.sender import SendScheduler
+from src.telegram_bot.webhook import startup
 
 
 @asynccontextmanager
@@ -29,44 +57,238 @@ async def lifespan(fastapi_app: FastAPI):
     if not TELEGRAM_TOKEN:
         raise ValueError("TELEGRAM_TOKEN is not set in environment variables")
 
-    bot = Bot(token=TELEGRAM_TOKEN)
-    await bot.get_me()
-    await bot.set_webhook(
-        WEBHOOK_URL, secret_token=TELEGRAM_WEBHOOK_SECRET, drop_pending_updates=True
+    session = (
+        AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_BASE_URL))
+        if TELEGRAM_API_BASE_URL
+        else None
     )
+    bot = Bot(token=TELEGRAM_TOKEN, session=session)
+    bot.session.middleware(BotApiMetricsMiddleware())
+    fastapi_app.state.ready = False
+
+    invalidation_bus = None
+    if CACHE_INVALIDATION:
+        invalidation_bus = InvalidationBus()
+        invalidation_bus.subscribe(
+            CONNECTION_TOPIC, connection_cache.invalidate, connection_cache.clear
+        )
+        invalidation_bus.subscribe(
+            USER_TOPIC, identity_cache.invalidate, identity_cache.clear
+        )
+        await invalidation_bus.start()
+
+    send_scheduler = SendScheduler(bot)
+    await send_scheduler.start()
+    notification_coalescer = NotificationCoalescer(send_scheduler)
+
+    if CLICK_WRITE_BEHIND:
+        await click_buffer.start()
+
+    # Without REMINDER_SCHEDULER it only runs when the cron endpoint wakes it.
+    reminder_scheduler = ReminderScheduler(send_scheduler)
+    if REMINDER_SCHEDULER:
+        await reminder_scheduler.start()
+
+    maintenance_scheduler = MaintenanceScheduler()
+    await maintenance_scheduler.start()
 
     dispatcher = Dispatcher()
-    dispatcher.update.middleware(DatabaseMiddleware())
-    dispatcher.update.middleware(ServiceMiddleware())
+    dispatcher["send_scheduler"] = send_scheduler
+    dispatcher["notification_coalescer"] = notification_coalescer
+    database_middleware = DatabaseMiddleware()
+    dispatcher.update.middleware(database_middleware)
+    dispatcher.message.middleware(HandlerMetricsMiddleware())
+    dispatcher.message.middleware(ServiceMiddleware())
     dispatcher.message.middleware(AuthGuardMiddleware())
     dispatcher.message.middleware(ConnectionGuardMiddleware())
+    dispatcher.callback_query.middleware(HandlerMetricsMiddleware())
+    dispatcher.callback_query.middleware(ServiceMiddleware())
+    dispatcher.callback_query.middleware(AuthGuardMiddleware())
+    dispatcher.callback_query.middleware(ConnectionGuardMiddleware())
     dispatcher.include_router(router)
 
+    update_ingestor = UpdateIngestor(dispatcher, bot)
+    await update_ingestor.start()
+
     fastapi_app.state.bot = bot
     fastapi_app.state.dispatcher = dispatcher
+    fastapi_app.state.update_ingestor = update_ingestor
+    fastapi_app.state.update_deduplicator = UpdateDeduplicator()
+    fastapi_app.state.send_scheduler = send_scheduler
+    fastapi_app.state.notification_coalescer = notification_coalescer
+    fastapi_app.state.reminder_scheduler = reminder_scheduler
+    fastapi_app.state.maintenance_scheduler = maintenance_scheduler
+    fastapi_app.state.database_middleware = database_middleware
+    fastapi_app.state.invalidation_bus = invalidation_bus
+
+    # Webhook registration runs in the background so workers start serving
+    # immediately; the health check reports `ready` once it is done.
+    startup_task = asyncio.create_task(
+        startup(bot, fastapi_app.state, dispatcher.resolve_used_update_types())
+    )
 
     yield
 
+    startup_task.cancel()
+    await maintenance_scheduler.stop()
+    await reminder_scheduler.stop()
+    await update_ingestor.stop()
+
+    if CLICK_WRITE_BEHIND:
+        await click_buffer.stop()
+
+    await notification_coalescer.stop()
+    await send_scheduler.stop()
+    if invalidation_bus:
+        await invalidation_bus.stop()
     await bot.session.close()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+def runtime_samples() -> Iterable[Sample]:
+    """Live gauges from the components owned by the lifespan."""
+    state = app.state
+
+    yield "songpal_ready", {}, float(getattr(state, "ready", False))
+
+    for name, value in get_pool_stats(engine).items():
+        yield f"songpal_db_pool_{name}", {}, value
+
+    if replica_engine is not None:
+        pool = replica_engine.sync_engine.pool
+        yield "songpal_db_replica_pool_size", {}, pool.size()  # type: ignore[attr-defined]
+        yield "songpal_db_replica_pool_checked_out", {}, pool.checkedout()  # type: ignore[attr-defined]
+        yield "songpal_db_replica_pool_overflow", {}, pool.overflow()  # type: ignore[attr-defined]
+
+    for name, value in identity_cache.stats().items():
+        yield f"songpal_user_cache_{name}", {}, value
+
+    for name, value in connection_cache.stats().items():
+        yield f"songpal_connection_cache_{name}", {}, value
+
+    invalidation_bus: Optional[InvalidationBus] = getattr(
+        state, "invalidation_bus", None
+    )
+    if invalidation_bus:
+        for name, value in invalidation_bus.stats().items():
+            yield f"songpal_invalidation_{name}", {}, value
+
+    send_scheduler: Optional[SendScheduler] = getattr(state, "send_scheduler", None)
+    if send_scheduler:
+        stats = send_scheduler.stats()
+        for lane, depth in stats.pop("queue_depth").items():
+            yield "songpal_send_queue_depth", {"lane": lane}, depth
+        for name, value in stats.items():
+            yield f"songpal_send_{name}", {}, value
+
+    notification_coalescer: Optional[NotificationCoalescer] = getattr(
+        state, "notification_coalescer", None
+    )
+    if notification_coalescer:
+        for name, value in notification_coalescer.stats().items():
+            yield f"songpal_notify_{name}", {}, value
+
+    update_ingestor: Optional[UpdateIngestor] = getattr(state, "update_ingestor", None)
+    if update_ingestor:
+        stats = update_ingestor.stats()
+        for shard, depth in enumerate(stats.pop("shard_depth")):
+            yield "songpal_update_shard_depth", {"shard": shard}, depth
+        for name, value in stats.items():
+            yield f"songpal_updates_{name}", {}, value
+
+    update_deduplicator = getattr(state, "update_deduplicator", None)
+    if update_deduplicator:
+        for name, value in update_deduplicator.stats().items():
+            yield f"songpal_update_dedup_{name}", {}, value
+
+    database_middleware = getattr(state, "database_middleware", None)
+    if database_middleware:
+        yield "songpal_updates_total", {}, database_middleware.updates
+        yield "songpal_updates_without_db", {}, database_middleware.updates_without_db
+
+    if CLICK_WRITE_BEHIND:
+        for name, value in click_buffer.stats().items():
+            yield f"songpal_click_buffer_{name}", {}, value
+
+    reminder_scheduler = getattr(state, "reminder_scheduler", None)
+    if reminder_scheduler:
+        for name, value in reminder_scheduler.stats().items():
+            yield f"songpal_reminder_{name}", {}, value
+
+    maintenance_scheduler = getattr(state, "maintenance_scheduler", None)
+    if maintenance_scheduler:
+        for name, value in maintenance_scheduler.stats().items():
+            yield f"songpal_maintenance_{name}", {}, value
+
+
+registry.add_collector(runtime_samples)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+
+    route = request.scope.get("route")
+    HTTP_DURATION.observe(
+        time.perf_counter() - started,
+        route.path if route else "unmatched",
+        response.status_code,
+    )
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.post("/telegram/webhook")
-async def telegram_webhook(request: Request):
-    bot = request.app.state.bot
-    dispatcher = request.app.state.dispatcher
-    data = await request.json()
-    update = Update(**data)
-    await dispatcher.feed_update(bot, update)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_secret: Optional[str] = Header(
+        None, alias="X-Telegram-Bot-Api-Secret-Token"
+    ),
+):
+    if TELEGRAM_WEBHOOK_SECRET and not secrets.compare_digest(
+        x_telegram_secret or "", TELEGRAM_WEBHOOK_SECRET
+    ):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    update_ingestor: UpdateIngestor = request.app.state.update_ingestor
+    update_deduplicator: UpdateDeduplicator = request.app.state.update_deduplicator
+
+    body = await request.body()
+
+    update_id = extract_update_id(body)
+    if update_id is not None and not await update_deduplicator.claim(update_id):
+        return {"ok": True}
+
+    try:
+        update = Update.model_validate_json(body, context={"bot": update_ingestor.bot})
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="Invalid update")
+
+    if not await update_ingestor.submit(update):
+        # Backlog is full: refuse so Telegram retries instead of losing it.
+        if update_id is not None:
+            await update_deduplicator.release(update_id)
+        raise HTTPException(status_code=503, detail="Busy")
 
     return {"ok": True}
 
 
 @app.get("/")
-async def health_check():
-    return {"status": "ok", "service": "SongPal Bot"}
+async def health_check(request: Request):
+    return {
+        "status": "ok",
+        "service": "SongPal Bot",
+        "ready": request.app.state.ready,
+    }
 
 
 @app.get("/track/{track_token}")
@@ -74,38 +296,32 @@ async def track_song(
     request: Request,
     track_token: str,
     song_service: SongServiceDep,
-    user_service: UserServiceDep,
+    notification_coalescer: NotificationCoalescerDep,
 ):
     is_telegram_bot = is_telegram_preview_bot(request)
 
-    song = await song_service.click_song(
+    click = await song_service.click_song(
         track_token, mark_as_listened=(not is_telegram_bot)
     )
 
-    if not song:
-        raise HTTPException(status_code=404, detail="Song not found")
-
-    if is_telegram_bot:
-        return RedirectResponse(url=song.link)
-
-    sender = await user_service.get_user_by_id(song.sender_id)
-    receiver = await user_service.get_user_by_id(song.receiver_id)
+    if not click:
+        # Songs of long-gone pairs are archived; their links still redirect.
+        link = await song_service.get_archived_link(track_token)
+        if not link:
+            raise HTTPException(status_code=404, detail="Song not found")
+        return RedirectResponse(url=link)
 
-    if sender and receiver:
-        bot: Bot = request.app.state.bot
-        await bot.send_message(
-            chat_id=sender.telegram_id,
-            text=f"🎧 {receiver.first_name} is listening your song!\n{song.link}",
+    if click.first_listen:
+        # Several songs opened in a row reach the sender as one message.
+        notification_coalescer.add(
+            click.sender_telegram_id,
+            SongListened(listener_name=click.receiver_first_name, link=click.link),
         )
 
-    return RedirectResponse(url=song.link)
+    return RedirectResponse(url=click.link)
 
 
-@app.post("/cron/song-reminders")
-async def cron_send_reminders(
-    notification_service: NotificationServiceDep,
-    x_api_secret: str = Header(..., alias="X-API-Secret"),
-):
+def verify_cron_secret(x_api_secret: str):
     if not CRON_JOB_SECRET:
         raise HTTPException(
             status_code=500,
@@ -115,5 +331,48 @@ async def cron_send_reminders(
     if not secrets.compare_digest(x_api_secret, CRON_JOB_SECRET):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    await notification_service.send_unlistened_songs_notification()
-    return {"status": "success", "message": "Reminder notifications sent"}
+
+@app.post("/cron/song-reminders", status_code=202, response_model=ReminderRunData)
+async def cron_send_reminders(
+    request: Request,
+    notification_service: NotificationServiceDep,
+    x_api_secret: str = Header(..., alias="X-API-Secret"),
+):
+    verify_cron_secret(x_api_secret)
+
+    # Returns right away: a ReminderScheduler pass sends the run's buckets
+    # across the reminder interval. A run in progress is returned as is
+    # rather than started twice, and resumed if no worker is sending it.
+    run = await notification_service.start_reminder_run(trigger="cron")
+    request.app.state.reminder_scheduler.wake()
+    return run
+
+
+@app.get("/cron/song-reminders", response_model=ReminderRunData)
+async def cron_reminder_progress(
+    notification_service: NotificationServiceDep,
+    run_id: Optional[int] = None,
+    x_api_secret: str = Header(..., alias="X-API-Secret"),
+):
+    verify_cron_secret(x_api_secret)
+
+    run = await notification_service.get_reminder_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Reminder run not found")
+    return run
+
+
+@app.post("/cron/maintenance", status_code=202)
+async def cron_maintenance(
+    request: Request,
+    x_api_secret: str = Header(..., alias="X-API-Secret"),
+):
+    verify_cron_secret(x_api_secret)
+
+    # Runs in the background; a pass already running elsewhere holds the
+    # maintenance lock and this one is skipped.
+    maintenance_scheduler: MaintenanceScheduler = (
+        request.app.state.maintenance_scheduler
+    )
+    maintenance_scheduler.wake()
+    return maintenance_scheduler.stats()
@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from src.core.config import CONNECTION_CACHE_SIZE, CONNECTION_CACHE_TTL
+from src.modules.connections.model import ActiveConnection
+
+
+class ConnectionCache:
+    """
+    Bounded LRU + TTL cache of each user's active connection. Process-local:
+    one instance is shared by every ConnectionService, and entries changed by
+    other workers are evicted through the invalidation bus.
+    """
+
+    def __init__(
+        self, maxsize: int = CONNECTION_CACHE_SIZE, ttl: float = CONNECTION_CACHE_TTL
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._by_user_id: OrderedDict[int, tuple[float, ActiveConnection]] = (
+            OrderedDict()
+        )
+        # Bumped by every invalidation, so a lookup that raced one doesn't
+        # put back what was just evicted (see put).
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[ActiveConnection]:
+        entry = self._by_user_id.get(user_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, connection = entry
+        if expires_at < time.monotonic():
+            del self._by_user_id[user_id]
+            self.misses += 1
+            return None
+
+        self._by_user_id.move_to_end(user_id)
+        self.hits += 1
+        return connection
+
+    def put(self, user_id: int, connection: ActiveConnection, generation: int):
+        """Cache `connection`, unless something was invalidated since `generation`."""
+        if generation != self.generation:
+            return
+
+        self._by_user_id[user_id] = (time.monotonic() + self.ttl, connection)
+        self._by_user_id.move_to_end(user_id)
+
+        while len(self._by_user_id) > self.maxsize:
+            self._by_user_id.popitem(last=False)
+
+    def invalidate(self, user_ids: Iterable[int]):
+        self.generation += 1
+        self.invalidations += 1
+        for user_id in user_ids:
+            self._by_user_id.pop(user_id, None)
+
+    def clear(self):
+        self.generation += 1
+        self._by_user_id.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._by_user_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+connection_cache = ConnectionCache()
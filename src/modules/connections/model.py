@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from src.database.entities.connection import Connection
+
+
+@dataclass(slots=True, frozen=True)
+class ActiveConnection:
+    """Detached, session-independent snapshot of a CONNECTED pair."""
+
+    id: int
+    user1_id: int
+    user2_id: Optional[int]
+    pair_code: str
+    connected_at: Optional[datetime]
+
+    @classmethod
+    def from_entity(cls, connection: Connection) -> "ActiveConnection":
+        return cls(
+            id=connection.id,
+            user1_id=connection.user1_id,
+            user2_id=connection.user2_id,
+            pair_code=connection.pair_code,
+            connected_at=connection.connected_at,
+        )
@@ -1,22 +1,34 @@
 from datetime import datetime, timezone
 from typing import Optional
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import and_, select, or_, update
+from sqlalchemy.sql import and_, func, select, or_, text, update
 
+from src.core.config import PAIR_CODE_MAX_ATTEMPTS
 from src.core.enums import ConnectionStatus
 from src.core.exceptions import (
     AlreadyConnectedError,
     CannotJoinOwnCodeError,
     ConnectionNotFoundError,
     InvalidPairCodeError,
+    PairCodeUnavailableError,
 )
-from src.core.utils.connections import generate_pair_code
+from src.core.metrics import instrumented
+from src.core.utils.connections import generate_pair_code, normalize_pair_code
+from src.database.core import read_only
 from src.database.entities.connection import Connection
+from src.database.invalidation import publish_invalidation
+from src.modules.connections.cache import ConnectionCache, connection_cache
+from src.modules.connections.model import ActiveConnection
 
+CONNECTION_TOPIC = "connection"
 
+
+@instrumented
 class ConnectionService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: ConnectionCache = connection_cache):
         self.db = db
+        self.cache = cache
 
     async def get_or_create_pair_code(self, user_id: int) -> Connection:
         stmt = select(Connection).where(
@@ -36,28 +48,70 @@ class ConnectionService:
                 raise AlreadyConnectedError()
             return connection
 
-        pair_code = generate_pair_code()
+        # Only PENDING codes are unique, so a collision is rare and doesn't
+        # abort the transaction. Later attempts use longer codes, which keeps
+        # allocation cheap however crowded the 5-char space gets.
+        for attempt in range(PAIR_CODE_MAX_ATTEMPTS):
+            insert_stmt = (
+                insert(Connection)
+                .values(
+                    user1_id=user_id,
+                    pair_code=generate_pair_code(length=5 + attempt // 2),
+                    status=ConnectionStatus.PENDING,
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[Connection.pair_code],
+                    # Spelled as a literal so Postgres can match it to the
+                    # partial index ix_connections_pending_pair_code; a bound
+                    # parameter stops matching under a generic plan.
+                    index_where=text("status = 'PENDING'"),
+                )
+                .returning(Connection)
+            )
 
-        # TODO: ADD INTEGRYERROR OR HANDLE PAIR CODE COLLISIONS
-        new_connection = Connection(user1_id=user_id, pair_code=pair_code)
-        self.db.add(new_connection)
-        await self.db.commit()
-        return new_connection
+            new_connection = await self.db.scalar(insert_stmt)
+            if new_connection:
+                await self.db.commit()
+                return new_connection
+
+        await self.db.rollback()
+        raise PairCodeUnavailableError()
 
     async def join_connection(self, user_id: int, pair_code: str) -> Connection:
+        pair_code = normalize_pair_code(pair_code)
 
-        get_connection_stmt = select(Connection).where(
-            Connection.pair_code.ilike(pair_code)
+        # Claim the code in one conditional UPDATE: of two concurrent joins,
+        # the second waits on the row lock and then no longer matches PENDING.
+        claim_stmt = (
+            update(Connection)
+            .where(
+                Connection.pair_code == pair_code,
+                Connection.status == ConnectionStatus.PENDING,
+                Connection.user1_id != user_id,
+            )
+            .values(
+                user2_id=user_id,
+                status=ConnectionStatus.CONNECTED,
+                connected_at=func.now(),
+            )
+            .returning(Connection)
+            .execution_options(synchronize_session=False)
         )
 
-        result = await self.db.execute(get_connection_stmt)
-        connection = result.scalar_one_or_none()
+        connection = await self.db.scalar(claim_stmt)
 
-        if not connection or connection.status != ConnectionStatus.PENDING:
-            raise InvalidPairCodeError()
+        if not connection:
+            owner_id = await self.db.scalar(
+                select(Connection.user1_id).where(
+                    Connection.pair_code == pair_code,
+                    Connection.status == ConnectionStatus.PENDING,
+                )
+            )
+            await self.db.rollback()
 
-        if connection.user1_id == user_id:
-            raise CannotJoinOwnCodeError()
+            if owner_id == user_id:
+                raise CannotJoinOwnCodeError()
+            raise InvalidPairCodeError()
 
         disconnect_pending_stmt = (
             update(Connection)
@@ -70,11 +124,7 @@ class ConnectionService:
 
         await self.db.execute(disconnect_pending_stmt)
 
-        connection.user2_id = user_id
-        connection.status = ConnectionStatus.CONNECTED
-        connection.connected_at = datetime.now(timezone.utc)
-
-        await self.db.commit()
+        await self._invalidate(connection.user1_id, user_id)
         return connection
 
     async def leave_connection(self, user_id: int):
@@ -95,20 +145,35 @@ class ConnectionService:
         connection.status = ConnectionStatus.DISCONNECTED
         connection.disconnected_at = datetime.now(timezone.utc)
 
-        await self.db.commit()
+        await self._invalidate(connection.user1_id, connection.user2_id)
         return connection
 
-    # async def get_active_connection(self, user_id: int) -> Optional[Connection]:
-    #     stmt = select(Connection).where(
-    #         or_(Connection.user1_id == user_id, Connection.user2_id == user_id),
-    #         Connection.status == ConnectionStatus.CONNECTED,
-    #     )
+    async def get_active_connection(
+        self, user_id: int
+    ) -> Optional[ActiveConnection]:
+        cached = self.cache.get(user_id)
+        if cached:
+            return cached
+
+        # Filled from the primary: a lagging replica could still show a pair
+        # that was just disconnected, and it would be cached again.
+        generation = self.cache.generation
+        connection = await self._find_connection(user_id, ConnectionStatus.CONNECTED)
+        if not connection:
+            return None
 
-    #     result = await self.db.execute(stmt)
-    #     return result.scalar_one_or_none()
+        active = ActiveConnection.from_entity(connection)
+        self.cache.put(user_id, active, generation)
+        return active
 
+    @read_only
     async def get_connection(
         self, user_id: int, status: Optional[ConnectionStatus] = None
+    ) -> Optional[Connection]:
+        return await self._find_connection(user_id, status)
+
+    async def _find_connection(
+        self, user_id: int, status: Optional[ConnectionStatus] = None
     ) -> Optional[Connection]:
         stmt = select(Connection).where(
             or_(
@@ -125,3 +190,13 @@ class ConnectionService:
         result = await self.db.execute(stmt)
 
         return result.scalar_one_or_none()
+
+    async def _invalidate(self, *user_ids: Optional[int]):
+        """
+        Commit a pair change and evict both users' cached connection, here
+        right away and in every other worker through the invalidation bus.
+        """
+        keys = [user_id for user_id in user_ids if user_id is not None]
+        await publish_invalidation(self.db, CONNECTION_TOPIC, keys)
+        await self.db.commit()
+        self.cache.invalidate(keys)
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class ArchiveBatch:
+    """Connections whose songs one archival transaction moved, and how many."""
+
+    connections: int = 0
+    songs: int = 0
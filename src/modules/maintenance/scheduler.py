@@ -0,0 +1,164 @@
+import asyncio
+from typing import Any, Optional
+
+from sqlalchemy import text
+
+from src.core.config import (
+    MAINTENANCE_INTERVAL,
+    SONG_ARCHIVE_SCHEDULER,
+    SONG_ARCHIVE_BATCH_SIZE,
+    SONG_ARCHIVE_RETENTION,
+    SONG_PARTITIONS_AHEAD,
+)
+from src.core.logging import logger
+from src.database.core import AsyncSessionLocal, engine
+from src.modules.maintenance.service import MaintenanceService
+
+# Arbitrary app-wide key for pg_try_advisory_lock (see WEBHOOK_LOCK_KEY).
+MAINTENANCE_LOCK_KEY = 0x50A1_0003
+
+
+class MaintenanceScheduler:
+    """
+    Runs table maintenance from inside the app: creates the coming months'
+    `songs` partitions, then archives dead pairs' songs batch by batch until
+    none are left.
+
+    Every worker runs one, but a pass holds the MAINTENANCE_LOCK_KEY advisory
+    lock throughout, so only one worker at a time does the work and the rest
+    skip that round. A pass starts on startup and every `interval` seconds,
+    since inserts past the last partition would pile up in the default one.
+    Those passes only archive with `archive`; a pass woken by the cron
+    endpoint always does.
+    """
+
+    def __init__(
+        self,
+        archive: bool = SONG_ARCHIVE_SCHEDULER,
+        interval: int = MAINTENANCE_INTERVAL,
+        months_ahead: int = SONG_PARTITIONS_AHEAD,
+        retention_days: int = SONG_ARCHIVE_RETENTION,
+        batch_size: int = SONG_ARCHIVE_BATCH_SIZE,
+    ):
+        self.archive = archive
+        self.interval = interval
+        self.months_ahead = months_ahead
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.running = False
+        self.runs_completed = 0
+        self.partitions_created = 0
+        self.connections_archived = 0
+        self.songs_archived = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        self._wake.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": int(self.running),
+            "runs_completed": self.runs_completed,
+            "partitions_created": self.partitions_created,
+            "connections_archived": self.connections_archived,
+            "songs_archived": self.songs_archived,
+        }
+
+    async def run_once(self, archive: bool = True) -> bool:
+        """One maintenance pass, or False if another worker is running one."""
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": MAINTENANCE_LOCK_KEY},
+            )
+            if not locked:
+                return False
+
+            self.running = True
+            try:
+                await self._maintain(archive)
+            finally:
+                self.running = False
+                try:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(:key)"),
+                        {"key": MAINTENANCE_LOCK_KEY},
+                    )
+                except Exception:
+                    # Don't hand a connection that may still hold the lock
+                    # back to the pool.
+                    await conn.invalidate()
+        return True
+
+    async def _run(self):
+        woken = False
+        while True:
+            try:
+                await self.run_once(archive=self.archive or woken)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Maintenance failed: {e!r}")
+
+            woken = await self._sleep(self.interval)
+
+    async def _maintain(self, archive: bool):
+        try:
+            async with AsyncSessionLocal() as db:
+                created = await MaintenanceService(db).ensure_partitions(
+                    self.months_ahead
+                )
+            if created:
+                self.partitions_created += len(created)
+                logger.info(f"Created partitions {', '.join(created)}")
+        except Exception as e:
+            # Retried on the next pass; archiving doesn't depend on it.
+            logger.error(f"Creating song partitions failed: {e!r}")
+
+        if archive and self.retention_days > 0:
+            connections = songs = 0
+            while True:
+                async with AsyncSessionLocal() as db:
+                    batch = await MaintenanceService(db).archive_songs(
+                        self.retention_days, self.batch_size
+                    )
+                if not batch.connections:
+                    break
+                connections += batch.connections
+                songs += batch.songs
+                self.connections_archived += batch.connections
+                self.songs_archived += batch.songs
+
+            if connections:
+                logger.info(
+                    f"Archived {songs} songs of {connections} disconnected pairs"
+                )
+
+        self.runs_completed += 1
+
+    async def _sleep(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds; True if woken before that."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._wake.clear()
+        return True
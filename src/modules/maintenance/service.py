@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import (
+    SONG_ARCHIVE_BATCH_SIZE,
+    SONG_ARCHIVE_RETENTION,
+    SONG_PARTITIONS_AHEAD,
+)
+from src.core.enums import ConnectionStatus
+from src.core.metrics import instrumented
+from src.database import Connection, Song, SongArchive
+from src.database.partitions import ensure_month_partitions
+from src.modules.maintenance.model import ArchiveBatch
+
+# Columns carried over from songs to songs_archive.
+ARCHIVED_COLUMNS = (
+    "id",
+    "sender_id",
+    "receiver_id",
+    "connection_id",
+    "link",
+    "canonical_id",
+    "track_token",
+    "created_at",
+    "listened_at",
+    "clicked_at",
+    "last_reminded_at",
+    "reminder_count",
+)
+
+
+@instrumented
+class MaintenanceService:
+    """Keeps `songs` partitioned ahead of time and free of dead pairs' history."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def ensure_partitions(
+        self, months_ahead: int = SONG_PARTITIONS_AHEAD
+    ) -> list[str]:
+        created = await ensure_month_partitions(
+            self.db, Song.__tablename__, months_ahead
+        )
+        await self.db.commit()
+        return created
+
+    async def archive_songs(
+        self,
+        retention_days: int = SONG_ARCHIVE_RETENTION,
+        batch_size: int = SONG_ARCHIVE_BATCH_SIZE,
+    ) -> ArchiveBatch:
+        """
+        Move the songs of up to `batch_size` connections disconnected more
+        than `retention_days` ago from `songs` to `songs_archive`, in one
+        transaction: a DELETE ... RETURNING feeding the INSERT. Connections
+        are claimed with SKIP LOCKED and marked done, so batches never
+        overlap and each connection is archived once.
+
+        Returns an empty batch once nothing is left to archive.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+
+        connection_ids = list(
+            await self.db.scalars(
+                select(Connection.id)
+                .where(
+                    Connection.status == ConnectionStatus.DISCONNECTED,
+                    Connection.songs_archived_at.is_(None),
+                    Connection.disconnected_at < cutoff,
+                )
+                .order_by(Connection.disconnected_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        )
+        if not connection_ids:
+            await self.db.commit()
+            return ArchiveBatch()
+
+        moved = (
+            delete(Song)
+            .where(Song.connection_id.in_(connection_ids))
+            .returning(*(Song.__table__.c[name] for name in ARCHIVED_COLUMNS))
+            .cte("moved")
+        )
+        archived = (
+            insert(SongArchive)
+            .from_select(ARCHIVED_COLUMNS, select(*moved.c))
+            .returning(SongArchive.id)
+            .cte("archived")
+        )
+        songs = await self.db.scalar(select(func.count()).select_from(archived))
+
+        await self.db.execute(
+            update(Connection)
+            .where(Connection.id.in_(connection_ids))
+            .values(songs_archived_at=datetime.now(timezone.utc))
+        )
+        await self.db.commit()
+
+        return ArchiveBatch(connections=len(connection_ids), songs=songs)
@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.core.enums import ReminderRunStatus
+
+
+class ReminderRunData(BaseModel):
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+    run_id: int = Field(validation_alias="id")
+    status: ReminderRunStatus
+    trigger: str
+    buckets: int
+    buckets_done: int
+    digests_sent: int
+    started_at: datetime
+    finished_at: Optional[datetime] = None
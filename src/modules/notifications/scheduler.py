@@ -0,0 +1,202 @@
+import asyncio
+import random
+import time
+from typing import Any, Optional
+
+import asyncpg
+
+from src.core.config import (
+    REMINDER_INTERVAL,
+    REMINDER_JITTER,
+    REMINDER_POLL_INTERVAL,
+)
+from src.core.logging import logger
+from src.database.core import AsyncSessionLocal, engine
+from src.database.entities.reminder_run import ReminderRun
+from src.modules.notifications.service import NotificationService
+from src.telegram_bot.sender import SendScheduler
+
+# Arbitrary app-wide key for pg_try_advisory_lock (see WEBHOOK_LOCK_KEY).
+REMINDER_LOCK_KEY = 0x50A1_0002
+
+
+class ReminderScheduler:
+    """
+    Executes reminder runs from inside the app.
+
+    A pass takes the REMINDER_LOCK_KEY advisory lock on a dedicated connection
+    outside the pool and keeps it only while a run is being sent, so one worker
+    sends at a time. A run's buckets go out one slot apart across its window,
+    each slot shifted by a jitter, and progress is committed per bucket, so
+    the next pass resumes where an interrupted one stopped, still one slot at
+    a time (see schedule_origin).
+
+    start() (REMINDER_SCHEDULER) polls every `poll_interval` seconds and
+    starts a run every `interval`. Without it nothing runs in the background:
+    wake() sends the run the cron endpoint started in a one-off pass.
+    """
+
+    def __init__(
+        self,
+        send_scheduler: SendScheduler,
+        interval: int = REMINDER_INTERVAL,
+        jitter: float = REMINDER_JITTER,
+        poll_interval: float = REMINDER_POLL_INTERVAL,
+        dsn: Optional[str] = None,
+    ):
+        self.send_scheduler = send_scheduler
+        self.interval = interval
+        self.jitter = jitter
+        self.poll_interval = poll_interval
+        self.dsn = dsn or engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._polling = False
+
+        self.is_leader = False
+        self.buckets_sent = 0
+        self.digests_sent = 0
+        self.runs_completed = 0
+
+    async def start(self):
+        if self._task is None:
+            self._polling = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._polling = False
+
+    def wake(self):
+        if self._polling:
+            self._wake.set()
+        elif self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_once())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "leader": int(self.is_leader),
+            "buckets_sent": self.buckets_sent,
+            "digests_sent": self.digests_sent,
+            "runs_completed": self.runs_completed,
+        }
+
+    def schedule_origin(self, run: ReminderRun, now: float) -> float:
+        """
+        Unix time the slots of `run` count from when it is picked up at `now`.
+
+        That is its start, unless the run fell more than a slot behind (no
+        leader for a while): then it goes on one slot at a time from `now`
+        rather than sending every overdue bucket back to back.
+        """
+        slot = run.window_seconds / run.buckets
+        started_at = run.started_at.timestamp()
+        if now - (started_at + run.buckets_done * slot) < slot:
+            return started_at
+        return now - run.buckets_done * slot
+
+    def slot_due(self, run: ReminderRun, bucket: int, origin: float) -> float:
+        """Unix time at which `bucket` of `run` should be sent."""
+        slot = run.window_seconds / run.buckets
+        # Seeded per run and bucket so a resumed run keeps the same jitter.
+        jitter = random.Random(f"{run.id}:{bucket}").uniform(0, slot * self.jitter)
+        return origin + bucket * slot + jitter
+
+    async def run_pending(self) -> bool:
+        """
+        Send the unfinished run, if any, to completion; False if another
+        worker holds the lock and is sending it.
+        """
+        if await self._next_run() is None:
+            return True
+
+        # The lock lives as long as this connection, so a dead leader hands
+        # over as soon as Postgres notices its connection is gone.
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            if not await conn.fetchval(
+                "SELECT pg_try_advisory_lock($1)", REMINDER_LOCK_KEY
+            ):
+                return False
+
+            self.is_leader = True
+            while (run := await self._next_run()) is not None:
+                await self._execute(run, conn)
+        finally:
+            self.is_leader = False
+            # Closing the session releases the lock.
+            await conn.close()
+        return True
+
+    async def _run(self):
+        while True:
+            await self._run_once()
+            await self._sleep(self.poll_interval)
+
+    async def _run_once(self):
+        try:
+            await self.run_pending()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Reminder scheduler failed: {e!r}")
+
+    async def _next_run(self) -> Optional[ReminderRun]:
+        async with AsyncSessionLocal() as db:
+            service = NotificationService(db, self.send_scheduler)
+            run = await service.get_reminder_run()
+
+            if run and run.finished_at is None:
+                return run
+
+            if self._polling and (
+                run is None or run.started_at.timestamp() + self.interval <= time.time()
+            ):
+                return await service.start_reminder_run(trigger="scheduler")
+
+            return None
+
+    async def _execute(self, run: ReminderRun, conn: asyncpg.Connection):
+        if run.buckets_done == 0:
+            logger.info(f"Reminder run {run.id} started ({run.trigger})")
+
+        origin = self.schedule_origin(run, time.time())
+        while run.buckets_done < run.buckets:
+            bucket = run.buckets_done
+
+            # Sleep until the slot opens, checking on the lock connection so a
+            # lost lock stops this leader before it sends anything else.
+            while (delay := self.slot_due(run, bucket, origin) - time.time()) > 0:
+                await asyncio.sleep(min(delay, self.poll_interval))
+                await conn.execute("SELECT 1")
+
+            async with AsyncSessionLocal() as db:
+                service = NotificationService(db, self.send_scheduler)
+                digests = await service.send_unlistened_songs_notification(
+                    bucket, run.buckets
+                )
+                run = await service.complete_reminder_bucket(run, digests)
+
+            self.buckets_sent += 1
+            self.digests_sent += digests
+
+        self.runs_completed += 1
+        logger.info(
+            f"Reminder run {run.id} completed, {run.digests_sent} digests sent"
+        )
+
+    async def _sleep(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
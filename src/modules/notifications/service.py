@@ -1,62 +1,249 @@
-from collections import defaultdict
-from typing import Annotated
-from aiogram import Bot
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Optional
 from aiogram.exceptions import TelegramBadRequest
 from fastapi import Depends
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import select
-from src.database.entities.song import Song
-
-from src.core.enums import ConnectionStatus
+from sqlalchemy.sql import func, literal_column, or_, select, text, update
+from src.database.entities.song import REMINDER_SLOTS, Song
+
+from src.core.config import (
+    REMINDER_BUCKETS,
+    REMINDER_COOLDOWN,
+    REMINDER_FETCH_SIZE,
+    REMINDER_INTERVAL,
+    REMINDER_MAX_LINKS,
+    REMINDER_MAX_PER_SONG,
+    REMINDER_SEND_CONCURRENCY,
+)
+from src.core.enums import ConnectionStatus, ReminderRunStatus
+from src.core.logging import logger
+from src.core.metrics import instrumented
 from src.core.utils.songs import generate_track_url
-from src.database.core import DbSession
+from src.database.core import DbSession, use_replica
 from src.database.entities.connection import Connection
+from src.database.entities.reminder_run import ReminderRun
 from src.database.entities.user import User
-from src.telegram_bot.deps import BotDep
+from src.telegram_bot.deps import SendSchedulerDep
+from src.telegram_bot.sender import Priority, SendScheduler
+
+# Spelled as a literal so it matches the expression of ix_songs_reminder_slot;
+# a bound modulus would not.
+RECEIVER_SLOT = Song.receiver_id % literal_column(str(REMINDER_SLOTS))
 
 
+@instrumented
 class NotificationService:
-    def __init__(self, db: AsyncSession, bot: Bot):
+    def __init__(self, db: AsyncSession, send_scheduler: SendScheduler):
         self.db = db
-        self.bot = bot
-
-    async def send_unlistened_songs_notification(self):
+        self.send_scheduler = send_scheduler
+
+    async def send_unlistened_songs_notification(
+        self, bucket: int = 0, buckets: int = 1
+    ) -> int:
+        """
+        Stream the songs that are due a reminder, ordered by receiver, through a
+        server-side cursor and send each receiver's digest as soon as their
+        group is complete. At most REMINDER_SEND_CONCURRENCY digests are held
+        in memory at once.
+
+        A song is due while unlistened, reminded fewer than REMINDER_MAX_PER_SONG
+        times and not within the last REMINDER_COOLDOWN seconds. A digest holds
+        at most REMINDER_MAX_LINKS songs; the rest stay due for the next run.
+
+        With `buckets` > 1 only receivers in hash bucket `bucket` are covered:
+        an equal share of the REMINDER_SLOTS receiver slots, read as one range
+        of ix_songs_reminder_slot. Returns the number of digests sent.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=REMINDER_COOLDOWN)
 
         stmt = (
-            select(Song, User)
+            select(User.telegram_id, Song.id, Song.track_token)
             .join(Connection, Song.connection_id == Connection.id)
             .join(User, Song.receiver_id == User.id)
             .where(
                 Connection.status == ConnectionStatus.CONNECTED,
                 Song.listened_at.is_(None),
+                Song.reminder_count < REMINDER_MAX_PER_SONG,
+                or_(Song.last_reminded_at.is_(None), Song.last_reminded_at < cutoff),
+            )
+            # Index order; a receiver's songs are still adjacent.
+            .order_by(RECEIVER_SLOT, Song.receiver_id, Song.id)
+            .execution_options(yield_per=REMINDER_FETCH_SIZE)
+        )
+
+        if buckets > 1:
+            # Receiver ids are sequential, so the modulo spreads them evenly.
+            stmt = stmt.where(
+                RECEIVER_SLOT >= bucket * REMINDER_SLOTS // buckets,
+                RECEIVER_SLOT < (bucket + 1) * REMINDER_SLOTS // buckets,
+            )
+
+        slots = asyncio.Semaphore(REMINDER_SEND_CONCURRENCY)
+        pending: set[asyncio.Task] = set()
+        reminded: list[int] = []
+
+        async def send(telegram_id: int, songs: list[tuple[int, str]], more: int):
+            if await self._send_digest(
+                telegram_id, [track_token for _, track_token in songs], more
+            ):
+                reminded.extend(song_id for song_id, _ in songs)
+
+        async def dispatch(telegram_id: int, songs: list[tuple[int, str]], more: int):
+            await slots.acquire()
+            task = asyncio.create_task(send(telegram_id, songs, more))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        current_telegram_id = None
+        songs: list[tuple[int, str]] = []
+        more = 0
+        digests = 0
+
+        # Lag only means a just-listened song may still get this reminder.
+        with use_replica():
+            result = await self.db.stream(stmt)
+
+        async for telegram_id, song_id, track_token in result:
+            if telegram_id != current_telegram_id and songs:
+                await dispatch(current_telegram_id, songs, more)
+                digests += 1
+                songs = []
+                more = 0
+
+            current_telegram_id = telegram_id
+            if len(songs) < REMINDER_MAX_LINKS:
+                songs.append((song_id, track_token))
+            else:
+                more += 1
+
+        if songs:
+            await dispatch(current_telegram_id, songs, more)
+            digests += 1
+
+        if pending:
+            await asyncio.gather(*pending)
+
+        await self._mark_reminded(reminded)
+
+        return digests
+
+    async def _mark_reminded(self, song_ids: list[int]):
+        for i in range(0, len(song_ids), REMINDER_FETCH_SIZE):
+            stmt = (
+                update(Song)
+                .where(Song.id.in_(song_ids[i : i + REMINDER_FETCH_SIZE]))
+                .values(
+                    last_reminded_at=func.now(),
+                    reminder_count=Song.reminder_count + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.execute(stmt)
+
+        await self.db.commit()
+
+    async def start_reminder_run(self, trigger: str) -> ReminderRun:
+        """Start a run, or return the one already in progress."""
+        stmt = (
+            insert(ReminderRun)
+            .values(
+                status=ReminderRunStatus.RUNNING,
+                trigger=trigger,
+                buckets=REMINDER_BUCKETS,
+                window_seconds=REMINDER_INTERVAL,
+            )
+            .on_conflict_do_nothing(
+                index_elements=[ReminderRun.status],
+                # A literal, so Postgres can match the partial index
+                # ix_reminder_runs_running under a generic plan too.
+                index_where=text("status = 'RUNNING'"),
             )
+            .returning(ReminderRun)
         )
 
+        run = await self.db.scalar(stmt)
+        await self.db.commit()
+
+        return run or await self.get_reminder_run()
+
+    async def get_reminder_run(
+        self, run_id: Optional[int] = None
+    ) -> Optional[ReminderRun]:
+        """The given run, else the one in progress, else the latest one."""
+        stmt = select(ReminderRun)
+
+        if run_id is not None:
+            stmt = stmt.where(ReminderRun.id == run_id)
+        else:
+            stmt = stmt.order_by(
+                (ReminderRun.status == ReminderRunStatus.RUNNING).desc(),
+                ReminderRun.id.desc(),
+            ).limit(1)
+
         result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def complete_reminder_bucket(
+        self, run: ReminderRun, digests: int
+    ) -> ReminderRun:
+        """Record the run's next bucket as sent; the last one completes the run."""
+        done = run.buckets_done + 1
+        values = {
+            "buckets_done": done,
+            "digests_sent": ReminderRun.digests_sent + digests,
+        }
+        if done >= run.buckets:
+            values["status"] = ReminderRunStatus.COMPLETED
+            values["finished_at"] = func.now()
 
-        songs_by_telegram_id = defaultdict[int, list[Song]](list)
+        stmt = (
+            update(ReminderRun)
+            .where(ReminderRun.id == run.id)
+            .values(**values)
+            .returning(ReminderRun)
+            .execution_options(synchronize_session=False)
+        )
+
+        updated = await self.db.scalar(stmt)
+        await self.db.commit()
+        return updated
 
-        for song, user in result:
-            songs_by_telegram_id[user.telegram_id].append(song)
+    async def _send_digest(
+        self, telegram_id: int, track_tokens: list[str], more: int = 0
+    ) -> bool:
+        """Returns True if the songs count as reminded."""
+        message_lines = ["🎵⏰ You have unlistened songs!\n"]
 
-        for telegram_id, songs_list in songs_by_telegram_id.items():
-            message_lines = ["🎵⏰ You have unlistened songs!\n"]
+        for i, track_token in enumerate(track_tokens, start=1):
+            track_url = generate_track_url(track_token)
+            message_lines.append(f"{i}) {track_url} \n")
 
-            for i, song in enumerate(songs_list, start=1):
-                track_url = generate_track_url(song.track_token)
-                message_lines.append(f"{i}) {track_url} \n")
+        if more:
+            message_lines.append(f"...and {more} more.")
 
-            message = "\n".join(message_lines)
+        message = "\n".join(message_lines)
+
+        try:
+            await self.send_scheduler.send_message(
+                telegram_id, message, priority=Priority.BULK
+            )
+        except TelegramBadRequest as e:
+            # Permanent (chat gone, bot blocked): don't retry these songs early.
+            logger.warning(f"Failed to send message to {telegram_id}: {e}")
+        except Exception as e:
+            logger.error(f"Failed to send message to {telegram_id}: {e!r}")
+            return False
 
-            try:
-                await self.bot.send_message(chat_id=telegram_id, text=message)
-            except TelegramBadRequest as e:
-                print(f"Failed to send message to {telegram_id}: {e}")
-                continue
+        return True
 
 
-async def get_notification_service(db: DbSession, bot: BotDep) -> NotificationService:
-    return NotificationService(db, bot)
+async def get_notification_service(
+    db: DbSession, send_scheduler: SendSchedulerDep
+) -> NotificationService:
+    return NotificationService(db, send_scheduler)
 
 
 NotificationServiceDep = Annotated[
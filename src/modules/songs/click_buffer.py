@@ -0,0 +1,315 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import (
+    DateTime,
+    String,
+    cast,
+    column,
+    func,
+    select,
+    update,
+    values,
+)
+
+from src.core.config import (
+    CLICK_FLUSH_INTERVAL_MS,
+    CLICK_FLUSH_MAX_ATTEMPTS,
+    CLICK_FLUSH_MAX_EVENTS,
+    CLICK_LISTENED_CACHE_SIZE,
+)
+from src.core.logging import logger
+from src.core.utils.songs import track_token_window
+from src.database.core import AsyncSessionLocal
+from src.database.entities.song import Song
+from src.modules.songs.model import SongClick
+from src.modules.stats.service import LISTEN_SECONDS, StatsService
+
+
+# created_at range searched for tokens that don't carry their issue day.
+_ANY_TIME = (
+    datetime.min.replace(tzinfo=timezone.utc),
+    datetime.max.replace(tzinfo=timezone.utc),
+)
+
+
+def _earliest(a: Optional[datetime], b: Optional[datetime]) -> Optional[datetime]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class ClickBuffer:
+    """
+    Write-behind buffer for click/listen events.
+
+    Events are coalesced per track_token (earliest timestamps win) and written
+    every `interval_ms` or every `max_events` distinct tokens as a single
+    UPDATE ... FROM (VALUES ...). Call stop() on shutdown to flush the rest.
+
+    A failed flush puts its batch back for the next one. Tokens that were in
+    `max_attempts` failed flushes are dropped, logged and counted instead.
+
+    It also remembers which songs are already listened (see listened()):
+    their later clicks can't be a first listen, so they need no lookup.
+    """
+
+    def __init__(
+        self,
+        interval_ms: int = CLICK_FLUSH_INTERVAL_MS,
+        max_events: int = CLICK_FLUSH_MAX_EVENTS,
+        max_attempts: int = CLICK_FLUSH_MAX_ATTEMPTS,
+        listened_cache_size: int = CLICK_LISTENED_CACHE_SIZE,
+    ):
+        self.interval = interval_ms / 1000
+        self.max_events = max_events
+        self.max_attempts = max_attempts
+        self.listened_cache_size = listened_cache_size
+
+        # track_token -> (clicked_at, listened_at, first recorded at,
+        # failed flushes)
+        self._pending: dict[
+            str, tuple[datetime, Optional[datetime], float, int]
+        ] = {}
+        self._listened: OrderedDict[str, SongClick] = OrderedDict()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.events = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.listened_hits = 0
+        self.last_flush_size = 0
+        self.last_flush_lag = 0.0
+        self.max_flush_lag = 0.0
+
+    def record(
+        self, track_token: str, clicked_at: datetime, listened_at: Optional[datetime]
+    ) -> bool:
+        """
+        Buffer an event. Returns True if this is the first buffered listen for
+        the token, i.e. nothing pending already marked it as listened.
+        """
+        self.events += 1
+        entry = self._pending.get(track_token)
+
+        if entry is None:
+            self._pending[track_token] = (
+                clicked_at,
+                listened_at,
+                time.monotonic(),
+                0,
+            )
+            first_listen = listened_at is not None
+        else:
+            first_listen = listened_at is not None and entry[1] is None
+            self._pending[track_token] = (
+                _earliest(entry[0], clicked_at),
+                _earliest(entry[1], listened_at),
+                entry[2],
+                entry[3],
+            )
+
+        if len(self._pending) >= self.max_events:
+            self._wake.set()
+
+        return first_listen
+
+    def listened(self, track_token: str) -> Optional[SongClick]:
+        """The click to answer with if the token's song is known to be listened."""
+        click = self._listened.get(track_token)
+        if click is not None:
+            self._listened.move_to_end(track_token)
+            self.listened_hits += 1
+        return click
+
+    def remember_listened(self, track_token: str, click: SongClick):
+        """Remember a listened song; listened_at is never unset again."""
+        self._listened[track_token] = click
+        self._listened.move_to_end(track_token)
+        while len(self._listened) > self.listened_cache_size:
+            self._listened.popitem(last=False)
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # The loop is asked to exit rather than cancelled, so a flush in
+        # progress finishes (or puts its batch back) before the last one.
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        oldest = min(entry[2] for entry in batch.values())
+
+        data = [
+            (track_token, *(track_token_window(track_token) or _ANY_TIME), *clicks)
+            for track_token, (*clicks, _, _) in batch.items()
+        ]
+        rows = values(
+            column("track_token", String),
+            column("created_from", DateTime(timezone=True)),
+            column("created_to", DateTime(timezone=True)),
+            column("clicked_at", DateTime(timezone=True)),
+            column("listened_at", DateTime(timezone=True)),
+            name="clicks",
+        ).data(data)
+
+        # Each token's window lets the lookup skip partitions per row, and
+        # the batch-wide one lets the planner drop the rest up front (see
+        # SongService._track_token_match).
+        match = (
+            Song.track_token == rows.c.track_token,
+            Song.created_at.between(rows.c.created_from, rows.c.created_to),
+            Song.created_at.between(
+                min(row[1] for row in data), max(row[2] for row in data)
+            ),
+        )
+
+        # Rows are locked first, in id order, so a concurrent flush of the same
+        # token waits and then sees this one's listened_at: exactly one of them
+        # counts the first listen.
+        previous = (
+            select(Song.id, Song.created_at, Song.listened_at)
+            .where(*match)
+            .order_by(Song.id)
+            .with_for_update(of=Song)
+            .cte("previous")
+        )
+
+        # LEAST ignores NULLs, so an unset column takes the buffered value and a
+        # set one keeps whichever timestamp is earlier. The casts matter when a
+        # VALUES column is all NULL (clicks without a listen), which Postgres
+        # would otherwise type as text.
+        clicked_at = cast(rows.c.clicked_at, DateTime(timezone=True))
+        listened_at = cast(rows.c.listened_at, DateTime(timezone=True))
+        stmt = (
+            update(Song)
+            .where(
+                Song.id == previous.c.id,
+                Song.created_at == previous.c.created_at,
+                *match,
+            )
+            .values(
+                clicked_at=func.least(Song.clicked_at, clicked_at),
+                listened_at=func.least(Song.listened_at, listened_at),
+            )
+            .returning(
+                Song.connection_id,
+                Song.sender_id,
+                (previous.c.listened_at.is_(None) & Song.listened_at.is_not(None)).label(
+                    "first_listen"
+                ),
+                LISTEN_SECONDS.label("listen_seconds"),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(stmt)
+                await StatsService(session).record_listens(
+                    (row.connection_id, row.sender_id, row.listen_seconds)
+                    for row in result
+                    if row.first_listen
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Click buffer flush of {len(batch)} tokens failed: {e!r}")
+            self.failed_flushes += 1
+            self._restore(batch, failed=True)
+            return
+        except BaseException:
+            # Cancelled mid-flush: keep the batch for the next one. Writing it
+            # twice is harmless, LEAST keeps the earliest timestamps and the
+            # first listen is only counted while listened_at is still NULL.
+            self._restore(batch)
+            raise
+
+        lag = time.monotonic() - oldest
+        self.flushes += 1
+        self.flushed_rows += len(batch)
+        self.last_flush_size = len(batch)
+        self.last_flush_lag = lag
+        self.max_flush_lag = max(self.max_flush_lag, lag)
+
+    def _restore(
+        self,
+        batch: dict[str, tuple[datetime, Optional[datetime], float, int]],
+        failed: bool = False,
+    ):
+        dropped = []
+        for track_token, (clicked_at, listened_at, recorded_at, attempts) in (
+            batch.items()
+        ):
+            attempts += failed
+            if attempts >= self.max_attempts:
+                dropped.append(track_token)
+                continue
+
+            entry = self._pending.get(track_token)
+            if entry is not None:
+                clicked_at = _earliest(entry[0], clicked_at)
+                listened_at = _earliest(entry[1], listened_at)
+                recorded_at = min(entry[2], recorded_at)
+            self._pending[track_token] = (
+                clicked_at,
+                listened_at,
+                recorded_at,
+                attempts,
+            )
+
+        if dropped:
+            self.dropped += len(dropped)
+            logger.error(
+                f"Dropped clicks on {len(dropped)} tokens after "
+                f"{self.max_attempts} failed flushes: {', '.join(dropped)}"
+            )
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "pending": len(self._pending),
+            "events": self.events,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "listened_cache_size": len(self._listened),
+            "listened_cache_hits": self.listened_hits,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_lag_seconds": self.last_flush_lag,
+            "max_flush_lag_seconds": self.max_flush_lag,
+        }
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                return
+            await self.flush()
+
+
+click_buffer = ClickBuffer()
@@ -1,20 +1,66 @@
-import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
 
-from pydantic import BaseModel, HttpUrl, field_validator
+from pydantic import BaseModel, Field, field_validator
 
-from src.core.config import SONG_LINK_PATTERN
+from src.core.utils.songs import SongLink, parse_song_link
 
 
 class SendSongData(BaseModel):
     sender_id: int
     receiver_id: int
     connection_id: int
-    link: HttpUrl
+    link: SongLink
 
-    @field_validator("link")
+    @field_validator("link", mode="before")
     @classmethod
-    def validate_music_link(cls, v: HttpUrl) -> HttpUrl:
-        url_str = str(v)
-        if not re.search(SONG_LINK_PATTERN, url_str):
+    def validate_music_link(cls, v: Any) -> SongLink:
+        # Links already parsed from a message are passed through as-is.
+        if isinstance(v, SongLink):
+            return v
+        link = parse_song_link(str(v))
+        if link is None:
             raise ValueError("Link must be from Spotify or YouTube")
-        return v
+        return link
+
+
+class SendSongsData(BaseModel):
+    sender_id: int
+    receiver_id: int
+    connection_id: int
+    links: list[SongLink] = Field(min_length=1)
+
+    @field_validator("links", mode="before")
+    @classmethod
+    def validate_music_links(cls, v: Any) -> list[SongLink]:
+        return [SendSongData.validate_music_link(link) for link in v]
+
+
+@dataclass(slots=True, frozen=True)
+class SongClick:
+    """Outcome of recording a click on a tracking link."""
+
+    link: str
+    first_listen: bool
+    sender_telegram_id: int
+    receiver_first_name: str
+
+
+@dataclass(slots=True, frozen=True)
+class HistoryEntry:
+    id: int
+    link: str
+    sender_id: int
+    created_at: datetime
+    clicked_at: Optional[datetime]
+    listened_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class HistoryPage:
+    """One page of a pair's songs, newest first."""
+
+    entries: list[HistoryEntry]
+    has_newer: bool
+    has_older: bool
@@ -1,58 +1,316 @@
+from dataclasses import replace
 from datetime import datetime, timezone
 from typing import Annotated, Optional
 
 from fastapi import Depends
+from sqlalchemy import ColumnElement, false, func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import select
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import insert, select, update
 
-from src.core.utils.songs import generate_track_token
-from src.database import Song
-from src.database.core import DbSession
-from src.modules.songs.model import SendSongData
+from src.core.config import CLICK_WRITE_BEHIND, HISTORY_PAGE_SIZE
+from src.core.metrics import instrumented
+from src.core.utils.songs import generate_track_token, track_token_window
+from src.database import Song, SongArchive, User
+from src.database.core import DbSession, read_only
+from src.modules.songs.click_buffer import ClickBuffer, click_buffer
+from src.modules.songs.model import (
+    HistoryEntry,
+    HistoryPage,
+    SendSongData,
+    SendSongsData,
+    SongClick,
+)
+from src.modules.stats.service import LISTEN_SECONDS, StatsService
 
+# Arbitrary app-wide key for pg_advisory_xact_lock (see WEBHOOK_LOCK_KEY), taken
+# together with a connection id.
+SEND_SONGS_LOCK_KEY = 0x50A1_0004
 
+
+def _track_token_match(track_token: str) -> list[ColumnElement[bool]]:
+    """
+    Conditions finding the song with `track_token`. Tokens that carry their
+    issue day also bound created_at, so only the partitions around that day
+    are probed.
+    """
+    conditions = [Song.track_token == track_token]
+    window = track_token_window(track_token)
+    if window:
+        conditions.append(Song.created_at.between(*window))
+    return conditions
+
+
+@instrumented
 class SongService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, click_buffer: Optional[ClickBuffer] = None):
         self.db = db
+        self.click_buffer = click_buffer
+        self.stats = StatsService(db)
+
+    async def send_song(self, payload: SendSongData) -> Optional[Song]:
+        songs = await self.send_songs(
+            SendSongsData(
+                sender_id=payload.sender_id,
+                receiver_id=payload.receiver_id,
+                connection_id=payload.connection_id,
+                links=[payload.link],
+            )
+        )
+        return songs[0] if songs else None
 
-    async def send_song(self, payload: SendSongData):
+    async def send_songs(self, payload: SendSongsData) -> list[Song]:
+        """
+        Store the links this sender hasn't sent over this connection yet in one
+        multi-row INSERT ... RETURNING and return the new songs; links already
+        sent, in any URL form, are skipped. The partner may still send a song
+        back.
 
-        track_token = generate_track_token()
+        A unique index on the partitioned table would have to include
+        created_at, so the check is serialised per connection with a
+        transaction-scoped advisory lock instead.
+        """
+        await self.db.execute(
+            select(
+                func.pg_advisory_xact_lock(SEND_SONGS_LOCK_KEY, payload.connection_id)
+            )
+        )
+        canonical_ids = [link.canonical_id for link in payload.links]
+        sent = set(
+            await self.db.scalars(
+                select(Song.canonical_id).where(
+                    Song.connection_id == payload.connection_id,
+                    Song.sender_id == payload.sender_id,
+                    Song.canonical_id.in_(canonical_ids),
+                )
+            )
+        )
+        links = [link for link in payload.links if link.canonical_id not in sent]
+        if not links:
+            # Ends the transaction, and with it the lock.
+            await self.db.commit()
+            return []
 
-        new_song = Song(
-            sender_id=payload.sender_id,
-            receiver_id=payload.receiver_id,
-            connection_id=payload.connection_id,
-            link=str(payload.link),
-            track_token=track_token,
+        stmt = (
+            insert(Song)
+            .values(
+                [
+                    {
+                        "sender_id": payload.sender_id,
+                        "receiver_id": payload.receiver_id,
+                        "connection_id": payload.connection_id,
+                        "link": link.url,
+                        "canonical_id": link.canonical_id,
+                        "track_token": generate_track_token(),
+                    }
+                    for link in links
+                ]
+            )
+            .returning(Song)
         )
 
-        self.db.add(new_song)
+        songs = list(await self.db.scalars(stmt))
+        await self.stats.record_sent(
+            payload.connection_id, payload.sender_id, len(songs)
+        )
         await self.db.commit()
-        return new_song
+        return songs
+
+    @read_only
+    async def get_history(
+        self,
+        connection_id: int,
+        cursor: Optional[tuple[datetime, int]] = None,
+        newer: bool = False,
+        limit: int = HISTORY_PAGE_SIZE,
+    ) -> HistoryPage:
+        """
+        A page of the pair's songs, newest first, by keyset pagination on
+        (created_at, id): the `limit` songs older than `cursor`, or with
+        `newer` the `limit` songs just newer than it. Each page is one index
+        range scan, however deep it is. One extra row is fetched to tell
+        whether the walk can go on.
+        """
+        newer = newer and cursor is not None
+        key = tuple_(Song.created_at, Song.id)
+        stmt = select(
+            Song.id,
+            Song.link,
+            Song.sender_id,
+            Song.created_at,
+            Song.clicked_at,
+            Song.listened_at,
+        ).where(Song.connection_id == connection_id)
+
+        if newer:
+            stmt = stmt.where(key > tuple_(*cursor)).order_by(
+                Song.created_at, Song.id
+            )
+        else:
+            if cursor:
+                stmt = stmt.where(key < tuple_(*cursor))
+            stmt = stmt.order_by(Song.created_at.desc(), Song.id.desc())
+
+        rows = (await self.db.execute(stmt.limit(limit + 1))).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if newer:
+            rows.reverse()
+
+        return HistoryPage(
+            entries=[
+                HistoryEntry(
+                    id=row.id,
+                    link=row.link,
+                    sender_id=row.sender_id,
+                    created_at=row.created_at,
+                    clicked_at=row.clicked_at,
+                    listened_at=row.listened_at,
+                )
+                for row in rows
+            ],
+            has_newer=more if newer else cursor is not None,
+            has_older=True if newer else more,
+        )
 
     async def click_song(
         self, track_token: str, mark_as_listened: bool = True
-    ) -> Optional[Song]:
-        stmt = select(Song).where(Song.track_token == track_token)
+    ) -> Optional[SongClick]:
+        """
+        Record a click in a single UPDATE ... RETURNING.
+
+        The row is locked in a CTE first, so concurrent clicks on the same token
+        serialize and exactly one of them observes the unlistened -> listened
+        transition (`first_listen`).
+
+        With a click buffer the write is deferred instead, see _buffer_click.
+        """
+        if self.click_buffer is not None:
+            return await self._buffer_click(track_token, mark_as_listened)
+
+        # Repeated on the UPDATE so it is pruned to the same partitions.
+        match = _track_token_match(track_token)
+        previous = (
+            select(Song.id, Song.created_at, Song.listened_at)
+            .where(*match)
+            .with_for_update()
+            .cte("previous")
+        )
+        sender = aliased(User)
+        receiver = aliased(User)
+
+        now = func.now()
+        listened_at = (
+            func.coalesce(Song.listened_at, now)
+            if mark_as_listened
+            else Song.listened_at
+        )
+        first_listen = (
+            previous.c.listened_at.is_(None) if mark_as_listened else false()
+        )
+
+        stmt = (
+            update(Song)
+            .where(
+                *match,
+                Song.id == previous.c.id,
+                Song.created_at == previous.c.created_at,
+                sender.id == Song.sender_id,
+                receiver.id == Song.receiver_id,
+            )
+            .values(
+                clicked_at=func.coalesce(Song.clicked_at, now),
+                listened_at=listened_at,
+            )
+            .returning(
+                Song.link,
+                first_listen.label("first_listen"),
+                sender.telegram_id,
+                receiver.first_name,
+                Song.connection_id,
+                Song.sender_id,
+                LISTEN_SECONDS.label("listen_seconds"),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
         result = await self.db.execute(stmt)
-        song = result.scalar_one_or_none()
+        row = result.one_or_none()
 
-        if not song:
+        if not row:
+            await self.db.commit()
             return None
 
+        if row.first_listen:
+            await self.stats.record_listens(
+                [(row.connection_id, row.sender_id, row.listen_seconds)]
+            )
+        await self.db.commit()
+
+        return SongClick(
+            link=row.link,
+            first_listen=bool(row.first_listen),
+            sender_telegram_id=row.telegram_id,
+            receiver_first_name=row.first_name,
+        )
+
+    async def _buffer_click(
+        self, track_token: str, mark_as_listened: bool
+    ) -> Optional[SongClick]:
         now = datetime.now(timezone.utc)
 
-        # Update clicked_at if not set
-        if not song.clicked_at:
-            song.clicked_at = now
+        # Songs already listened can't produce a first listen, so their link
+        # is all that's needed and the buffer remembers it.
+        known = self.click_buffer.listened(track_token)
+        if known is not None:
+            self.click_buffer.record(
+                track_token, now, now if mark_as_listened else None
+            )
+            return known
 
-        # Update listened_at only if mark_as_listened is True (skip for preview bots)
-        if mark_as_listened and not song.listened_at:
-            song.listened_at = now
+        sender = aliased(User)
+        receiver = aliased(User)
 
-        await self.db.commit()
-        return song
+        stmt = (
+            select(
+                Song.link,
+                Song.listened_at,
+                sender.telegram_id,
+                receiver.first_name,
+            )
+            .join(sender, sender.id == Song.sender_id)
+            .join(receiver, receiver.id == Song.receiver_id)
+            .where(*_track_token_match(track_token))
+        )
+
+        result = await self.db.execute(stmt)
+        row = result.one_or_none()
+
+        if not row:
+            return None
+
+        first_buffered_listen = self.click_buffer.record(
+            track_token, now, now if mark_as_listened else None
+        )
+
+        click = SongClick(
+            link=row.link,
+            first_listen=first_buffered_listen and row.listened_at is None,
+            sender_telegram_id=row.telegram_id,
+            receiver_first_name=row.first_name,
+        )
+        if mark_as_listened or row.listened_at is not None:
+            self.click_buffer.remember_listened(
+                track_token, replace(click, first_listen=False)
+            )
+        return click
+
+    @read_only
+    async def get_archived_link(self, track_token: str) -> Optional[str]:
+        """The link behind `track_token` if its song has been archived."""
+        return await self.db.scalar(
+            select(SongArchive.link).where(SongArchive.track_token == track_token)
+        )
 
     # async def listen_song(self, track_token: str) -> Optional[Song]:
     #     # Kept for backward compatibility or manual marking if needed,
@@ -81,7 +339,7 @@ class SongService:
 
 
 async def get_song_service(db: DbSession) -> SongService:
-    return SongService(db)
+    return SongService(db, click_buffer if CLICK_WRITE_BEHIND else None)
 
 
 SongServiceDep = Annotated[SongService, Depends(get_song_service)]
@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from src.core.utils.stats import LISTEN_TIME_BUCKETS, histogram_quantile
+from src.database.entities.connection_stats import ConnectionStats
+
+
+@dataclass(slots=True, frozen=True)
+class SenderStats:
+    """What one side of a pair has sent, and how its partner listened."""
+
+    songs_sent: int = 0
+    songs_listened: int = 0
+    listen_seconds_total: float = 0.0
+    listen_histogram: tuple[int, ...] = (0,) * (len(LISTEN_TIME_BUCKETS) + 1)
+
+    @classmethod
+    def from_entity(cls, stats: ConnectionStats) -> "SenderStats":
+        return cls(
+            songs_sent=stats.songs_sent,
+            songs_listened=stats.songs_listened,
+            listen_seconds_total=stats.listen_seconds_total,
+            listen_histogram=tuple(stats.listen_histogram),
+        )
+
+    @property
+    def listen_rate(self) -> Optional[float]:
+        return self.songs_listened / self.songs_sent if self.songs_sent else None
+
+    @property
+    def mean_listen_seconds(self) -> Optional[float]:
+        if not self.songs_listened:
+            return None
+        return self.listen_seconds_total / self.songs_listened
+
+    @property
+    def median_listen_seconds(self) -> Optional[float]:
+        """Estimated from the histogram, so accurate to within a bucket."""
+        return histogram_quantile(self.listen_histogram, 0.5)
+
+
+@dataclass(slots=True, frozen=True)
+class PairStats:
+    sent: SenderStats
+    received: SenderStats
@@ -0,0 +1,117 @@
+from collections import defaultdict
+from typing import Annotated, Iterable
+
+from fastapi import Depends
+from sqlalchemy import Double, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import instrumented
+from src.core.utils.stats import LISTEN_TIME_BUCKETS, listen_time_bucket
+from src.database.core import DbSession, read_only
+from src.database.entities.connection_stats import ConnectionStats
+from src.database.entities.song import Song
+from src.modules.stats.model import PairStats, SenderStats
+
+# Seconds from send to listen, for RETURNING from the UPDATE that sets
+# listened_at.
+LISTEN_SECONDS = cast(
+    func.extract("epoch", Song.listened_at - Song.created_at), Double
+)
+
+# Element-wise sum of the stored and the incoming histogram.
+_MERGED_HISTOGRAM = literal_column(
+    "ARRAY(SELECT a + b FROM unnest(connection_stats.listen_histogram,"
+    " excluded.listen_histogram) WITH ORDINALITY AS h(a, b, i) ORDER BY i)"
+)
+
+
+@instrumented
+class StatsService:
+    """
+    Per-pair listening statistics. The record_* methods only add to the
+    running totals in the caller's transaction; committing is up to it.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record_sent(self, connection_id: int, sender_id: int, count: int):
+        stmt = insert(ConnectionStats).values(
+            connection_id=connection_id, sender_id=sender_id, songs_sent=count
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ConnectionStats.connection_id, ConnectionStats.sender_id],
+            set_={"songs_sent": ConnectionStats.songs_sent + stmt.excluded.songs_sent},
+        )
+        await self.db.execute(stmt)
+
+    async def record_listens(self, listens: Iterable[tuple[int, int, float]]):
+        """
+        Fold first listens, as (connection_id, sender_id, seconds from send to
+        listen), into the totals with one multi-row upsert.
+        """
+        # ON CONFLICT can't touch a row twice in one statement, so each
+        # (connection, sender) gets a single pre-summed row.
+        totals: dict[tuple[int, int], list] = defaultdict(
+            lambda: [0, 0.0, [0] * (len(LISTEN_TIME_BUCKETS) + 1)]
+        )
+        for connection_id, sender_id, seconds in listens:
+            seconds = max(seconds, 0.0)
+            entry = totals[(connection_id, sender_id)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2][listen_time_bucket(seconds)] += 1
+
+        if not totals:
+            return
+
+        stmt = insert(ConnectionStats).values(
+            [
+                {
+                    "connection_id": connection_id,
+                    "sender_id": sender_id,
+                    "songs_listened": count,
+                    "listen_seconds_total": seconds,
+                    "listen_histogram": histogram,
+                }
+                for (connection_id, sender_id), (count, seconds, histogram) in sorted(
+                    totals.items()
+                )
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ConnectionStats.connection_id, ConnectionStats.sender_id],
+            set_={
+                "songs_listened": ConnectionStats.songs_listened
+                + stmt.excluded.songs_listened,
+                "listen_seconds_total": ConnectionStats.listen_seconds_total
+                + stmt.excluded.listen_seconds_total,
+                "listen_histogram": _MERGED_HISTOGRAM,
+            },
+        )
+        await self.db.execute(stmt)
+
+    @read_only
+    async def get_pair_stats(
+        self, connection_id: int, user_id: int, partner_id: int
+    ) -> PairStats:
+        """Both sides of the pair in one primary-key range read."""
+        stmt = select(ConnectionStats).where(
+            ConnectionStats.connection_id == connection_id
+        )
+        rows = {
+            stats.sender_id: SenderStats.from_entity(stats)
+            for stats in await self.db.scalars(stmt)
+        }
+        return PairStats(
+            sent=rows.get(user_id, SenderStats()),
+            received=rows.get(partner_id, SenderStats()),
+        )
+
+
+async def get_stats_service(db: DbSession) -> StatsService:
+    return StatsService(db)
+
+
+StatsServiceDep = Annotated[StatsService, Depends(get_stats_service)]
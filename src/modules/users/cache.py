@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from src.core.config import USER_CACHE_SIZE, USER_CACHE_TTL
+from src.modules.users.model import UserIdentity
+
+
+class IdentityCache:
+    """
+    Bounded LRU + TTL cache of UserIdentity records, addressable by both
+    `id` and `telegram_id`. Process-local: one instance is shared by every
+    UserService, and users changed by other workers are evicted through the
+    invalidation bus.
+    """
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._by_id: OrderedDict[int, tuple[float, UserIdentity]] = OrderedDict()
+        self._id_by_telegram_id: dict[int, int] = {}
+        # Bumped by every invalidation, so a lookup that raced one doesn't
+        # put back what was just evicted (see put).
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_by_id(self, user_id: int) -> Optional[UserIdentity]:
+        entry = self._by_id.get(user_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, identity = entry
+        if expires_at < time.monotonic():
+            self._evict(user_id)
+            self.misses += 1
+            return None
+
+        self._by_id.move_to_end(user_id)
+        self.hits += 1
+        return identity
+
+    def get_by_telegram_id(self, telegram_id: int) -> Optional[UserIdentity]:
+        user_id = self._id_by_telegram_id.get(telegram_id)
+
+        if user_id is None:
+            self.misses += 1
+            return None
+
+        return self.get_by_id(user_id)
+
+    def put(self, identity: UserIdentity, generation: int):
+        """Cache `identity`, unless something was invalidated since `generation`."""
+        if generation != self.generation:
+            return
+
+        self._evict(identity.id)
+        self._by_id[identity.id] = (time.monotonic() + self.ttl, identity)
+        self._id_by_telegram_id[identity.telegram_id] = identity.id
+
+        while len(self._by_id) > self.maxsize:
+            oldest_id = next(iter(self._by_id))
+            self._evict(oldest_id)
+
+    def invalidate(
+        self, user_ids: Iterable[int] = (), telegram_id: Optional[int] = None
+    ):
+        self.generation += 1
+        self.invalidations += 1
+        if telegram_id is not None:
+            mapped_id = self._id_by_telegram_id.pop(telegram_id, None)
+            if mapped_id is not None:
+                self._evict(mapped_id)
+
+        for user_id in user_ids:
+            self._evict(user_id)
+
+    def clear(self):
+        self.generation += 1
+        self._by_id.clear()
+        self._id_by_telegram_id.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._by_id),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    def _evict(self, user_id: int):
+        entry = self._by_id.pop(user_id, None)
+        if entry is None:
+            return
+
+        telegram_id = entry[1].telegram_id
+        if self._id_by_telegram_id.get(telegram_id) == user_id:
+            del self._id_by_telegram_id[telegram_id]
+
+
+identity_cache = IdentityCache()
@@ -1,9 +1,31 @@
+from dataclasses import dataclass
 from typing import Optional
 
 from pydantic import BaseModel
 
+from src.database.entities.user import User
+
 
 class UserData(BaseModel):
     telegram_id: int
     first_name: str
     last_name: Optional[str] = None
+
+
+@dataclass(slots=True, frozen=True)
+class UserIdentity:
+    """Detached, session-independent snapshot of a user row."""
+
+    id: int
+    telegram_id: int
+    first_name: str
+    last_name: Optional[str] = None
+
+    @classmethod
+    def from_entity(cls, user: User) -> "UserIdentity":
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            first_name=user.first_name,
+            last_name=user.last_name,
+        )
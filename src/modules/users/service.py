@@ -2,22 +2,43 @@ from typing import Annotated, Optional
 from fastapi import Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.metrics import instrumented
 from src.database.core import DbSession
 from src.database.entities.user import User
-from src.modules.users.model import UserData
+from src.database.invalidation import publish_invalidation
+from src.modules.users.cache import IdentityCache, identity_cache
+from src.modules.users.model import UserData, UserIdentity
 
+USER_TOPIC = "user"
 
+
+@instrumented
 class UserService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: IdentityCache = identity_cache):
         self.db = db
+        self.cache = cache
 
     async def get_or_create_user(self, user_data: UserData) -> User:
-
+        """
+        The user behind `user_data.telegram_id`, created on first sight. A
+        changed Telegram name is saved and evicted from every worker's cache.
+        """
         stmt = select(User).where(User.telegram_id == user_data.telegram_id)
         result = await self.db.execute(stmt)
         user = result.scalar_one_or_none()
 
         if user:
+            if (user.first_name, user.last_name) != (
+                user_data.first_name,
+                user_data.last_name,
+            ):
+                user.first_name = user_data.first_name
+                user.last_name = user_data.last_name
+                await publish_invalidation(self.db, USER_TOPIC, [user.id])
+                await self.db.commit()
+                self.cache.invalidate([user.id])
+
+            self.cache.put(UserIdentity.from_entity(user), self.cache.generation)
             return user
 
         new_user = User(**user_data.model_dump())
@@ -25,17 +46,43 @@ class UserService:
         self.db.add(new_user)
         await self.db.commit()
         await self.db.refresh(new_user)
+
+        self.cache.invalidate(telegram_id=new_user.telegram_id)
+        self.cache.put(UserIdentity.from_entity(new_user), self.cache.generation)
         return new_user
 
-    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
+    # Lookups that fill the cache read the primary: a lagging replica could
+    # put back a name that was just changed and invalidated.
+
+    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[UserIdentity]:
+        identity = self.cache.get_by_telegram_id(telegram_id)
+        if identity:
+            return identity
+
+        generation = self.cache.generation
         stmt = select(User).where(User.telegram_id == telegram_id)
         result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
+        return self._remember(result.scalar_one_or_none(), generation)
+
+    async def get_user_by_id(self, user_id: int) -> Optional[UserIdentity]:
+        identity = self.cache.get_by_id(user_id)
+        if identity:
+            return identity
 
-    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        generation = self.cache.generation
         stmt = select(User).where(User.id == user_id)
         result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
+        return self._remember(result.scalar_one_or_none(), generation)
+
+    def _remember(
+        self, user: Optional[User], generation: int
+    ) -> Optional[UserIdentity]:
+        if not user:
+            return None
+
+        identity = UserIdentity.from_entity(user)
+        self.cache.put(identity, generation)
+        return identity
 
 
 async def get_user_service(db: DbSession) -> UserService:
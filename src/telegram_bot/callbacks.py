@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+from aiogram.filters.callback_data import CallbackData
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class HistoryPageCallback(CallbackData, prefix="h"):
+    """
+    /history page button: the keyset cursor, (created_at, id) of the first or
+    last song on the page, with created_at as exact integer microseconds.
+    Something like "h:o:1792224062123457:48213", well under Telegram's
+    64-byte callback data limit.
+    """
+
+    direction: str  # "o" for older, "n" for newer
+    ts: int
+    id: int
+
+    @classmethod
+    def from_cursor(
+        cls, direction: str, created_at: datetime, song_id: int
+    ) -> "HistoryPageCallback":
+        return cls(
+            direction=direction, ts=(created_at - _EPOCH) // _MICROSECOND, id=song_id
+        )
+
+    @property
+    def cursor(self) -> tuple[datetime, int]:
+        return _EPOCH + self.ts * _MICROSECOND, self.id
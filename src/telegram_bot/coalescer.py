@@ -0,0 +1,185 @@
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from src.core.config import (
+    NOTIFY_DEBOUNCE,
+    NOTIFY_MAX_WAIT,
+    SONG_MAX_LINKS_PER_MESSAGE,
+)
+from src.core.logging import logger
+from src.telegram_bot.sender import SendScheduler
+
+
+def _chunks(items: list[str], size: int) -> Iterable[tuple[int, list[str]]]:
+    for start in range(0, len(items), size):
+        yield start, items[start : start + size]
+
+
+class Notice(ABC):
+    """A partner notification; notices of one type for one chat are merged."""
+
+    __slots__ = ()
+
+    @classmethod
+    @abstractmethod
+    def render(cls, notices: list[Any]) -> list[str]:
+        """Texts of the message(s) standing in for `notices`, in order."""
+
+
+@dataclass(slots=True, frozen=True)
+class SongsSent(Notice):
+    sender_name: str
+    track_urls: tuple[str, ...]
+
+    @classmethod
+    def render(cls, notices: list["SongsSent"]) -> list[str]:
+        by_sender: dict[str, dict[str, None]] = {}
+        for notice in notices:
+            by_sender.setdefault(notice.sender_name, {}).update(
+                dict.fromkeys(notice.track_urls)
+            )
+
+        texts = []
+        for sender_name, urls in by_sender.items():
+            track_urls = list(urls)
+            if len(track_urls) == 1:
+                texts.append(
+                    f"🎵 {sender_name} sent you a song! "
+                    f"Click here to listen: {track_urls[0]}"
+                )
+                continue
+
+            # Long bursts are split so each message stays well under
+            # Telegram's length limit; numbering runs on across them.
+            for start, chunk in _chunks(track_urls, SONG_MAX_LINKS_PER_MESSAGE):
+                lines = []
+                if start == 0:
+                    lines.append(
+                        f"🎵 {sender_name} sent you {len(track_urls)} songs! "
+                        f"Click to listen:\n"
+                    )
+                lines.extend(
+                    f"{i}) {url}" for i, url in enumerate(chunk, start=start + 1)
+                )
+                texts.append("\n".join(lines))
+        return texts
+
+
+@dataclass(slots=True, frozen=True)
+class SongListened(Notice):
+    listener_name: str
+    link: str
+
+    @classmethod
+    def render(cls, notices: list["SongListened"]) -> list[str]:
+        by_listener: dict[str, dict[str, None]] = {}
+        for notice in notices:
+            by_listener.setdefault(notice.listener_name, {})[notice.link] = None
+
+        texts = []
+        for listener_name, links in by_listener.items():
+            if len(links) == 1:
+                (link,) = links
+                texts.append(f"🎧 {listener_name} is listening your song!\n{link}")
+                continue
+
+            for start, chunk in _chunks(list(links), SONG_MAX_LINKS_PER_MESSAGE):
+                header = (
+                    [f"🎧 {listener_name} is listening your {len(links)} songs!"]
+                    if start == 0
+                    else []
+                )
+                texts.append("\n".join(header + chunk))
+        return texts
+
+
+@dataclass(slots=True)
+class _Batch:
+    first_at: float
+    notices: list[Notice] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class NotificationCoalescer:
+    """
+    Merges partner notifications per chat before they reach the SendScheduler.
+
+    A notice waits `debounce` seconds for more of its type for the same chat,
+    each one restarting the wait, but no longer than `max_wait` after the
+    first; the batch then goes out as one message (see Notice.render). Only
+    notices handled by this process are merged.
+    """
+
+    def __init__(
+        self,
+        send_scheduler: SendScheduler,
+        debounce: float = NOTIFY_DEBOUNCE,
+        max_wait: float = NOTIFY_MAX_WAIT,
+    ):
+        self.send_scheduler = send_scheduler
+        self.debounce = debounce
+        self.max_wait = max_wait
+
+        self._pending: dict[tuple[int, type[Notice]], _Batch] = {}
+
+        self.received = 0
+        self.messages = 0
+
+    def add(self, chat_id: int, notice: Notice):
+        self.received += 1
+        if self.debounce <= 0:
+            self._send(chat_id, [notice])
+            return
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        key = (chat_id, type(notice))
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _Batch(first_at=now)
+        elif batch.timer is not None:
+            batch.timer.cancel()
+
+        batch.notices.append(notice)
+        due = min(now + self.debounce, batch.first_at + self.max_wait)
+        batch.timer = loop.call_at(due, self._flush, key)
+
+    async def stop(self):
+        """Send everything still waiting; call before the SendScheduler stops."""
+        sending = []
+        for key, batch in list(self._pending.items()):
+            if batch.timer is not None:
+                batch.timer.cancel()
+            sending.extend(self._flush(key))
+
+        if sending:
+            await asyncio.gather(*sending, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": sum(len(batch.notices) for batch in self._pending.values()),
+            "received": self.received,
+            "messages": self.messages,
+        }
+
+    def _flush(self, key: tuple[int, type[Notice]]) -> list[asyncio.Future]:
+        batch = self._pending.pop(key, None)
+        return self._send(key[0], batch.notices) if batch is not None else []
+
+    def _send(self, chat_id: int, notices: list[Notice]) -> list[asyncio.Future]:
+        futures = []
+        for text in type(notices[0]).render(notices):
+            self.messages += 1
+            future = self.send_scheduler.submit(chat_id, text)
+            future.add_done_callback(lambda sent: self._on_sent(chat_id, sent))
+            futures.append(future)
+        return futures
+
+    def _on_sent(self, chat_id: int, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(
+                f"Notification to chat {chat_id} failed: {future.exception()!r}"
+            )
@@ -0,0 +1,111 @@
+import re
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.config import UPDATE_DEDUP_DB, UPDATE_DEDUP_SIZE
+from src.core.logging import logger
+from src.database.core import AsyncSessionLocal
+from src.database.entities.processed_update import ProcessedUpdate
+
+# Telegram always serialises update_id first; only the head of the body is read.
+_UPDATE_ID_PATTERN = re.compile(rb'"update_id"\s*:\s*(\d+)')
+_UPDATE_ID_SCAN_BYTES = 64
+
+
+def extract_update_id(body: bytes) -> Optional[int]:
+    match = _UPDATE_ID_PATTERN.search(body, 0, _UPDATE_ID_SCAN_BYTES)
+    return int(match.group(1)) if match else None
+
+
+class UpdateDeduplicator:
+    """
+    Drops redelivered webhook updates by update_id.
+
+    Keeps the last `size` ids in memory (set + FIFO ring). With `use_db`, new
+    ids are also claimed in `processed_updates` so a retry that lands on a
+    different worker is caught too.
+    """
+
+    def __init__(self, size: int = UPDATE_DEDUP_SIZE, use_db: bool = UPDATE_DEDUP_DB):
+        self.size = size
+        self.use_db = use_db
+
+        self._seen: set[int] = set()
+        self._ring: deque[int] = deque()
+        self._claims_since_purge = 0
+
+        self.duplicates = 0
+
+    async def claim(self, update_id: int) -> bool:
+        """Returns False if this update_id was already accepted."""
+        if update_id in self._seen:
+            self.duplicates += 1
+            return False
+
+        # Not remembered when refused: the worker that holds the claim may
+        # still release it, and the retry can land here.
+        if self.use_db and not await self._claim_in_db(update_id):
+            self.duplicates += 1
+            return False
+
+        self._remember(update_id)
+        return True
+
+    async def release(self, update_id: int):
+        """Forget a claimed update that was refused, so its retry is accepted."""
+        self._seen.discard(update_id)
+        # Also out of the ring, or evicting this stale entry would later forget
+        # the retry's claim early. It was claimed recently, so search from the end.
+        for i, seen_id in enumerate(reversed(self._ring)):
+            if seen_id == update_id:
+                del self._ring[-1 - i]
+                break
+
+        if self.use_db:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    delete(ProcessedUpdate).where(
+                        ProcessedUpdate.update_id == update_id
+                    )
+                )
+                await session.commit()
+
+    def stats(self) -> dict[str, int]:
+        return {"tracked": len(self._seen), "duplicates": self.duplicates}
+
+    def _remember(self, update_id: int):
+        self._seen.add(update_id)
+        self._ring.append(update_id)
+
+        while len(self._ring) > self.size:
+            self._seen.discard(self._ring.popleft())
+
+    async def _claim_in_db(self, update_id: int) -> bool:
+        stmt = (
+            insert(ProcessedUpdate)
+            .values(update_id=update_id)
+            .on_conflict_do_nothing(index_elements=[ProcessedUpdate.update_id])
+            .returning(ProcessedUpdate.update_id)
+        )
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(stmt)
+            claimed = result.scalar_one_or_none() is not None
+
+            # update_ids only grow, so old ones can be purged by primary key.
+            self._claims_since_purge += 1
+            if self._claims_since_purge >= self.size:
+                self._claims_since_purge = 0
+                await session.execute(
+                    delete(ProcessedUpdate).where(
+                        ProcessedUpdate.update_id < update_id - self.size
+                    )
+                )
+                logger.info(f"Purged processed updates older than {update_id - self.size}")
+
+            await session.commit()
+
+        return claimed
@@ -2,9 +2,24 @@ from typing import Annotated
 from fastapi import Depends, Request
 from aiogram import Bot
 
+from src.telegram_bot.coalescer import NotificationCoalescer
+from src.telegram_bot.sender import SendScheduler
+
 
 def get_bot(request: Request) -> Bot:
     return request.app.state.bot
 
 
+def get_send_scheduler(request: Request) -> SendScheduler:
+    return request.app.state.send_scheduler
+
+
+def get_notification_coalescer(request: Request) -> NotificationCoalescer:
+    return request.app.state.notification_coalescer
+
+
 BotDep = Annotated[Bot, Depends(get_bot)]
+SendSchedulerDep = Annotated[SendScheduler, Depends(get_send_scheduler)]
+NotificationCoalescerDep = Annotated[
+    NotificationCoalescer, Depends(get_notification_coalescer)
+]
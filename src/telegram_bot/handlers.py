@@ -1,27 +1,35 @@
 from aiogram import F, Router
 from aiogram.filters.command import CommandObject, CommandStart, Command
-from aiogram.types import Message
-from src.core.config import SONG_LINK_PATTERN
+from aiogram.types import CallbackQuery, LinkPreviewOptions, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 from src.core.exceptions import (
     AlreadyConnectedError,
     CannotJoinOwnCodeError,
     ConnectionNotFoundError,
     InvalidPairCodeError,
+    PairCodeUnavailableError,
 )
-from src.core.utils.songs import generate_track_url
+from src.core.utils.songs import SongLink, extract_song_links, generate_track_url
+from src.core.utils.stats import format_duration
+from src.modules.connections.model import ActiveConnection
 from src.modules.connections.service import ConnectionService
 from src.modules.songs.service import SongService
+from src.modules.stats.model import SenderStats
+from src.modules.stats.service import StatsService
 from src.modules.users.service import UserService
-from src.modules.users.model import UserData
-from src.modules.songs.model import SendSongData
-from src.database.entities.user import User
-from src.database.entities.connection import Connection as DBConnection
+from src.modules.users.model import UserData, UserIdentity
+from src.modules.songs.model import HistoryPage, SendSongsData
+from src.telegram_bot.callbacks import HistoryPageCallback
+from src.telegram_bot.coalescer import NotificationCoalescer, SongsSent
+from src.telegram_bot.sender import SendScheduler
 
 router = Router()
 
 
 @router.message(CommandStart())
-async def start_handler(message: Message, user_service: UserService):
+async def start_handler(
+    message: Message, user_service: UserService, send_scheduler: SendScheduler
+):
     if not message.from_user:
         return
 
@@ -33,7 +41,8 @@ async def start_handler(message: Message, user_service: UserService):
 
     user = await user_service.get_or_create_user(user_data)
 
-    await message.answer(
+    await send_scheduler.answer(
+        message,
         f"Hello {user.first_name}! Welcome to Song Pal Bot! 🎵\n\n"
         f"Use /pair to generate a connection code!"
     )
@@ -41,22 +50,29 @@ async def start_handler(message: Message, user_service: UserService):
 
 @router.message(Command("pair"), flags={"auth_required": True})
 async def pair_handler(
-    message: Message, user: User, connection_service: ConnectionService
+    message: Message,
+    user: UserIdentity,
+    connection_service: ConnectionService,
+    send_scheduler: SendScheduler,
 ):
     try:
         connection = await connection_service.get_or_create_pair_code(user.id)
 
-        await message.answer(
+        await send_scheduler.answer(
+            message,
             "Send this command to your partner. When they tap it, you'll be linked! 🔗"
         )
         # Send the full command in a separate message
-        await message.answer(
-            f"`/connect {connection.pair_code}`", parse_mode="Markdown"
+        await send_scheduler.answer(
+            message, f"`/connect {connection.pair_code}`", parse_mode="Markdown"
         )
-    except AlreadyConnectedError as error:
-        await message.answer(str(error))
+    except (AlreadyConnectedError, PairCodeUnavailableError) as error:
+        await send_scheduler.answer(message, str(error))
     except Exception as e:
-        await message.answer("An error occurred while generating your pair code. Please try again.")
+        await send_scheduler.answer(
+            message,
+            "An error occurred while generating your pair code. Please try again.",
+        )
         raise  # Re-raise to see in logs
 
 
@@ -64,27 +80,31 @@ async def pair_handler(
 async def connect_handler(
     message: Message,
     command: CommandObject,
-    user: User,
+    user: UserIdentity,
     user_service: UserService,
     connection_service: ConnectionService,
+    send_scheduler: SendScheduler,
 ):
     pair_code = command.args
     if not pair_code:
-        await message.answer("Please provide a code! Usage: `/connect <code>`")
+        await send_scheduler.answer(
+            message, "Please provide a code! Usage: `/connect <code>`"
+        )
         return
 
     try:
         connection = await connection_service.join_connection(user.id, pair_code)
 
-        await message.answer(
+        await send_scheduler.answer(
+            message,
             "Successfully connected! 🎵\n\n"
             "You can now send Spotify/YouTube links to share music!"
         )
 
         user1 = await user_service.get_user_by_id(connection.user1_id)
 
-        if user1 and message.bot:
-            await message.bot.send_message(
+        if user1:
+            await send_scheduler.send_message(
                 chat_id=user1.telegram_id,
                 text=f"{user.first_name} connected successfully!",
             )
@@ -94,63 +114,80 @@ async def connect_handler(
         CannotJoinOwnCodeError,
         InvalidPairCodeError,
     ) as error:
-        await message.answer(str(error))
+        await send_scheduler.answer(message, str(error))
 
 
 @router.message(Command("disconnect"), flags={"auth_required": True})
 async def disconnect_handler(
     message: Message,
-    user: User,
+    user: UserIdentity,
     connection_service: ConnectionService,
+    send_scheduler: SendScheduler,
 ):
     try:
         await connection_service.leave_connection(user.id)
 
-        await message.answer("Disconnected! 💔\nYou are no longer paired.")
+        await send_scheduler.answer(
+            message, "Disconnected! 💔\nYou are no longer paired."
+        )
 
     except ConnectionNotFoundError as e:
-        await message.answer(str(e))
+        await send_scheduler.answer(message, str(e))
 
 
 @router.message(
-    F.text.regexp(SONG_LINK_PATTERN),
+    F.text.func(extract_song_links).as_("song_links"),
     flags={"auth_required": True, "connection_required": True},
 )
 async def send_song_handler(
     message: Message,
-    user: User,
+    user: UserIdentity,
     user_service: UserService,
-    connection: DBConnection,
+    connection: ActiveConnection,
     song_service: SongService,
+    notification_coalescer: NotificationCoalescer,
+    send_scheduler: SendScheduler,
+    song_links: list[SongLink],
 ):
     receiver_id = (
         connection.user2_id if connection.user1_id == user.id else connection.user1_id
     )
 
     if receiver_id is None:
-        await message.answer("Error: Connection corrupted (no receiver found).")
+        await send_scheduler.answer(
+            message, "Error: Connection corrupted (no receiver found)."
+        )
         return
 
-    payload = SendSongData.model_validate(
+    payload = SendSongsData.model_validate(
         {
             "sender_id": user.id,
             "receiver_id": receiver_id,
             "connection_id": connection.id,
-            "link": message.text,
+            "links": song_links,
         }
     )
 
-    song = await song_service.send_song(payload)
-
-    track_url = generate_track_url(song.track_token)
+    songs = await song_service.send_songs(payload)
+    if not songs:
+        await send_scheduler.answer(
+            message, "You've already sent that to your partner! 🎵"
+        )
+        return
 
     receiver_user = await user_service.get_user_by_id(receiver_id)
 
-    if receiver_user and message.bot:
-        await message.bot.send_message(
-            chat_id=receiver_user.telegram_id,
-            text=f"🎵 {user.first_name} sent you a song! Click here to listen: {track_url}",
-        )
+    if not receiver_user:
+        return
+
+    # Songs pasted in quick succession reach the partner as one message.
+    notification_coalescer.add(
+        receiver_user.telegram_id,
+        SongsSent(
+            sender_name=user.first_name,
+            track_urls=tuple(generate_track_url(song.track_token) for song in songs),
+        ),
+    )
 
 
 @router.message(
@@ -158,12 +195,14 @@ async def send_song_handler(
 )
 async def status_handler(
     message: Message,
-    user: User,
+    user: UserIdentity,
     user_service: UserService,
-    connection: DBConnection,
+    connection: ActiveConnection,
+    send_scheduler: SendScheduler,
 ):
     if not connection.user2_id:
-        await message.answer(
+        await send_scheduler.answer(
+            message,
             "You're not connected! Use /pair to generate a connection code!"
         )
         return
@@ -184,4 +223,146 @@ async def status_handler(
         f"Connected at:"
         f"{connection.connected_at.strftime('%d %B %Y %H:%M') if connection.connected_at else 'N/A'}"
     )
-    await message.answer(status_msg)
+    await send_scheduler.answer(message, status_msg)
+
+
+def _format_sender_stats(stats: SenderStats) -> str:
+    if not stats.songs_sent:
+        return "no songs yet"
+
+    lines = [f"{stats.songs_sent} sent, {stats.songs_listened} listened"]
+    if stats.listen_rate is not None:
+        lines[0] += f" ({stats.listen_rate:.0%})"
+    if stats.median_listen_seconds is not None and stats.mean_listen_seconds is not None:
+        lines.append(
+            f"time to listen: median ~{format_duration(stats.median_listen_seconds)}, "
+            f"mean {format_duration(stats.mean_listen_seconds)}"
+        )
+    return "\n".join(lines)
+
+
+@router.message(
+    Command("stats"), flags={"auth_required": True, "connection_required": True}
+)
+async def stats_handler(
+    message: Message,
+    user: UserIdentity,
+    user_service: UserService,
+    connection: ActiveConnection,
+    stats_service: StatsService,
+    send_scheduler: SendScheduler,
+):
+    partner_id = (
+        connection.user2_id if connection.user1_id == user.id else connection.user1_id
+    )
+    if partner_id is None:
+        await send_scheduler.answer(
+            message, "Error: Connection corrupted (no receiver found)."
+        )
+        return
+
+    stats = await stats_service.get_pair_stats(connection.id, user.id, partner_id)
+    partner = await user_service.get_user_by_id(partner_id)
+    partner_name = partner.first_name if partner else "Unknown User"
+
+    await send_scheduler.answer(
+        message,
+        f"📊 Stats with {partner_name}\n\n"
+        f"🎵 You → {partner_name}:\n{_format_sender_stats(stats.sent)}\n\n"
+        f"🎧 {partner_name} → You:\n{_format_sender_stats(stats.received)}"
+    )
+
+
+def _render_history(
+    page: HistoryPage, user: UserIdentity, partner_name: str
+) -> tuple[str, InlineKeyboardBuilder]:
+    lines = [f"🗂 Songs shared with {partner_name}, newest first:\n"]
+    for i, entry in enumerate(page.entries, start=1):
+        status = "✅" if entry.listened_at else "👀" if entry.clicked_at else "⏳"
+        sender = "You" if entry.sender_id == user.id else partner_name
+        lines.append(
+            f"{i}) {status} {sender}, {entry.created_at.strftime('%d %b %Y')}\n"
+            f"{entry.link}"
+        )
+
+    # The buttons carry the page's edge rows as keyset cursors.
+    keyboard = InlineKeyboardBuilder()
+    first, last = page.entries[0], page.entries[-1]
+    if page.has_newer:
+        newer = HistoryPageCallback.from_cursor("n", first.created_at, first.id)
+        keyboard.button(text="⬅️ Newer", callback_data=newer)
+    if page.has_older:
+        older = HistoryPageCallback.from_cursor("o", last.created_at, last.id)
+        keyboard.button(text="Older ➡️", callback_data=older)
+
+    return "\n".join(lines), keyboard
+
+
+async def _partner_name(
+    user: UserIdentity, connection: ActiveConnection, user_service: UserService
+) -> str:
+    partner_id = (
+        connection.user2_id if connection.user1_id == user.id else connection.user1_id
+    )
+    partner = await user_service.get_user_by_id(partner_id) if partner_id else None
+    return partner.first_name if partner else "Unknown User"
+
+
+@router.message(
+    Command("history"), flags={"auth_required": True, "connection_required": True}
+)
+async def history_handler(
+    message: Message,
+    user: UserIdentity,
+    user_service: UserService,
+    connection: ActiveConnection,
+    song_service: SongService,
+    send_scheduler: SendScheduler,
+):
+    page = await song_service.get_history(connection.id)
+    if not page.entries:
+        await send_scheduler.answer(
+            message,
+            "No songs shared yet! Send a Spotify or YouTube link to get started. 🎵"
+        )
+        return
+
+    text, keyboard = _render_history(
+        page, user, await _partner_name(user, connection, user_service)
+    )
+    await send_scheduler.answer(
+        message,
+        text,
+        reply_markup=keyboard.as_markup(),
+        link_preview_options=LinkPreviewOptions(is_disabled=True),
+    )
+
+
+@router.callback_query(
+    HistoryPageCallback.filter(),
+    flags={"auth_required": True, "connection_required": True},
+)
+async def history_page_handler(
+    callback: CallbackQuery,
+    callback_data: HistoryPageCallback,
+    user: UserIdentity,
+    user_service: UserService,
+    connection: ActiveConnection,
+    song_service: SongService,
+):
+    page = await song_service.get_history(
+        connection.id, callback_data.cursor, newer=callback_data.direction == "n"
+    )
+    if not page.entries or not isinstance(callback.message, Message):
+        await callback.answer("No more songs.")
+        return
+
+    text, keyboard = _render_history(
+        page, user, await _partner_name(user, connection, user_service)
+    )
+    await callback.message.edit_text(
+        text,
+        reply_markup=keyboard.as_markup(),
+        link_preview_options=LinkPreviewOptions(is_disabled=True),
+    )
+    await callback.answer()
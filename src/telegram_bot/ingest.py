@@ -0,0 +1,121 @@
+import asyncio
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from src.core.config import (
+    WEBHOOK_ENQUEUE_TIMEOUT,
+    WEBHOOK_SHARD_QUEUE_SIZE,
+    WEBHOOK_SHARDS,
+)
+from src.core.logging import logger
+
+
+def shard_key(update: Update) -> int:
+    """Chat id (or user id) the update belongs to; update_id as a last resort."""
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+
+    return update.update_id
+
+
+class UpdateIngestor:
+    """
+    Feeds webhook updates to the dispatcher in the background so the webhook
+    can ack immediately.
+
+    Updates are routed to one of `shards` worker queues by chat, so each chat
+    is processed strictly in order while different chats run in parallel. When
+    a shard's queue stays full for `enqueue_timeout` seconds the update is
+    refused, so Telegram backs off and redelivers it.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        shards: int = WEBHOOK_SHARDS,
+        queue_size: int = WEBHOOK_SHARD_QUEUE_SIZE,
+        enqueue_timeout: float = WEBHOOK_ENQUEUE_TIMEOUT,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.enqueue_timeout = enqueue_timeout
+
+        self._queues: list[asyncio.Queue[Optional[Update]]] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(shards)
+        ]
+        self._workers: list[asyncio.Task] = []
+
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    async def start(self):
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._run(queue)) for queue in self._queues
+            ]
+
+    async def submit(self, update: Update) -> bool:
+        queue = self._queues[shard_key(update) % len(self._queues)]
+
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(queue.put(update), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return False
+
+        return True
+
+    async def stop(self):
+        for queue in self._queues:
+            await queue.put(None)
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    def stats(self) -> dict[str, object]:
+        depths = [queue.qsize() for queue in self._queues]
+        return {
+            "in_flight": sum(depths) + self.running,
+            "running": self.running,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "shard_depth": depths,
+        }
+
+    async def _run(self, queue: asyncio.Queue[Optional[Update]]):
+        while True:
+            update = await queue.get()
+            if update is None:
+                return
+
+            self.running += 1
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"Failed to process update {update.update_id}: {e!r}")
+            else:
+                self.processed += 1
+            finally:
+                self.running -= 1
@@ -1,39 +1,128 @@
+import time
 from typing import Callable, Any, Dict, Awaitable
-from aiogram import BaseMiddleware
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
 from aiogram.dispatcher.flags import get_flag
-from aiogram.types import TelegramObject, Message
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import CallbackQuery, TelegramObject, Message
 
-from src.database.core import AsyncSessionLocal
+from src.database.core import LazySession
 from src.modules.connections.service import ConnectionService
 from src.modules.songs.service import SongService
+from src.modules.stats.service import StatsService
 from src.modules.users.service import UserService
-from src.core.enums import ConnectionStatus
+from src.core.metrics import BOT_API_DURATION, BOT_API_ERRORS, HANDLER_DURATION
+from src.telegram_bot.sender import SendScheduler
+
+
+SERVICE_FACTORIES: Dict[str, Callable[[Any], Any]] = {
+    "user_service": UserService,
+    "connection_service": ConnectionService,
+    "song_service": SongService,
+    "stats_service": StatsService,
+}
+
+
+def get_service(data: Dict[str, Any], name: str) -> Any:
+    service = data.get(name)
+    if service is None:
+        service = data[name] = SERVICE_FACTORIES[name](data["db"])
+    return service
+
+
+async def answer(event: Message | CallbackQuery, data: Dict[str, Any], text: str):
+    """Reply to `event`; messages go through the SendScheduler like handlers'."""
+    if isinstance(event, Message):
+        send_scheduler: SendScheduler = data["send_scheduler"]
+        return await send_scheduler.answer(event, text)
+    return await event.answer(text)
 
 
 class DatabaseMiddleware(BaseMiddleware):
+    def __init__(self):
+        self.updates = 0
+        self.updates_without_db = 0
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any],
     ):
-        async with AsyncSessionLocal() as session:
-            data["db"] = session
+        session = LazySession()
+        data["db"] = session
+        try:
             return await handler(event, data)
+        finally:
+            self.updates += 1
+            if session.is_used:
+                await session.close()
+            else:
+                self.updates_without_db += 1
 
 
-class ServiceMiddleware(BaseMiddleware):
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: times each matched handler by its function name."""
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any],
     ):
-        db = data["db"]
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await handler(event, data)
+            status = "ok"
+            return result
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - started, name, status)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Bot session middleware: times outbound Bot API calls per method."""
 
-        data["user_service"] = UserService(db)
-        data["connection_service"] = ConnectionService(db)
-        data["song_service"] = SongService(db)
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            BOT_API_ERRORS.inc(api_method, type(e).__name__)
+            raise
+        finally:
+            BOT_API_DURATION.observe(time.perf_counter() - started, api_method)
+
+
+class ServiceMiddleware(BaseMiddleware):
+    """
+    Inner middleware: runs only once a handler has matched, and builds just the
+    services that handler asks for. Guards fetch theirs through get_service.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ):
+        handler_object = data.get("handler")
+        if handler_object:
+            for name in SERVICE_FACTORIES.keys() & handler_object.params:
+                get_service(data, name)
 
         return await handler(event, data)
 
@@ -45,7 +134,7 @@ class AuthGuardMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ):
-        if not isinstance(event, Message):
+        if not isinstance(event, (Message, CallbackQuery)):
             return await handler(event, data)
 
         if not get_flag(data, "auth_required"):
@@ -54,11 +143,11 @@ class AuthGuardMiddleware(BaseMiddleware):
         if not event.from_user:
             return await handler(event, data)
 
-        user_service: UserService = data["user_service"]
+        user_service: UserService = get_service(data, "user_service")
         user = await user_service.get_user_by_telegram_id(event.from_user.id)
 
         if not user:
-            return await event.answer("Please run /start first!")
+            return await answer(event, data, "Please run /start first!")
 
         data["user"] = user
         return await handler(event, data)
@@ -78,15 +167,17 @@ class ConnectionGuardMiddleware(BaseMiddleware):
         if not user:
             return await handler(event, data)
 
-        connection_service: ConnectionService = data["connection_service"]
-        connection = await connection_service.get_connection(
-            user.id, ConnectionStatus.CONNECTED
+        connection_service: ConnectionService = get_service(
+            data, "connection_service"
         )
+        connection = await connection_service.get_active_connection(user.id)
 
         if not connection:
-            if isinstance(event, Message):
-                return await event.answer(
-                    "You're not connected! Use /pair to generate a connection code!"
+            if isinstance(event, (Message, CallbackQuery)):
+                return await answer(
+                    event,
+                    data,
+                    "You're not connected! Use /pair to generate a connection code!",
                 )
             return None
 
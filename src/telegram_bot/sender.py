@@ -0,0 +1,270 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+from src.core.config import (
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_PER_CHAT_BURST,
+    TELEGRAM_PER_CHAT_RATE,
+    TELEGRAM_SEND_CONCURRENCY,
+    TELEGRAM_SEND_MAX_RETRIES,
+)
+from src.core.logging import logger
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        """
+        Take one token, going into debt if the bucket is empty.
+        Returns how long the caller has to wait before using it.
+        """
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        return self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+@dataclass(order=True)
+class _SendJob:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    kwargs: dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    reserved: bool = field(default=False, compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class SendSchedulerStopped(Exception):
+    def __init__(self):
+        super().__init__("The send scheduler stopped before this message went out")
+
+
+class SendScheduler:
+    """
+    Shared outbound queue for Bot API sends.
+
+    Paces traffic with a global token bucket plus one bucket per chat, backs off
+    on 429 `retry_after` and always serves INTERACTIVE jobs before BULK ones.
+    """
+
+    _MAX_IDLE_BUCKETS = 10_000
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        per_chat_rate: float = TELEGRAM_PER_CHAT_RATE,
+        per_chat_burst: float = TELEGRAM_PER_CHAT_BURST,
+        concurrency: int = TELEGRAM_SEND_CONCURRENCY,
+        max_retries: int = TELEGRAM_SEND_MAX_RETRIES,
+    ):
+        self.bot = bot
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._queue: asyncio.PriorityQueue[_SendJob] = asyncio.PriorityQueue()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: set[asyncio.Task] = set()
+        # Jobs waiting for their chat slot, by seq, with the timer re-queuing them
+        self._parked: dict[int, tuple[_SendJob, asyncio.TimerHandle]] = {}
+
+        self.queued = {priority: 0 for priority in Priority}
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    async def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        # Whatever hasn't gone out fails, so nobody awaits it forever.
+        for job, timer in self._parked.values():
+            timer.cancel()
+            self._drop(job)
+        self._parked.clear()
+
+        while not self._queue.empty():
+            self._drop(self._queue.get_nowait())
+
+    def submit(
+        self, chat_id: int, text: str, priority: Priority = Priority.INTERACTIVE, **kwargs
+    ) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        job = _SendJob(
+            priority=priority,
+            seq=next(self._seq),
+            chat_id=chat_id,
+            kwargs={"text": text, **kwargs},
+            future=future,
+            enqueued_at=time.monotonic(),
+        )
+        self._enqueue(job)
+        return future
+
+    async def send_message(
+        self, chat_id: int, text: str, priority: Priority = Priority.INTERACTIVE, **kwargs
+    ) -> Message:
+        return await self.submit(chat_id, text, priority, **kwargs)
+
+    async def answer(self, message: Message, text: str, **kwargs) -> Message:
+        """Reply in `message`'s chat, like message.answer() but queued."""
+        return await self.send_message(message.chat.id, text, **kwargs)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": {
+                priority.name.lower(): count for priority, count in self.queued.items()
+            },
+            "in_flight": len(self._in_flight),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "latency_avg_seconds": self.latency_total / self.sent if self.sent else 0.0,
+            "latency_max_seconds": self.latency_max,
+        }
+
+    def _enqueue(self, job: _SendJob):
+        self.queued[Priority(job.priority)] += 1
+        self._queue.put_nowait(job)
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self._MAX_IDLE_BUCKETS:
+                self._chat_buckets = {
+                    key: value
+                    for key, value in self._chat_buckets.items()
+                    if not value.is_idle(now)
+                }
+            bucket = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            job = await self._queue.get()
+            self.queued[Priority(job.priority)] -= 1
+
+            if job.future.cancelled():
+                continue
+
+            now = time.monotonic()
+
+            # Reserve the chat slot up front so same-chat jobs keep their order,
+            # and park the job until its slot opens instead of blocking the lane.
+            if not job.reserved:
+                job.reserved = True
+                delay = self._chat_bucket(job.chat_id, now).reserve(now)
+                if delay > 0:
+                    self.queued[Priority(job.priority)] += 1
+                    self._parked[job.seq] = (
+                        job,
+                        loop.call_later(delay, self._unpark, job),
+                    )
+                    continue
+
+            pause = self._paused_until - now
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            delay = self._global_bucket.reserve(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._deliver(job))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    def _unpark(self, job: _SendJob):
+        del self._parked[job.seq]
+        self._queue.put_nowait(job)
+
+    async def _deliver(self, job: _SendJob):
+        try:
+            result = await self.bot.send_message(chat_id=job.chat_id, **job.kwargs)
+        except TelegramRetryAfter as error:
+            job.attempts += 1
+            if job.attempts > self.max_retries:
+                self._fail(job, error)
+                return
+
+            self.retried += 1
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + error.retry_after
+            )
+            logger.warning(
+                f"Telegram flood control, retrying chat {job.chat_id} "
+                f"in {error.retry_after}s"
+            )
+            self._enqueue(job)
+        except Exception as error:
+            self._fail(job, error)
+        else:
+            latency = time.monotonic() - job.enqueued_at
+            self.sent += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def _drop(self, job: _SendJob):
+        self.queued[Priority(job.priority)] -= 1
+        if not job.future.done():
+            self._fail(job, SendSchedulerStopped())
+
+    def _fail(self, job: _SendJob, error: Exception):
+        self.failed += 1
+        if not job.future.done():
+            job.future.set_exception(error)
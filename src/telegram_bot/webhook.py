@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+
+from aiogram import Bot
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql.functions import now
+
+from src.core.config import (
+    TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+    TELEGRAM_WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from src.core.logging import logger
+from src.database.core import engine
+from src.database.entities.webhook_registration import WebhookRegistration
+
+# Arbitrary app-wide key for pg_try_advisory_lock.
+WEBHOOK_LOCK_KEY = 0x50A1_0001
+
+
+def secret_hash(secret: str | None) -> str:
+    return hashlib.sha256((secret or "").encode()).hexdigest()
+
+
+async def _webhook_current(
+    bot: Bot, conn: AsyncConnection, allowed_updates: list[str]
+) -> bool:
+    info = await bot.get_webhook_info()
+    if (
+        info.url != WEBHOOK_URL
+        or set(info.allowed_updates or ()) != set(allowed_updates)
+        or info.max_connections != TELEGRAM_WEBHOOK_MAX_CONNECTIONS
+    ):
+        return False
+
+    registered = await conn.scalar(
+        select(WebhookRegistration.secret_hash).where(
+            WebhookRegistration.bot_id == bot.id
+        )
+    )
+    return registered == secret_hash(TELEGRAM_WEBHOOK_SECRET)
+
+
+async def ensure_webhook(bot: Bot, allowed_updates: list[str]) -> bool:
+    """
+    Register the webhook from at most one worker at a time.
+
+    setWebhook is only called when Telegram's URL, allowed updates or
+    connection limit differ from ours, or the secret changed. getWebhookInfo
+    doesn't report the secret token, so a hash of the last registered one is
+    kept in `webhook_registrations`.
+
+    Returns False if another worker holds the lock and is handling it.
+    Pending updates are kept, so restarts don't lose messages.
+    """
+    async with engine.connect() as conn:
+        locked = await conn.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": WEBHOOK_LOCK_KEY}
+        )
+        if not locked:
+            return False
+
+        try:
+            if await _webhook_current(bot, conn, allowed_updates):
+                logger.info(f"Webhook already registered at {WEBHOOK_URL}")
+                return True
+
+            await bot.set_webhook(
+                WEBHOOK_URL,
+                secret_token=TELEGRAM_WEBHOOK_SECRET,
+                allowed_updates=allowed_updates,
+                max_connections=TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+            )
+            stmt = insert(WebhookRegistration).values(
+                bot_id=bot.id, secret_hash=secret_hash(TELEGRAM_WEBHOOK_SECRET)
+            )
+            await conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[WebhookRegistration.bot_id],
+                    set_={
+                        "secret_hash": stmt.excluded.secret_hash,
+                        "registered_at": now(),
+                    },
+                )
+            )
+            logger.info(f"Webhook registered at {WEBHOOK_URL}")
+        finally:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": WEBHOOK_LOCK_KEY}
+            )
+            await conn.commit()
+
+    return True
+
+
+async def startup(
+    bot: Bot, state, allowed_updates: list[str], max_delay: float = 60.0
+):
+    """Background startup: make sure the webhook is in place, then mark ready."""
+    delay = 1.0
+    while True:
+        try:
+            await ensure_webhook(bot, allowed_updates)
+            break
+        except Exception as e:
+            logger.error(f"Webhook setup failed, retrying in {delay:.0f}s: {e!r}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    state.ready = True
@@ -0,0 +1,202 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, select, update
+
+from src.database.core import AsyncSessionLocal
+from src.database.entities.connection_stats import ConnectionStats
+from src.database.entities.song import Song
+from src.modules.songs import click_buffer as click_buffer_module
+from src.modules.songs.click_buffer import ClickBuffer
+from src.modules.songs.model import SendSongsData
+from src.modules.songs.service import SongService
+
+pytestmark = pytest.mark.anyio
+
+LINKS = [
+    "https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=9bZkp7q19f0",
+]
+
+
+@pytest.fixture
+async def tokens(pair) -> list[str]:
+    """Track tokens of songs U1 sent U2, the last in the older undated form."""
+    user1, user2, connection = pair
+    async with AsyncSessionLocal() as db:
+        songs = await SongService(db).send_songs(
+            SendSongsData(
+                sender_id=user1.id,
+                receiver_id=user2.id,
+                connection_id=connection.id,
+                links=LINKS,
+            )
+        )
+        await db.execute(
+            update(Song)
+            .where(Song.id == songs[-1].id)
+            .values(track_token="undatedtoken")
+        )
+        await db.commit()
+    return [song.track_token for song in songs[:-1]] + ["undatedtoken"]
+
+
+async def stored(tokens: list[str]) -> dict[str, tuple]:
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(Song.track_token, Song.clicked_at, Song.listened_at).where(
+                Song.track_token.in_(tokens)
+            )
+        )
+        return {row.track_token: (row.clicked_at, row.listened_at) for row in rows}
+
+
+async def songs_listened(pair) -> int:
+    user1, _, connection = pair
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(ConnectionStats.songs_listened).where(
+                ConnectionStats.connection_id == connection.id,
+                ConnectionStats.sender_id == user1.id,
+            )
+        )
+
+
+async def test_clicks_are_written_on_flush(pair, tokens):
+    buffer = ClickBuffer()
+    async with AsyncSessionLocal() as db:
+        service = SongService(db, click_buffer=buffer)
+        clicks = [await service.click_song(token) for token in tokens]
+        again = await service.click_song(tokens[0])
+
+    assert all(click.first_listen for click in clicks)
+    assert not again.first_listen
+    assert all(clicked is None for clicked, _ in (await stored(tokens)).values())
+
+    await buffer.flush()
+
+    rows = await stored(tokens)
+    assert all(clicked and listened for clicked, listened in rows.values())
+    assert await songs_listened(pair) == len(tokens)
+    assert buffer.stats()["pending"] == 0
+
+
+async def test_earliest_timestamps_win(pair, tokens):
+    buffer = ClickBuffer()
+    token = tokens[0]
+    start = datetime.now(timezone.utc)
+    minute = timedelta(minutes=1)
+
+    buffer.record(token, start + minute, None)
+    buffer.record(token, start, start + 2 * minute)
+    await buffer.flush()
+    buffer.record(token, start + 3 * minute, start + minute)
+    await buffer.flush()
+
+    assert (await stored([token]))[token] == (start, start + minute)
+    # The second flush moved listened_at earlier but it was no new listen.
+    assert await songs_listened(pair) == 1
+
+
+async def test_clicks_without_listens(pair, tokens):
+    buffer = ClickBuffer()
+    now = datetime.now(timezone.utc)
+
+    for token in tokens:
+        buffer.record(token, now, None)
+    await buffer.flush()
+
+    assert all(
+        (clicked, listened) == (now, None)
+        for clicked, listened in (await stored(tokens)).values()
+    )
+    assert await songs_listened(pair) == 0
+
+
+async def test_stop_during_flush_keeps_clicks(pair, tokens, monkeypatch):
+    session_factory = click_buffer_module.AsyncSessionLocal
+
+    class SlowSession:
+        """Holds each flush long enough for stop() to land in the middle."""
+
+        def __init__(self):
+            self.session = session_factory()
+
+        async def __aenter__(self):
+            await asyncio.sleep(0.2)
+            return await self.session.__aenter__()
+
+        async def __aexit__(self, *exc_info):
+            return await self.session.__aexit__(*exc_info)
+
+    monkeypatch.setattr(click_buffer_module, "AsyncSessionLocal", SlowSession)
+    buffer = ClickBuffer(interval_ms=20)
+    await buffer.start()
+    now = datetime.now(timezone.utc)
+    for token in tokens:
+        buffer.record(token, now, now)
+
+    await asyncio.sleep(0.1)
+    await buffer.stop()
+
+    rows = await stored(tokens)
+    assert all(row == (now, now) for row in rows.values())
+    assert await songs_listened(pair) == len(tokens)
+    assert buffer.stats()["pending"] == 0
+
+
+async def test_failing_clicks_are_dropped_after_max_attempts(
+    pair, tokens, monkeypatch
+):
+    class BrokenSession:
+        async def __aenter__(self):
+            raise ConnectionError("database is down")
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    monkeypatch.setattr(click_buffer_module, "AsyncSessionLocal", BrokenSession)
+    buffer = ClickBuffer(max_attempts=2)
+    now = datetime.now(timezone.utc)
+    buffer.record(tokens[0], now, now)
+
+    await buffer.flush()
+    # Retried, together with a click that arrived in the meantime.
+    buffer.record(tokens[1], now, None)
+    assert buffer.stats()["pending"] == 2
+
+    await buffer.flush()
+    assert buffer.stats()["pending"] == 1
+    assert buffer.stats()["dropped"] == 1
+    assert buffer.stats()["failed_flushes"] == 2
+
+    monkeypatch.undo()
+    await buffer.flush()
+    rows = await stored(tokens[:2])
+    assert rows[tokens[0]] == (None, None)
+    assert rows[tokens[1]] == (now, None)
+
+
+async def test_listened_songs_skip_the_lookup(pair, tokens):
+    buffer = ClickBuffer()
+    async with AsyncSessionLocal() as db:
+        service = SongService(db, click_buffer=buffer)
+        first = await service.click_song(tokens[0])
+        await buffer.flush()
+
+        statements = []
+        connection = await db.connection()
+        event.listen(
+            connection.sync_connection,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+        again = await service.click_song(tokens[0])
+
+    assert first.first_listen and not again.first_listen
+    assert again.link == first.link
+    assert statements == []
+    assert buffer.stats()["listened_cache_hits"] == 1
+    assert buffer.stats()["pending"] == 1
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from src.database.core import AsyncSessionLocal
+from src.database.entities.connection_stats import ConnectionStats
+from src.database.entities.song import Song
+from src.modules.songs.model import SendSongsData
+from src.modules.songs.service import SongService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def track_token(pair) -> str:
+    user1, user2, connection = pair
+    async with AsyncSessionLocal() as db:
+        songs = await SongService(db).send_songs(
+            SendSongsData(
+                sender_id=user1.id,
+                receiver_id=user2.id,
+                connection_id=connection.id,
+                links=["https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC"],
+            )
+        )
+    return songs[0].track_token
+
+
+async def click(track_token: str, mark_as_listened: bool = True):
+    async with AsyncSessionLocal() as db:
+        return await SongService(db).click_song(track_token, mark_as_listened)
+
+
+async def test_concurrent_clicks_count_one_first_listen(pair, track_token):
+    clicks = await asyncio.gather(*(click(track_token) for _ in range(10)))
+
+    assert sum(result.first_listen for result in clicks) == 1
+    assert all(result.sender_telegram_id == 1 for result in clicks)
+    assert all(result.receiver_first_name == "U2" for result in clicks)
+
+    user1, _, connection = pair
+    async with AsyncSessionLocal() as db:
+        listened = await db.scalar(
+            select(ConnectionStats.songs_listened).where(
+                ConnectionStats.connection_id == connection.id,
+                ConnectionStats.sender_id == user1.id,
+            )
+        )
+    assert listened == 1
+
+
+async def test_click_without_listen_keeps_the_song_unlistened(pair, track_token):
+    result = await click(track_token, mark_as_listened=False)
+    assert not result.first_listen
+
+    async with AsyncSessionLocal() as db:
+        song = await db.scalar(select(Song).where(Song.track_token == track_token))
+    assert song.clicked_at is not None
+    assert song.listened_at is None
+
+    assert (await click(track_token)).first_listen
+
+
+async def test_unknown_token(database):
+    assert await click("20000.unknown") is None
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from src.core.config import SONG_MAX_LINKS_PER_MESSAGE
+from src.telegram_bot.coalescer import (
+    Notice,
+    NotificationCoalescer,
+    SongListened,
+    SongsSent,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSendScheduler:
+    def __init__(self):
+        self.sent: list[tuple[int, str]] = []
+
+    def submit(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        self.sent.append((chat_id, text))
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+
+def songs_sent(*urls: str, sender_name: str = "U1") -> SongsSent:
+    return SongsSent(sender_name=sender_name, track_urls=urls)
+
+
+def test_notice_is_abstract():
+    with pytest.raises(TypeError):
+        Notice()
+
+
+def test_songs_sent_render_merges_and_numbers():
+    [text] = SongsSent.render([songs_sent("a", "b"), songs_sent("b", "c")])
+
+    assert text.startswith("🎵 U1 sent you 3 songs!")
+    assert text.endswith("1) a\n2) b\n3) c")
+
+
+def test_songs_sent_render_splits_long_bursts():
+    urls = [f"u{i}" for i in range(SONG_MAX_LINKS_PER_MESSAGE + 5)]
+
+    texts = SongsSent.render([songs_sent(*urls)])
+
+    assert len(texts) == 2
+    assert f"{len(urls)} songs" in texts[0]
+    assert texts[1].startswith(f"{SONG_MAX_LINKS_PER_MESSAGE + 1}) ")
+
+
+def test_song_listened_render():
+    single = SongListened.render([SongListened("U2", "a")])
+    several = SongListened.render([SongListened("U2", "a"), SongListened("U2", "b")])
+
+    assert single == ["🎧 U2 is listening your song!\na"]
+    assert several == ["🎧 U2 is listening your 2 songs!\na\nb"]
+
+
+async def test_burst_is_sent_as_one_message():
+    sender = FakeSendScheduler()
+    coalescer = NotificationCoalescer(sender, debounce=0.05, max_wait=1)
+
+    for url in ("a", "b", "c"):
+        coalescer.add(7, songs_sent(url))
+        await asyncio.sleep(0.01)
+    assert sender.sent == []
+
+    await asyncio.sleep(0.1)
+    assert len(sender.sent) == 1
+    assert sender.sent[0][0] == 7
+    assert coalescer.stats() == {"pending": 0, "received": 3, "messages": 1}
+
+
+async def test_chats_and_notice_types_are_kept_apart():
+    sender = FakeSendScheduler()
+    coalescer = NotificationCoalescer(sender, debounce=0.05, max_wait=1)
+
+    coalescer.add(1, songs_sent("a"))
+    coalescer.add(2, songs_sent("b"))
+    coalescer.add(1, SongListened("U2", "c"))
+    await asyncio.sleep(0.1)
+
+    assert sorted(chat_id for chat_id, _ in sender.sent) == [1, 1, 2]
+
+
+async def test_max_wait_bounds_a_sustained_burst():
+    sender = FakeSendScheduler()
+    coalescer = NotificationCoalescer(sender, debounce=0.05, max_wait=0.15)
+
+    for i in range(12):
+        coalescer.add(1, songs_sent(f"u{i}"))
+        await asyncio.sleep(0.03)
+    await coalescer.stop()
+
+    # Each add restarts the debounce, so only max_wait ends a batch early.
+    assert 2 <= len(sender.sent) < 12
+    assert coalescer.stats()["received"] == 12
+
+
+async def test_zero_debounce_sends_right_away():
+    sender = FakeSendScheduler()
+    coalescer = NotificationCoalescer(sender, debounce=0, max_wait=0)
+
+    coalescer.add(1, songs_sent("a"))
+
+    assert sender.sent == [(1, "🎵 U1 sent you a song! Click here to listen: a")]
+
+
+async def test_stop_flushes_pending_notices():
+    sender = FakeSendScheduler()
+    coalescer = NotificationCoalescer(sender, debounce=10, max_wait=10)
+
+    coalescer.add(1, songs_sent("a"))
+    coalescer.add(1, songs_sent("b"))
+    await coalescer.stop()
+
+    assert len(sender.sent) == 1
+    assert coalescer.stats()["pending"] == 0
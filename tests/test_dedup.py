@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.database.core import AsyncSessionLocal
+from src.database.entities.processed_update import ProcessedUpdate
+from src.telegram_bot.dedup import UpdateDeduplicator, extract_update_id
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    ("body", "update_id"),
+    [
+        (b'{"update_id":123456789,"message":{}}', 123456789),
+        (b'{"update_id": 42, "message": {}}', 42),
+        (b'{"message":{}}', None),
+        # Only the head of the body is looked at.
+        (b'{"message":{"text":"' + b"x" * 64 + b'"},"update_id":1}', None),
+    ],
+)
+def test_extract_update_id(body, update_id):
+    assert extract_update_id(body) == update_id
+
+
+async def test_redelivered_update_is_dropped():
+    dedup = UpdateDeduplicator(size=10, use_db=False)
+
+    assert await dedup.claim(1)
+    assert not await dedup.claim(1)
+    assert dedup.stats() == {"tracked": 1, "duplicates": 1}
+
+
+async def test_released_update_can_be_claimed_again():
+    dedup = UpdateDeduplicator(size=10, use_db=False)
+
+    assert await dedup.claim(1)
+    await dedup.release(1)
+
+    assert await dedup.claim(1)
+
+
+async def test_released_update_leaves_the_ring():
+    dedup = UpdateDeduplicator(size=3, use_db=False)
+
+    assert await dedup.claim(1)
+    await dedup.release(1)
+    for update_id in (1, 2, 3):
+        assert await dedup.claim(update_id)
+
+    # The retry is one of the last three claims, so it is still remembered; a
+    # stale ring entry for the first claim would have evicted it already.
+    assert not await dedup.claim(1)
+    assert dedup.stats()["tracked"] == 3
+
+
+async def test_only_the_last_ids_are_remembered():
+    dedup = UpdateDeduplicator(size=3, use_db=False)
+
+    for update_id in range(5):
+        assert await dedup.claim(update_id)
+
+    assert dedup.stats()["tracked"] == 3
+    assert await dedup.claim(0)
+    assert not await dedup.claim(4)
+
+
+async def test_update_claimed_by_another_worker_is_dropped(database):
+    worker1 = UpdateDeduplicator(size=10, use_db=True)
+    worker2 = UpdateDeduplicator(size=10, use_db=True)
+
+    assert await worker1.claim(1)
+    assert not await worker2.claim(1)
+
+    # Refused by worker1, so the retry may be accepted anywhere, even by the
+    # worker that turned it away before.
+    await worker1.release(1)
+    assert await worker2.claim(1)
+
+
+async def test_old_claims_are_purged(database):
+    dedup = UpdateDeduplicator(size=5, use_db=True)
+
+    for update_id in range(1, 21):
+        assert await dedup.claim(update_id)
+
+    async with AsyncSessionLocal() as db:
+        oldest = await db.scalar(select(func.min(ProcessedUpdate.update_id)))
+    assert oldest >= 20 - 2 * dedup.size
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from src.database.core import AsyncSessionLocal
+from src.database.entities.song import Song
+from src.modules.songs.service import SongService
+from src.telegram_bot.callbacks import HistoryPageCallback
+
+pytestmark = pytest.mark.anyio
+
+PAGE_SIZE = 4
+
+
+def test_callback_cursor_round_trip():
+    created_at = datetime(2026, 10, 17, 9, 30, 1, 123457, tzinfo=timezone.utc)
+    packed = HistoryPageCallback.from_cursor("o", created_at, 48213).pack()
+
+    callback = HistoryPageCallback.unpack(packed)
+
+    assert len(packed.encode()) <= 64
+    assert callback.direction == "o"
+    assert callback.cursor == (created_at, 48213)
+
+
+@pytest.fixture
+async def song_ids(pair) -> list[int]:
+    """
+    Ids of the pair's 10 songs, newest first. They come in pairs sharing a
+    created_at, so the cursor has to break ties on id.
+    """
+    user1, user2, connection = pair
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "sender_id": user1.id if i % 3 else user2.id,
+            "receiver_id": user2.id if i % 3 else user1.id,
+            "connection_id": connection.id,
+            "link": f"https://open.spotify.com/track/{i:022d}",
+            "track_token": f"tok{i}",
+            "created_at": start + timedelta(minutes=i // 2),
+        }
+        for i in range(10)
+    ]
+    async with AsyncSessionLocal() as db:
+        ids = list(await db.scalars(insert(Song).values(rows).returning(Song.id)))
+        await db.commit()
+
+    created = {song_id: row["created_at"] for song_id, row in zip(ids, rows)}
+    return sorted(ids, key=lambda song_id: (created[song_id], song_id), reverse=True)
+
+
+async def walk(connection_id: int, newer: bool, cursor=None):
+    async with AsyncSessionLocal() as db:
+        return await SongService(db).get_history(
+            connection_id, cursor, newer=newer, limit=PAGE_SIZE
+        )
+
+
+def edge_cursor(entry) -> tuple[datetime, int]:
+    # As the page buttons carry it.
+    return HistoryPageCallback.from_cursor("o", entry.created_at, entry.id).cursor
+
+
+async def test_older_pages_cover_every_song_once(pair, song_ids):
+    connection = pair[2]
+    pages = [await walk(connection.id, newer=False)]
+    while pages[-1].has_older:
+        pages.append(
+            await walk(connection.id, False, edge_cursor(pages[-1].entries[-1]))
+        )
+
+    assert [entry.id for page in pages for entry in page.entries] == song_ids
+    assert [len(page.entries) for page in pages] == [4, 4, 2]
+    assert [page.has_newer for page in pages] == [False, True, True]
+
+
+async def test_newer_pages_walk_back(pair, song_ids):
+    connection = pair[2]
+    first = await walk(connection.id, newer=False)
+    second = await walk(connection.id, False, edge_cursor(first.entries[-1]))
+    last = await walk(connection.id, False, edge_cursor(second.entries[-1]))
+
+    back = await walk(connection.id, True, edge_cursor(last.entries[0]))
+    assert back.entries == second.entries
+    assert back.has_newer and back.has_older
+
+    back = await walk(connection.id, True, edge_cursor(back.entries[0]))
+    assert back.entries == first.entries
+    assert not back.has_newer
+
+
+async def test_empty_history(pair):
+    page = await walk(pair[2].id, newer=False)
+
+    assert page.entries == []
+    assert not page.has_newer and not page.has_older
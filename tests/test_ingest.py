@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from aiogram.types import Update
+
+from src.main import app
+from src.telegram_bot.dedup import UpdateDeduplicator
+from src.telegram_bot.ingest import UpdateIngestor, shard_key
+
+pytestmark = pytest.mark.anyio
+
+
+def message_update(update_id: int, chat_id: int, text: str = "hi") -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "U"},
+            "text": text,
+        },
+    }
+
+
+class FakeDispatcher:
+    """Handles a message for `text`'s number of tenths of a second."""
+
+    def __init__(self):
+        self.started: list[str] = []
+        self.finished: list[str] = []
+
+    async def feed_update(self, bot, update: Update):
+        text = update.message.text
+        self.started.append(text)
+        await asyncio.sleep(int(text.split(":")[1]) / 10)
+        self.finished.append(text)
+
+
+def test_shard_key_is_the_chat():
+    update = Update.model_validate(message_update(7, chat_id=-100))
+    assert shard_key(update) == -100
+
+
+async def test_chats_run_in_parallel_but_each_in_order():
+    dispatcher = FakeDispatcher()
+    ingestor = UpdateIngestor(dispatcher, bot=None, shards=4)
+    await ingestor.start()
+
+    for update_id, (chat_id, text) in enumerate(
+        [(1, "a1:2"), (1, "a2:0"), (2, "b1:0")]
+    ):
+        assert await ingestor.submit(
+            Update.model_validate(message_update(update_id, chat_id, text))
+        )
+    await ingestor.stop()
+
+    # Chat 2 didn't wait for chat 1's slow update; chat 1 kept its order.
+    assert dispatcher.finished == ["b1:0", "a1:2", "a2:0"]
+    assert ingestor.stats()["processed"] == 3
+
+
+@pytest.fixture
+def webhook_app():
+    """The webhook route, with a one-slot backlog that nothing drains."""
+    ingestor = UpdateIngestor(
+        FakeDispatcher(), bot=None, shards=1, queue_size=1, enqueue_timeout=0.01
+    )
+    app.state.update_ingestor = ingestor
+    app.state.update_deduplicator = UpdateDeduplicator(size=10, use_db=False)
+    yield app
+    del app.state.update_ingestor, app.state.update_deduplicator
+
+
+async def test_full_backlog_refuses_and_releases_the_claim(webhook_app):
+    transport = httpx.ASGITransport(app=webhook_app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+
+        async def post(update_id: int):
+            body = json.dumps(message_update(update_id, chat_id=1, text="x:0"))
+            return await client.post("/telegram/webhook", content=body)
+
+        assert (await post(1)).status_code == 200
+        assert (await post(2)).status_code == 503
+        assert webhook_app.state.update_ingestor.stats()["dropped"] == 1
+
+        # The refused update wasn't remembered, so Telegram's retry is taken.
+        await webhook_app.state.update_ingestor._queues[0].get()
+        assert (await post(2)).status_code == 200
+        assert webhook_app.state.update_deduplicator.stats()["duplicates"] == 0
+
+        # A redelivery of an accepted update is acked without queueing it.
+        assert (await post(2)).status_code == 200
+        assert webhook_app.state.update_deduplicator.stats()["duplicates"] == 1
+        assert webhook_app.state.update_ingestor.stats()["in_flight"] == 1
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from src.database.core import AsyncSessionLocal
+from src.database.invalidation import InvalidationBus
+from src.modules.connections.cache import ConnectionCache
+from src.modules.connections.service import CONNECTION_TOPIC, ConnectionService
+from src.modules.users.cache import IdentityCache
+from src.modules.users.model import UserData, UserIdentity
+from src.modules.users.service import USER_TOPIC, UserService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def worker(database):
+    """Another worker's caches, kept in sync through its own bus."""
+    identities, connections = IdentityCache(), ConnectionCache()
+    bus = InvalidationBus()
+    bus.subscribe(USER_TOPIC, identities.invalidate, identities.clear)
+    bus.subscribe(CONNECTION_TOPIC, connections.invalidate, connections.clear)
+    await bus.start()
+    while not bus.connected:
+        await asyncio.sleep(0.01)
+
+    yield identities, connections
+    await bus.stop()
+
+
+async def eventually(condition, timeout: float = 2.0):
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_name_change_reaches_other_workers(worker, create_user):
+    identities, _ = worker
+    user = await create_user(1, "Old")
+    async with AsyncSessionLocal() as db:
+        identity = await UserService(db, identities).get_user_by_id(user.id)
+    assert identity.first_name == "Old"
+
+    async with AsyncSessionLocal() as db:
+        await UserService(db).get_or_create_user(
+            UserData(telegram_id=1, first_name="New")
+        )
+
+    await eventually(lambda: identities.stats()["size"] == 0)
+    async with AsyncSessionLocal() as db:
+        identity = await UserService(db, identities).get_user_by_id(user.id)
+    assert identity.first_name == "New"
+
+
+async def test_unchanged_name_publishes_nothing(worker, create_user):
+    identities, _ = worker
+    user = await create_user(1, "Same")
+    identities.put(UserIdentity.from_entity(user), identities.generation)
+
+    async with AsyncSessionLocal() as db:
+        await UserService(db).get_or_create_user(
+            UserData(telegram_id=1, first_name="Same")
+        )
+    await asyncio.sleep(0.1)
+
+    assert identities.stats()["invalidations"] == 0
+
+
+async def test_disconnect_reaches_other_workers(worker, pair):
+    _, connections = worker
+    user1, _, _ = pair
+    async with AsyncSessionLocal() as db:
+        assert await ConnectionService(db, connections).get_active_connection(user1.id)
+
+    async with AsyncSessionLocal() as db:
+        await ConnectionService(db).leave_connection(user1.id)
+
+    await eventually(lambda: connections.stats()["size"] == 0)
+    async with AsyncSessionLocal() as db:
+        assert not await ConnectionService(db, connections).get_active_connection(
+            user1.id
+        )
+
+
+def test_fill_that_raced_an_invalidation_is_dropped():
+    cache = IdentityCache()
+    identity = UserIdentity(id=1, telegram_id=10, first_name="Old")
+
+    generation = cache.generation
+    cache.invalidate([1])
+    cache.put(identity, generation)
+
+    assert cache.get_by_id(1) is None
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from src.core.enums import ConnectionStatus
+from src.core.exceptions import (
+    AlreadyConnectedError,
+    CannotJoinOwnCodeError,
+    InvalidPairCodeError,
+    PairCodeUnavailableError,
+)
+from src.core.utils.connections import normalize_pair_code
+from src.database.core import AsyncSessionLocal
+from src.database.entities.connection import Connection
+from src.modules.connections import service as connection_service
+from src.modules.connections.service import ConnectionService
+
+pytestmark = pytest.mark.anyio
+
+
+async def pair_code(user_id: int) -> str:
+    async with AsyncSessionLocal() as db:
+        connection = await ConnectionService(db).get_or_create_pair_code(user_id)
+        return connection.pair_code
+
+
+async def join(user_id: int, code: str) -> Connection:
+    async with AsyncSessionLocal() as db:
+        return await ConnectionService(db).join_connection(user_id, code)
+
+
+def test_normalize_pair_code():
+    assert normalize_pair_code("  AB12c ") == "ab12c"
+
+
+async def test_pending_code_is_reused(create_user):
+    user = await create_user(1)
+
+    assert await pair_code(user.id) == await pair_code(user.id)
+
+
+async def test_join_matches_code_in_any_case(create_user):
+    owner = await create_user(1)
+    joiner = await create_user(2)
+    code = await pair_code(owner.id)
+
+    connection = await join(joiner.id, f" {code.upper()} ")
+
+    assert connection.status == ConnectionStatus.CONNECTED
+    assert (connection.user1_id, connection.user2_id) == (owner.id, joiner.id)
+    with pytest.raises(AlreadyConnectedError):
+        await pair_code(owner.id)
+
+
+async def test_join_retires_the_joiners_own_code(create_user):
+    owner = await create_user(1)
+    joiner = await create_user(2)
+    code = await pair_code(owner.id)
+    own_code = await pair_code(joiner.id)
+
+    await join(joiner.id, code)
+
+    async with AsyncSessionLocal() as db:
+        status = await db.scalar(
+            select(Connection.status).where(Connection.pair_code == own_code)
+        )
+    assert status == ConnectionStatus.DISCONNECTED
+
+
+async def test_own_and_unknown_codes_are_refused(create_user):
+    owner = await create_user(1)
+    code = await pair_code(owner.id)
+
+    with pytest.raises(CannotJoinOwnCodeError):
+        await join(owner.id, code)
+    with pytest.raises(InvalidPairCodeError):
+        await join(owner.id, "nope0")
+
+
+async def test_code_is_claimed_once_under_concurrent_joins(create_user):
+    owner = await create_user(1)
+    joiners = [await create_user(telegram_id) for telegram_id in range(2, 7)]
+    code = await pair_code(owner.id)
+
+    results = await asyncio.gather(
+        *(join(joiner.id, code) for joiner in joiners), return_exceptions=True
+    )
+
+    joined = [result for result in results if isinstance(result, Connection)]
+    assert len(joined) == 1
+    assert all(
+        isinstance(result, InvalidPairCodeError)
+        for result in results
+        if not isinstance(result, Connection)
+    )
+
+
+async def test_colliding_code_is_retried(create_user, monkeypatch):
+    codes = iter(["taken", "taken", "fresh1"])
+    monkeypatch.setattr(
+        connection_service, "generate_pair_code", lambda length: next(codes)
+    )
+    first = await create_user(1)
+    second = await create_user(2)
+
+    assert await pair_code(first.id) == "taken"
+    assert await pair_code(second.id) == "fresh1"
+
+
+async def test_gives_up_after_max_attempts(create_user, monkeypatch):
+    monkeypatch.setattr(
+        connection_service, "generate_pair_code", lambda length: "taken"
+    )
+    first = await create_user(1)
+    second = await create_user(2)
+    await pair_code(first.id)
+
+    with pytest.raises(PairCodeUnavailableError):
+        await pair_code(second.id)
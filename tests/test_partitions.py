@@ -0,0 +1,68 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from src.database.core import AsyncSessionLocal
+from src.database.partitions import (
+    PARTITION_NAME_RE,
+    ensure_month_partitions,
+    month_partition_name,
+    month_start,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def partitions(db) -> list[str]:
+    return list(
+        await db.scalars(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'songs'::regclass"
+            )
+        )
+    )
+
+
+def test_month_start():
+    assert month_start(date(2026, 12, 31)) == date(2026, 12, 1)
+    assert month_start(date(2026, 12, 31), 1) == date(2027, 1, 1)
+    assert month_start(date(2026, 1, 15), -1) == date(2025, 12, 1)
+
+
+async def test_rows_in_the_default_partition_move_to_the_new_month(pair):
+    user1, user2, connection = pair
+    async with AsyncSessionLocal() as db:
+        newest = max(
+            date(int(match["year"]), int(match["month"]), 1)
+            for match in map(PARTITION_NAME_RE.match, await partitions(db))
+            if match and match["year"]
+        )
+        month = month_start(newest, 1)
+        created_at = datetime(month.year, month.month, 15, tzinfo=timezone.utc)
+        await db.execute(
+            text(
+                "INSERT INTO songs (sender_id, receiver_id, connection_id, link, "
+                "track_token, created_at) VALUES (:sender, :receiver, :connection, "
+                "'https://youtu.be/dQw4w9WgXcQ', 'late', :created_at)"
+            ),
+            {
+                "sender": user1.id,
+                "receiver": user2.id,
+                "connection": connection.id,
+                "created_at": created_at,
+            },
+        )
+        await db.commit()
+
+        created = await ensure_month_partitions(db, "songs", 0, today=month)
+        await db.commit()
+
+        name = month_partition_name("songs", month)
+        assert created == [name]
+        assert await db.scalar(text("SELECT count(*) FROM songs_default")) == 0
+        assert await db.scalar(text(f"SELECT track_token FROM {name}")) == "late"
+        # Idempotent: nothing left to create.
+        assert await ensure_month_partitions(db, "songs", 0, today=month) == []
@@ -0,0 +1,16 @@
+import pytest
+
+from scripts.check_query_plans import check_plans, seed
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_service_queries_use_indexes(database):
+    await seed(users=500, connections=1000, songs=5000)
+
+    checks = await check_plans()
+
+    assert checks
+    assert [
+        (check.label, check.seq_scans) for check in checks if check.regression
+    ] == []
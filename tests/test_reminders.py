@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.database.core import AsyncSessionLocal
+from src.database.entities.song import REMINDER_SLOTS
+from src.modules.connections.service import ConnectionService
+from src.modules.notifications.scheduler import ReminderScheduler
+from src.modules.notifications.service import NotificationService
+from src.modules.songs.model import SendSongsData
+from src.modules.songs.service import SongService
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSendScheduler:
+    def __init__(self):
+        self.chats: list[int] = []
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        self.chats.append(chat_id)
+
+
+@pytest.fixture
+async def receivers(create_user) -> dict[int, int]:
+    """User id -> telegram id of 8 users, each with an unlistened song."""
+    telegram_ids = {}
+    for n in range(8):
+        sender = await create_user(100 + n)
+        receiver = await create_user(200 + n)
+        async with AsyncSessionLocal() as db:
+            service = ConnectionService(db)
+            pending = await service.get_or_create_pair_code(sender.id)
+            connection = await service.join_connection(receiver.id, pending.pair_code)
+            await SongService(db).send_songs(
+                SendSongsData(
+                    sender_id=sender.id,
+                    receiver_id=receiver.id,
+                    connection_id=connection.id,
+                    links=[f"https://youtu.be/{n:011d}"],
+                )
+            )
+        telegram_ids[receiver.id] = receiver.telegram_id
+    return telegram_ids
+
+
+async def remind(bucket: int, buckets: int) -> list[int]:
+    sender = FakeSendScheduler()
+    async with AsyncSessionLocal() as db:
+        await NotificationService(db, sender).send_unlistened_songs_notification(
+            bucket, buckets
+        )
+    return sorted(sender.chats)
+
+
+async def test_buckets_split_receivers_by_slot_range(receivers):
+    # 1024 buckets of 4 slots each: receiver ids 2, 4, ... 16 land in
+    # buckets 0 to 4.
+    buckets = 1024
+    by_bucket: dict[int, list[int]] = {}
+    for user_id, telegram_id in receivers.items():
+        bucket = user_id % REMINDER_SLOTS * buckets // REMINDER_SLOTS
+        by_bucket.setdefault(bucket, []).append(telegram_id)
+
+    for bucket in range(max(by_bucket) + 2):
+        assert await remind(bucket, buckets) == sorted(by_bucket.get(bucket, []))
+
+
+async def test_single_bucket_covers_everyone(receivers):
+    assert await remind(0, 1) == sorted(receivers.values())
+
+
+def run(started_at: float, buckets_done: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=1,
+        started_at=datetime.fromtimestamp(started_at, timezone.utc),
+        window_seconds=960,
+        buckets=96,
+        buckets_done=buckets_done,
+    )
+
+
+def test_on_time_run_keeps_its_schedule():
+    scheduler = ReminderScheduler(send_scheduler=None, dsn="unused")
+    now = 1_000_000.0
+    on_time = run(started_at=now - 25, buckets_done=2)
+
+    origin = scheduler.schedule_origin(on_time, now)
+
+    assert origin == on_time.started_at.timestamp()
+
+
+def test_late_run_resumes_one_slot_at_a_time():
+    scheduler = ReminderScheduler(send_scheduler=None, dsn="unused")
+    now = 1_000_000.0
+    late = run(started_at=now - 900, buckets_done=10)
+
+    origin = scheduler.schedule_origin(late, now)
+    due = [scheduler.slot_due(late, bucket, origin) for bucket in range(10, 96)]
+
+    # The next bucket opens within its own slot of now, the rest follow one
+    # slot (10s) apart instead of all being overdue.
+    assert now <= due[0] < now + 10
+    assert all(b - a > 10 * (1 - scheduler.jitter) for a, b in zip(due, due[1:]))
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from src.database.core import AsyncSessionLocal
+from src.database.entities.song import Song
+from src.modules.songs.model import SendSongsData
+from src.modules.songs.service import SongService
+
+pytestmark = pytest.mark.anyio
+
+TRACK = "https://open.spotify.com/track/4uLU6hMCjMI75M1A2tKUQC"
+
+
+async def send(sender, receiver, connection, *links: str) -> list[Song]:
+    async with AsyncSessionLocal() as db:
+        return await SongService(db).send_songs(
+            SendSongsData(
+                sender_id=sender.id,
+                receiver_id=receiver.id,
+                connection_id=connection.id,
+                links=list(links),
+            )
+        )
+
+
+async def test_a_song_is_sent_once_per_sender(pair):
+    user1, user2, connection = pair
+
+    assert len(await send(user1, user2, connection, TRACK)) == 1
+    # Another URL form of the same song.
+    assert await send(user1, user2, connection, TRACK + "?si=abc") == []
+    # The partner can still send it back.
+    assert len(await send(user2, user1, connection, TRACK)) == 1
+
+
+async def test_concurrent_sends_store_one_song(pair):
+    user1, user2, connection = pair
+
+    results = await asyncio.gather(
+        *(send(user1, user2, connection, TRACK) for _ in range(5))
+    )
+
+    assert sorted(len(songs) for songs in results) == [0, 0, 0, 0, 1]
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(Song)) == 1
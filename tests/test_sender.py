@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from src.telegram_bot.sender import SendScheduler, SendSchedulerStopped
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeBot:
+    """Records (seconds since creation, chat_id, text) for each send."""
+
+    def __init__(self, retry_after: list[int] | None = None):
+        self.started_at = time.monotonic()
+        self.sent: list[tuple[float, int, str]] = []
+        # Flood-control answers to give, one per call, before accepting sends.
+        self.retry_after = list(retry_after or [])
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        if self.retry_after:
+            raise TelegramRetryAfter(
+                SendMessage(chat_id=chat_id, text=text),
+                "Too Many Requests",
+                self.retry_after.pop(0),
+            )
+        self.sent.append((time.monotonic() - self.started_at, chat_id, text))
+        return text
+
+
+@pytest.fixture
+async def scheduler_for():
+    schedulers = []
+
+    async def start(bot: FakeBot, **kwargs) -> SendScheduler:
+        scheduler = SendScheduler(bot, **kwargs)
+        await scheduler.start()
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield start
+    for scheduler in schedulers:
+        await scheduler.stop()
+
+
+async def test_parked_chat_does_not_hold_up_others(scheduler_for):
+    bot = FakeBot()
+    scheduler = await scheduler_for(bot, per_chat_rate=5, per_chat_burst=1)
+
+    futures = [
+        scheduler.submit(1, "a"),
+        scheduler.submit(1, "b"),
+        scheduler.submit(2, "c"),
+    ]
+    await asyncio.gather(*futures)
+
+    assert [(chat_id, text) for _, chat_id, text in bot.sent] == [
+        (1, "a"),
+        (2, "c"),
+        (1, "b"),
+    ]
+    # "b" waited for chat 1's next slot, "c" didn't.
+    assert bot.sent[1][0] < 0.1
+    assert bot.sent[2][0] >= 0.15
+
+
+async def test_retry_after_pauses_every_chat(scheduler_for):
+    bot = FakeBot(retry_after=[1])
+    scheduler = await scheduler_for(bot)
+
+    first = scheduler.submit(1, "a")
+    await asyncio.sleep(0.05)
+    second = scheduler.submit(2, "b")
+    await asyncio.gather(first, second)
+
+    assert {text for _, _, text in bot.sent} == {"a", "b"}
+    assert all(sent_at >= 0.95 for sent_at, _, _ in bot.sent)
+    assert scheduler.stats()["retried"] == 1
+
+
+async def test_gives_up_after_max_retries(scheduler_for):
+    bot = FakeBot(retry_after=[0, 0, 0])
+    scheduler = await scheduler_for(bot, max_retries=2)
+
+    with pytest.raises(TelegramRetryAfter):
+        await scheduler.submit(1, "a")
+
+    assert bot.sent == []
+    assert scheduler.stats()["failed"] == 1
+    assert scheduler.stats()["retried"] == 2
+
+
+async def test_stop_fails_parked_and_queued_sends(scheduler_for):
+    bot = FakeBot()
+    scheduler = await scheduler_for(bot, per_chat_rate=0.1, per_chat_burst=1)
+
+    sent = scheduler.submit(1, "a")
+    parked = scheduler.submit(1, "b")
+    assert await sent == "a"
+    await asyncio.sleep(0.05)
+
+    await scheduler.stop()
+
+    with pytest.raises(SendSchedulerStopped):
+        await parked
+    assert scheduler.stats()["queue_depth"] == {"interactive": 0, "bulk": 0}
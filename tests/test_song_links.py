@@ -0,0 +1,97 @@
+import pytest
+
+from src.core.enums import SongProvider
+from src.core.utils.songs import extract_song_links, parse_song_link
+
+SPOTIFY_ID = "4uLU6hMCjMI75M1A2tKUQC"
+VIDEO_ID = "dQw4w9WgXcQ"
+LIST_ID = "PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        f"https://open.spotify.com/track/{SPOTIFY_ID}",
+        f"https://open.spotify.com/track/{SPOTIFY_ID}?si=abc123",
+        f"https://open.spotify.com/intl-de/track/{SPOTIFY_ID}",
+        f"http://open.spotify.com/intl-pt-BR/track/{SPOTIFY_ID}?si=x&utm_source=copy",
+    ],
+)
+def test_spotify_forms_share_one_id(url):
+    link = parse_song_link(url)
+    assert link.provider is SongProvider.SPOTIFY
+    assert link.canonical_id == f"spotify:track:{SPOTIFY_ID}"
+    assert link.url == f"https://open.spotify.com/track/{SPOTIFY_ID}"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        f"https://www.youtube.com/watch?v={VIDEO_ID}",
+        f"https://youtube.com/watch?feature=share&v={VIDEO_ID}&t=42",
+        f"https://m.youtube.com/watch?v={VIDEO_ID}",
+        f"https://music.youtube.com/watch?v={VIDEO_ID}&list={LIST_ID}",
+        f"https://www.youtube.com/shorts/{VIDEO_ID}",
+        f"https://www.youtube.com/embed/{VIDEO_ID}?start=10",
+        f"https://www.youtube.com/live/{VIDEO_ID}?si=abc",
+        f"https://youtu.be/{VIDEO_ID}",
+        f"https://youtu.be/{VIDEO_ID}?si=abc&t=5",
+    ],
+)
+def test_youtube_forms_share_one_id(url):
+    link = parse_song_link(url)
+    assert link.provider is SongProvider.YOUTUBE
+    assert link.canonical_id == f"youtube:{VIDEO_ID}"
+    assert link.url == f"https://www.youtube.com/watch?v={VIDEO_ID}"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        f"https://www.youtube.com/playlist?list={LIST_ID}",
+        f"https://music.youtube.com/playlist?si=abc&list={LIST_ID}",
+    ],
+)
+def test_youtube_playlists(url):
+    link = parse_song_link(url)
+    assert link.canonical_id == f"youtube:playlist:{LIST_ID}"
+    assert link.url == f"https://www.youtube.com/playlist?list={LIST_ID}"
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://www.youtube.com/",
+        "https://www.youtube.com/@channel",
+        "https://www.youtube.com/results?search_query=song",
+        "https://open.spotify.com/track/short",
+        "https://youtu.be/tooShort",
+        "https://example.com/watch?v=dQw4w9WgXcQ",
+    ],
+)
+def test_links_without_a_song_are_ignored(url):
+    assert parse_song_link(url) is None
+
+
+def test_extract_keeps_order_and_drops_repeats():
+    text = (
+        f"listen https://youtu.be/{VIDEO_ID} and "
+        f"https://open.spotify.com/track/{SPOTIFY_ID}?si=1 "
+        f"(same as https://www.youtube.com/watch?v={VIDEO_ID})"
+    )
+    assert [link.canonical_id for link in extract_song_links(text)] == [
+        f"youtube:{VIDEO_ID}",
+        f"spotify:track:{SPOTIFY_ID}",
+    ]
+
+
+def test_extract_stops_at_the_limit():
+    text = " ".join(f"https://youtu.be/{i:011d}" for i in range(5))
+    links = extract_song_links(text, limit=3)
+    assert [link.canonical_id for link in links] == [
+        f"youtube:{i:011d}" for i in range(3)
+    ]
+
+
+def test_no_links():
+    assert extract_song_links("just chatting") == []
@@ -0,0 +1,46 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.core.utils.songs import (
+    TRACK_TOKEN_SLACK,
+    generate_track_token,
+    track_token_window,
+)
+from src.modules.songs.service import _track_token_match
+
+
+def test_window_surrounds_the_issue_day():
+    start, end = track_token_window(generate_track_token())
+    now = datetime.now(timezone.utc)
+
+    assert start <= now < end
+    assert end - start == timedelta(days=1) + 2 * TRACK_TOKEN_SLACK
+    assert start + TRACK_TOKEN_SLACK == datetime.combine(
+        now.date(), datetime.min.time(), tzinfo=timezone.utc
+    )
+
+
+@pytest.mark.parametrize(
+    "track_token",
+    [
+        "undatedtoken",
+        "zz.abc",
+        ".abc",
+        "-1.abc",
+        "0.abc",
+        # Valid ordinals whose slack runs off either end of the calendar
+        "1.abc",
+        f"{date.max.toordinal():x}.abc",
+        f"{date.max.toordinal() + 1:x}.abc",
+        f"{10**30:x}.abc",
+    ],
+)
+def test_malformed_and_out_of_range_tokens_have_no_window(track_token):
+    assert track_token_window(track_token) is None
+
+
+def test_malformed_token_is_looked_up_without_a_window():
+    # GET /track/1.x must reach the not-found path, not raise.
+    assert len(_track_token_match("1.x")) == 1
+    assert len(_track_token_match(generate_track_token())) == 2
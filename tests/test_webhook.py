@@ -0,0 +1,71 @@
+import pytest
+from aiogram.types import WebhookInfo
+
+from src.core.config import TELEGRAM_WEBHOOK_MAX_CONNECTIONS, WEBHOOK_URL
+from src.telegram_bot import webhook
+from src.telegram_bot.webhook import ensure_webhook
+
+pytestmark = pytest.mark.anyio
+
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+class FakeBot:
+    """Keeps the webhook Telegram would report; counts setWebhook calls."""
+
+    id = 42
+
+    def __init__(self, info: WebhookInfo | None = None):
+        self.info = info or WebhookInfo(
+            url="", has_custom_certificate=False, pending_update_count=0
+        )
+        self.set_calls = 0
+
+    async def get_webhook_info(self) -> WebhookInfo:
+        return self.info
+
+    async def set_webhook(self, url, secret_token, allowed_updates, max_connections):
+        self.set_calls += 1
+        self.info = WebhookInfo(
+            url=url,
+            has_custom_certificate=False,
+            pending_update_count=0,
+            allowed_updates=allowed_updates,
+            max_connections=max_connections,
+        )
+
+
+async def test_registers_only_when_something_changed(database, monkeypatch):
+    monkeypatch.setattr(webhook, "TELEGRAM_WEBHOOK_SECRET", "first")
+    bot = FakeBot()
+
+    assert await ensure_webhook(bot, ALLOWED_UPDATES)
+    assert bot.set_calls == 1
+
+    # Restarting with the same settings leaves Telegram alone.
+    assert await ensure_webhook(bot, list(reversed(ALLOWED_UPDATES)))
+    assert bot.set_calls == 1
+
+    # getWebhookInfo can't show it, but a rotated secret is still registered.
+    monkeypatch.setattr(webhook, "TELEGRAM_WEBHOOK_SECRET", "second")
+    assert await ensure_webhook(bot, ALLOWED_UPDATES)
+    assert bot.set_calls == 2
+
+    assert await ensure_webhook(bot, ALLOWED_UPDATES + ["inline_query"])
+    assert bot.set_calls == 3
+
+
+async def test_registers_when_the_secret_was_never_recorded(database, monkeypatch):
+    monkeypatch.setattr(webhook, "TELEGRAM_WEBHOOK_SECRET", "first")
+    bot = FakeBot(
+        WebhookInfo(
+            url=WEBHOOK_URL,
+            has_custom_certificate=False,
+            pending_update_count=0,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+        )
+    )
+
+    assert await ensure_webhook(bot, ALLOWED_UPDATES)
+    assert bot.set_calls == 1